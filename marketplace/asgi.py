@@ -14,3 +14,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'marketplace.settings')
 
 application = get_asgi_application()
+
+from stocks.apps import load_cache_snapshot  # noqa: E402
+
+load_cache_snapshot()
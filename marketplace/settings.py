@@ -231,15 +231,99 @@ STOCK_API_SETTINGS = {
     'ALPHA_VANTAGE_API_KEY': config('ALPHA_VANTAGE_API_KEY', default=''),
     'FINNHUB_API_KEY': config('FINNHUB_API_KEY', default=''),
     'CACHE_TIMEOUT': 900,  # 15 minutes (increased from 5 for better performance)
-    'MAX_REQUESTS_PER_MINUTE': 60,
+    'QUOTE_SOFT_TTL': 900,  # Past this, cached quotes are served stale and refreshed in the background (without MARKET_HOURS_POLICY)
+    'QUOTE_HARD_TTL': 3600,  # Stale quotes are served for QUOTE_HARD_TTL - QUOTE_SOFT_TTL more, then requests block on a fresh fetch
+    'MARKET_HOURS_POLICY': True,  # Freshness follows the trading session instead of QUOTE_SOFT_TTL
+    'MARKET_TIMEZONE': 'America/New_York',
+    'MARKET_HOLIDAYS': [],  # Extra full-day closures as 'YYYY-MM-DD', on top of the NYSE rules
+    'QUOTE_TTL_REGULAR': 60,  # Freshness of quotes fetched during the regular session
+    'QUOTE_TTL_EXTENDED': 300,  # Freshness of quotes fetched pre/post-market; closed-market quotes last until the next open
+    'FUNDAMENTALS_TTL': 86400,  # Company profile, valuation ratios and 52-week range
+    'SPARKLINE_TTL': 3600,  # 7-day closing prices for card sparklines
+    'REFRESH_WORKERS': 2,  # Background refresh threads per process
+    'PRICE_WRITE_INTERVAL': 10,  # Seconds between write-behind flushes of prices served by views
+    'PRICE_WRITE_MAX_PENDING': 500,  # Flush early once this many tickers have pending price updates
+    'PRICE_API_MAX_SYMBOLS': 50,  # Most symbols one /api/stocks/prices/ request may ask for
+    'STREAM_POLL_INTERVAL': 5,  # Seconds between price hub polls of the symbols streamed over SSE
+    'STREAM_KEEPALIVE': 15,  # Seconds of silence before an SSE keep-alive comment
+    'STREAM_MAX_SECONDS': 300,  # Streams are closed after this long and the browser reconnects (bounds streams left behind by disconnected clients)
+    'MARKET_BOARD_TTL': 60,  # Seconds between rebuilds of the home page trending/top/movers lists
+    'MARKET_BOARD_UNIVERSE': 50,  # Most traded active stocks ranked for the market board
+    'SNAPSHOT_CHART_POINTS': 180,  # Default points in a /api/portfolio/history/ series (longer ranges are downsampled)
+    'SNAPSHOT_CHART_MAX_POINTS': 1000,  # Most points a client may ask for
+    'REQUEST_PATH_FETCH': True,  # Set False when refresh_prices runs: requests then serve cached or stored prices
+    'REFRESH_MIN_INTERVAL': 60,  # refresh_prices: seconds between refreshes of the most demanded symbol
+    'REFRESH_MAX_INTERVAL': 900,  # refresh_prices: cadence for symbols with no demand (keep below QUOTE_HARD_TTL - QUOTE_SOFT_TTL)
+    'REFRESH_MAX_PER_PASS': 200,  # refresh_prices: most symbols fetched per pass
+    'REFRESH_DEMAND_INTERVAL': 300,  # refresh_prices: seconds between demand re-rankings
+    'REFRESH_DEMAND_WEIGHTS': {'holders': 2, 'watchlists': 1, 'alerts': 2},  # Demand per holder, watchlist entry and active alert
+    'NEGATIVE_CACHE_TTL': 60,  # Seconds to skip a symbol no provider has data for, doubling per failure
+    'NEGATIVE_CACHE_MAX_TTL': 3600,  # Upper bound for that backoff
+    'HISTORY_STORE_DIR': BASE_DIR / 'data' / 'price_history',  # On-disk daily OHLCV columns
+    'HISTORY_CACHE_ENTRIES': 256,  # In-memory widest series per symbol and interval
+    'HISTORY_CACHE_BYTES': 64 * 1024 * 1024,  # Memory budget for held history series
+    'HISTORY_CACHE_POLICY': 'lru',  # 'lru' or 'lfu'
+    'QUOTE_BOARD_PATH': BASE_DIR / 'data' / 'quote_board.bin',  # Memory-mapped quotes shared by all workers (None = per-process cache)
+    'QUOTE_BOARD_CAPACITY': 4096,  # Tickers the quote board can hold
+    'QUOTE_BOARD_PUBLISH': False,  # Whether web workers also write to the board; refresh_prices always does
+    'CACHE_SNAPSHOT_PATH': BASE_DIR / 'data' / 'cache_snapshot.bin',  # Cached records kept across restarts
+    'CACHE_SNAPSHOT_INTERVAL': 300,  # Seconds between snapshots (0 = only on warm_cache)
+    'CACHE_SNAPSHOT_ON_STARTUP': True,  # Load the snapshot when the app starts
+    'MAX_REQUESTS_PER_MINUTE': 60,  # Default per-provider quota
+    'PROVIDER_RATE_LIMITS': {  # Requests per minute, shared by all workers through RATE_LIMIT_CACHE
+        'yfinance': 60,
+        'tiingo': 50,
+        'alpha_vantage': 5,
+        'finnhub': 60,
+    },
+    'RATE_LIMIT_WAIT': 30,  # Max seconds to wait for a provider token before giving up
+    'RATE_LIMIT_CACHE': 'ratelimit',  # Cache alias holding provider token buckets; must be shared by all workers
+    'QUOTE_PROVIDERS': ['yfinance', 'tiingo', 'finnhub', 'alpha_vantage'],  # Used when configured, fastest first
+    'PROVIDER_TIMEOUT': 10,  # Seconds per provider request
+    'HTTP_POOL_CONNECTIONS': 10,  # Hosts with pooled keep-alive connections
+    'HTTP_POOL_MAXSIZE': 10,  # Connections kept per host
+    'HTTP_POOL_SIZES': {'api.tiingo.com': 16},  # Per-host overrides
+    'HTTP_RETRIES': 2,  # Retries on connection errors and 5xx responses
+    'HTTP_BACKOFF': 0.5,  # Exponential backoff factor between retries
+    'CIRCUIT_BREAKER_FAILURES': 3,  # Consecutive failures before a provider is skipped
+    'CIRCUIT_BREAKER_COOLDOWN': 60,  # Seconds a failing provider is skipped
+    'HEDGE_REQUESTS': False,  # Start the next provider if the current one is slower than its p95
+    'HEDGE_PERCENTILE': 95,
+    'HEDGE_MIN_DELAY': 0.5,  # Seconds before a hedge can be fired
+    'MAX_WORKERS': 8,  # Thread pool size for concurrent provider fetches
+    'BATCH_SIZE': 50,  # Symbols per bulk quote download
+    'SINGLE_FLIGHT_LEASE': 30,  # Seconds other workers wait on an in-flight fetch
+    'COORDINATION_CACHE': 'coordination',  # Cache alias for leases and refresh claims; must be shared by all workers
 }
 
 # Cache Configuration
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'stocks.cache_backends.ByteBudgetCache',
         'LOCATION': 'unique-snowflake',
-    }
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,  # Eviction is driven by MAX_BYTES
+            'MAX_BYTES': 32 * 1024 * 1024,
+            'EVICTION_POLICY': 'lru',  # 'lru' or 'lfu'
+            'KEY_FAMILIES': {
+                'stock_quote_': 'quote',
+                'stock_fundamentals_': 'fundamentals',
+                'stock_sparkline_': 'sparkline',
+                'stock_negative_': 'negative',
+            },
+        },
+    },
+    # Provider token buckets; a database cache so every worker process shares one quota
+    # (create the table with: python manage.py createcachetable)
+    'ratelimit': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'stock_ratelimit_cache',
+    },
+    # Single-flight leases, background refresh claims and the market board, seen by every worker
+    'coordination': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'stock_coordination_cache',
+    },
 }
 
 # Rate Limiting
@@ -2,8 +2,8 @@ from django.contrib import admin
 
 # Register your models here.
 from .models import (
-    Stocks, UserInfo, UserStock, Transaction, 
-    Watchlist, PriceAlert, StockComparison, UserPreference
+    Stocks, UserInfo, UserStock, Transaction, Position,
+    TaxLot, RealizedLot, RealizedGainSummary, PortfolioSnapshot, Watchlist, PriceAlert, StockComparison, UserPreference
 )
 
 # Customize admin site header
@@ -45,6 +45,44 @@ class TransactionAdmin(admin.ModelAdmin):
     list_per_page = 100
 
 
+@admin.register(Position)
+class PositionAdmin(admin.ModelAdmin):
+    list_display = ['user', 'stock_symbol', 'quantity', 'cost_basis', 'realized_pnl', 'updated_at']
+    search_fields = ['user__username', 'stock_symbol', 'stock_name']
+    raw_id_fields = ['user', 'last_transaction']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(TaxLot)
+class TaxLotAdmin(admin.ModelAdmin):
+    list_display = ['user', 'stock_symbol', 'quantity_open', 'cost_per_share', 'acquired_at']
+    search_fields = ['user__username', 'stock_symbol']
+    raw_id_fields = ['user', 'buy_transaction']
+
+
+@admin.register(RealizedLot)
+class RealizedLotAdmin(admin.ModelAdmin):
+    list_display = ['user', 'stock_symbol', 'quantity', 'realized_gain', 'term', 'closed_at']
+    list_filter = ['term', 'tax_year']
+    search_fields = ['user__username', 'stock_symbol']
+    raw_id_fields = ['user', 'buy_transaction', 'sell_transaction']
+
+
+@admin.register(RealizedGainSummary)
+class RealizedGainSummaryAdmin(admin.ModelAdmin):
+    list_display = ['user', 'tax_year', 'short_term_gain', 'long_term_gain', 'lots_closed']
+    list_filter = ['tax_year']
+    search_fields = ['user__username']
+
+
+@admin.register(PortfolioSnapshot)
+class PortfolioSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['user', 'date', 'total_value', 'invested', 'realized_pnl', 'unrealized_pnl']
+    search_fields = ['user__username']
+    date_hierarchy = 'date'
+    raw_id_fields = ['user']
+
+
 @admin.register(Watchlist)
 class WatchlistAdmin(admin.ModelAdmin):
     list_display = ['user', 'stock_symbol', 'stock_name', 'added_at']
@@ -1,4 +1,17 @@
 from django.apps import AppConfig
+from django.conf import settings
+
+
+def load_cache_snapshot():
+    """
+    Start with the records cached before the last restart instead of an empty cache.
+
+    Called from the WSGI and ASGI entry points (which runserver uses too),
+    so management commands such as migrate don't build the data services.
+    """
+    if getattr(settings, 'STOCK_API_SETTINGS', {}).get('CACHE_SNAPSHOT_ON_STARTUP', True):
+        from .services import stock_service
+        stock_service.load_cache_snapshot()
 
 
 class StocksConfig(AppConfig):
@@ -0,0 +1,222 @@
+"""
+Cache backends for stock data.
+"""
+import logging
+import pickle
+from typing import Any, Dict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.locmem import LocMemCache
+
+logger = logging.getLogger(__name__)
+
+# Accounting shared by every instance with the same LOCATION, like LocMemCache's own storage
+_budgets = {}
+
+
+class _Budget:
+    """Sizes, hit counts and per-family counters for one cache location"""
+
+    def __init__(self):
+        self.sizes: Dict[str, tuple] = {}  # key -> (bytes, family)
+        self.hits: Dict[str, int] = {}
+        self.total = 0
+        self.families: Dict[str, Dict[str, int]] = {}
+
+    def family_stats(self, family: str) -> Dict[str, int]:
+        return self.families.setdefault(family, {'bytes': 0, 'entries': 0, 'evictions': 0})
+
+
+class ByteBudgetCache(LocMemCache):
+    """
+    LocMemCache that evicts by the pickled size of its entries.
+
+    LocMemCache only caps the number of entries, so a handful of large
+    records can use far more memory than thousands of small quotes. This
+    backend keeps the total pickled size under MAX_BYTES, evicting the least
+    recently ('lru') or least frequently ('lfu') used entries first, and
+    keeps byte, entry and eviction counts per key family.
+
+    OPTIONS:
+        MAX_BYTES: byte budget for all entries (default 64 MB)
+        EVICTION_POLICY: 'lru' or 'lfu' (default 'lru')
+        KEY_FAMILIES: {key prefix: family name}; other keys count as 'other'
+    """
+
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        options = params.get('OPTIONS', {})
+        self._max_bytes = int(options.get('MAX_BYTES', 64 * 1024 * 1024))
+        self._policy = options.get('EVICTION_POLICY', 'lru').lower()
+        if self._policy not in ('lru', 'lfu'):
+            raise ValueError(f"Unsupported cache eviction policy: {self._policy}")
+        # Longest prefixes first so 'stock_quote_' wins over 'stock_'
+        self._families = sorted(options.get('KEY_FAMILIES', {}).items(), key=lambda item: -len(item[0]))
+        self._budget = _budgets.setdefault(name, _Budget())
+
+    def _family(self, key: str) -> str:
+        raw_key = key.split(':', 2)[-1]
+        for prefix, family in self._families:
+            if raw_key.startswith(prefix):
+                return family
+        return 'other'
+
+    def _account(self, key: str, size: int):
+        budget = self._budget
+        self._unaccount(key)
+        family = self._family(key)
+        budget.sizes[key] = (size, family)
+        budget.hits[key] = 0
+        budget.total += size
+        stats = budget.family_stats(family)
+        stats['bytes'] += size
+        stats['entries'] += 1
+
+    def _unaccount(self, key: str, evicted: bool = False):
+        budget = self._budget
+        entry = budget.sizes.pop(key, None)
+        budget.hits.pop(key, None)
+        if entry is None:
+            return
+        size, family = entry
+        budget.total -= size
+        stats = budget.family_stats(family)
+        stats['bytes'] -= size
+        stats['entries'] -= 1
+        if evicted:
+            stats['evictions'] += 1
+
+    def _victim(self, protect: str) -> str:
+        """Pick the entry to evict; the cache is ordered most recently used first"""
+        candidates = (key for key in reversed(self._cache) if key != protect)
+        if self._policy == 'lru':
+            return next(candidates, None)
+        # Least frequently used, ties going to the least recently used
+        hits = self._budget.hits
+        return min(candidates, key=lambda key: hits.get(key, 0), default=None)
+
+    def _evict(self, key: str):
+        self._unaccount(key, evicted=True)
+        self._cache.pop(key, None)
+        self._expire_info.pop(key, None)
+
+    def _set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        super()._set(key, value, timeout)
+        size = len(value)
+        if size > self._max_bytes:
+            logger.warning(f"Not caching {key}: {size} bytes exceeds the {self._max_bytes} byte budget")
+            self._evict(key)
+            return
+
+        self._account(key, size)
+        while self._budget.total > self._max_bytes:
+            victim = self._victim(protect=key)
+            if victim is None:
+                break
+            self._evict(victim)
+
+    def _cull(self):
+        # Entry-count culling (MAX_ENTRIES) goes through the same accounting
+        if self._cull_frequency == 0:
+            count = len(self._cache)
+        else:
+            count = len(self._cache) // self._cull_frequency
+        for _ in range(count):
+            victim = self._victim(protect=None)
+            if victim is None:
+                break
+            self._evict(victim)
+
+    def _delete(self, key):
+        self._unaccount(key)
+        return super()._delete(key)
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._lock:
+            if self._has_expired(key):
+                self._delete(key)
+                return default
+            pickled = self._cache[key]
+            self._cache.move_to_end(key, last=False)
+            self._budget.hits[key] = self._budget.hits.get(key, 0) + 1
+        return pickle.loads(pickled)
+
+    def incr(self, key, delta=1, version=None):
+        value = super().incr(key, delta, version)
+        key = self.make_and_validate_key(key, version=version)
+        with self._lock:
+            if key in self._cache:
+                hits = self._budget.hits.get(key, 0)
+                self._account(key, len(self._cache[key]))
+                self._budget.hits[key] = hits
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._expire_info.clear()
+            self._budget.sizes.clear()
+            self._budget.hits.clear()
+            self._budget.total = 0
+            for stats in self._budget.families.values():
+                stats['bytes'] = 0
+                stats['entries'] = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return current bytes, entries and evictions, in total and per key family"""
+        with self._lock:
+            return {
+                'policy': self._policy,
+                'max_bytes': self._max_bytes,
+                'bytes': self._budget.total,
+                'entries': len(self._cache),
+                'families': {family: dict(stats) for family, stats in self._budget.families.items()},
+            }
+
+
+class SharedCache:
+    """
+    A cache alias shared by every worker process, for leases, claims and counters.
+
+    The default cache is process-local, so anything that coordinates
+    workers goes through a shared alias instead (the 'coordination'
+    database cache by default). If the shared cache fails, e.g. before
+    createcachetable has been run, this logs the error and falls back to
+    the default cache, where coordination only covers the one process.
+    """
+
+    def __init__(self, alias: str = 'default'):
+        self.alias = alias
+
+    def _call(self, method: str, *args):
+        try:
+            return getattr(caches[self.alias], method)(*args)
+        except ValueError:
+            # incr() of a missing key, not a backend failure
+            raise
+        except Exception as e:
+            if self.alias == 'default':
+                raise
+            logger.error(f"Shared cache '{self.alias}' unavailable, coordinating per process: {str(e)}")
+            self.alias = 'default'
+            return getattr(caches['default'], method)(*args)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._call('get', key, default)
+
+    def set(self, key: str, value: Any, timeout=DEFAULT_TIMEOUT):
+        self._call('set', key, value, timeout)
+
+    def add(self, key: str, value: Any, timeout=DEFAULT_TIMEOUT) -> bool:
+        return self._call('add', key, value, timeout)
+
+    def delete(self, key: str):
+        self._call('delete', key)
+
+    def delete_many(self, keys):
+        self._call('delete_many', keys)
+
+    def incr(self, key: str, delta: int = 1) -> int:
+        return self._call('incr', key, delta)
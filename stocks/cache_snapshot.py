@@ -0,0 +1,163 @@
+"""
+Snapshots of the stock data cache that survive process restarts.
+"""
+import logging
+import os
+import pickle
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Optional
+from django.core.cache import cache
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locking
+    fcntl = None
+
+from .codecs import decode_frame, encode_frame
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 2
+
+
+class CacheSnapshot:
+    """
+    Track the cache records written by StockDataService and persist them.
+
+    The Django cache API cannot list its keys, so every record written
+    through the service is registered here with its expiry time. save()
+    writes the live records (and the in-process history series) to a
+    zlib-compressed pickle; load() puts them back with their remaining TTLs.
+    Every worker process saves to the same file, so save() merges its
+    records into the ones already there under a file lock rather than
+    replacing them.
+    """
+
+    def __init__(self, path, history_cache=None):
+        self.path = Path(path)
+        self.history_cache = history_cache
+        self._expiry: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, key: str, timeout: Optional[float]):
+        """Remember that key was cached until now + timeout"""
+        with self._lock:
+            self._expiry[key] = time.time() + timeout if timeout else float('inf')
+
+    def save(self) -> int:
+        """Write live records to the snapshot file, returning how many were saved"""
+        now = time.time()
+        with self._lock:
+            live = {key: expires for key, expires in self._expiry.items() if expires > now}
+            self._expiry = dict(live)
+
+        values = cache.get_many(list(live))
+        records = [(key, value, live[key]) for key, value in values.items()]
+
+        series = []
+        if self.history_cache is not None:
+            series = [
+                (symbol, interval, start, encode_frame(frame), fetched_at)
+                for symbol, interval, start, frame, fetched_at in self.history_cache.export()
+            ]
+
+        if not records and not series:
+            return 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_name(f"{self.path.name}.lock"), 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                records, series = self._merge(self._read(), records, series, now)
+                payload = zlib.compress(pickle.dumps({
+                    'version': SNAPSHOT_VERSION,
+                    'saved_at': now,
+                    'records': records,
+                    'series': series,
+                }, protocol=pickle.HIGHEST_PROTOCOL))
+
+                tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+                tmp_path.write_bytes(payload)
+                os.replace(tmp_path, self.path)
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+        logger.info(f"Saved cache snapshot with {len(records)} records and {len(series)} series "
+                    f"({len(payload)} bytes)")
+        return len(records) + len(series)
+
+    @staticmethod
+    def _merge(existing: Optional[dict], records: list, series: list, now: float):
+        """Overlay this process's records and series on the unexpired ones already saved"""
+        if not existing:
+            return records, series
+        merged = {key: (key, value, expires) for key, value, expires in existing['records'] if expires > now}
+        merged.update((record[0], record) for record in records)
+        merged_series = {(item[0], item[1]): item for item in existing.get('series', [])}
+        merged_series.update(((item[0], item[1]), item) for item in series)
+        return list(merged.values()), list(merged_series.values())
+
+    def _read(self) -> Optional[dict]:
+        """The current snapshot, or None if it is missing, unreadable or from another version"""
+        try:
+            snapshot = pickle.loads(zlib.decompress(self.path.read_bytes()))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable cache snapshot {self.path}: {str(e)}")
+            return None
+        if snapshot.get('version') != SNAPSHOT_VERSION:
+            return None
+        return snapshot
+
+    def load(self) -> int:
+        """Restore unexpired records from the snapshot file, returning how many were loaded"""
+        snapshot = self._read()
+        if snapshot is None:
+            return 0
+
+        now = time.time()
+        loaded = 0
+        for key, value, expires in snapshot['records']:
+            if expires <= now:
+                continue
+            timeout = None if expires == float('inf') else expires - now
+            cache.set(key, value, timeout)
+            self.register(key, timeout)
+            loaded += 1
+
+        if self.history_cache is not None:
+            loaded += self.history_cache.restore([
+                (symbol, interval, start, decode_frame(payload), fetched_at)
+                for symbol, interval, start, payload, fetched_at in snapshot.get('series', [])
+            ])
+
+        logger.info(f"Loaded {loaded} cached entries from snapshot {self.path}")
+        return loaded
+
+    def start(self, interval: int):
+        """Save a snapshot every interval seconds from a daemon thread"""
+        if interval <= 0:
+            return
+
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run, args=(interval,), name='cache-snapshot', daemon=True
+            )
+        self._thread.start()
+
+    def _run(self, interval: int):
+        while True:
+            time.sleep(interval)
+            try:
+                self.save()
+            except Exception as e:
+                logger.error(f"Cache snapshot failed: {str(e)}")
@@ -0,0 +1,140 @@
+"""
+Compact binary encodings for cached quotes and history frames.
+
+Quotes are packed into a fixed-layout struct covering QUOTE_FIELDS, and
+history frames into a small header followed by the raw NumPy buffers of
+the index and the columns, which decode as views without copying.
+"""
+import math
+import struct
+from typing import Any, Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+QUOTE_CODEC_VERSION = 1
+
+# version, fetched_at, current_price, previous_close, day_change, day_change_percent,
+# day_high, day_low, open_price, volume, symbol, source, last_updated (ISO format)
+QUOTE_STRUCT = struct.Struct('<B7x8dq16s16s32s')
+
+# Quote fields stored as doubles; NaN marks a field the provider did not supply
+QUOTE_FLOAT_FIELDS = (
+    'current_price', 'previous_close', 'day_change', 'day_change_percent',
+    'day_high', 'day_low', 'open_price',
+)
+
+FRAME_MAGIC = b'OHLC'
+FRAME_CODEC_VERSION = 1
+
+# magic, version, column count, row count, index name length, tz length;
+# then the names, the int64 index and a (columns, rows) float64 block
+FRAME_HEADER = struct.Struct('<4sBBIHH')
+
+
+def encode_quote(quote: Dict[str, Any], fetched_at: float) -> bytes:
+    """Pack a quote record and its fetch time"""
+    get = quote.get
+    floats = [get(field) for field in QUOTE_FLOAT_FIELDS]
+    volume = get('volume')
+    # struct truncates the strings to their field widths
+    return QUOTE_STRUCT.pack(
+        QUOTE_CODEC_VERSION,
+        fetched_at,
+        *[math.nan if value is None else value for value in floats],
+        -1 if volume is None else int(volume),
+        str(get('symbol', '')).encode(),
+        str(get('source', '')).encode(),
+        str(get('last_updated', '')).encode(),
+    )
+
+
+def decode_quote(payload: bytes) -> Tuple[Dict[str, Any], float]:
+    """Unpack a quote record, returning (quote, fetched_at)"""
+    values = QUOTE_STRUCT.unpack(payload)
+    if values[0] != QUOTE_CODEC_VERSION:
+        raise ValueError(f"Unsupported quote codec version: {values[0]}")
+
+    # NaN != NaN drops the fields the provider did not supply
+    quote = {field: value for field, value in zip(QUOTE_FLOAT_FIELDS, values[2:9]) if value == value}
+    quote['symbol'] = values[10].rstrip(b'\0').decode()
+    quote['source'] = values[11].rstrip(b'\0').decode()
+    if values[9] >= 0:
+        quote['volume'] = values[9]
+    if values[12][:1] != b'\0':
+        quote['last_updated'] = values[12].rstrip(b'\0').decode()
+    return quote, values[1]
+
+
+def encode_frame(frame: pd.DataFrame) -> bytes:
+    """
+    Pack a DatetimeIndex-ed frame of numeric columns.
+
+    All columns are stored as one float64 block (volumes stay exact up to
+    2**53), which keeps both directions to a single pandas conversion.
+    """
+    index = pd.DatetimeIndex(frame.index)
+    tz = str(index.tz) if index.tz is not None else ''
+    index_name = (frame.index.name or '').encode()
+    tz_name = tz.encode()
+    names = [str(name).encode() for name in frame.columns]
+
+    parts = [
+        FRAME_HEADER.pack(FRAME_MAGIC, FRAME_CODEC_VERSION, len(names), len(frame),
+                          len(index_name), len(tz_name)),
+        index_name,
+        tz_name,
+    ]
+    parts.extend(struct.pack('<B', len(name)) + name for name in names)
+    # Align the buffers to 8 bytes so decoded columns are aligned views
+    parts.append(b'\0' * (-sum(len(part) for part in parts) % 8))
+    # .values is UTC for tz-aware indexes
+    parts.append(index.values.astype('datetime64[ns]').view('<i8'))
+    parts.append(np.ascontiguousarray(frame.to_numpy(dtype='<f8').T))
+    return b''.join(parts)
+
+
+def decode_columns(payload: bytes) -> Dict[str, Any]:
+    """
+    Read encode_frame's output as read-only NumPy views of payload.
+
+    Returns {'index': datetime64[ns] UTC array, 'index_name', 'tz', 'names',
+    'block': (columns, rows) float64 array}; use it directly when a
+    DataFrame is not needed.
+    """
+    magic, version, column_count, rows, name_length, tz_length = FRAME_HEADER.unpack_from(payload)
+    if magic != FRAME_MAGIC or version != FRAME_CODEC_VERSION:
+        raise ValueError("Not an encoded history frame")
+
+    offset = FRAME_HEADER.size
+    index_name = payload[offset:offset + name_length].decode() or None
+    offset += name_length
+    tz = payload[offset:offset + tz_length].decode() or None
+    offset += tz_length
+
+    names = []
+    for _ in range(column_count):
+        length = payload[offset]
+        names.append(payload[offset + 1:offset + 1 + length].decode())
+        offset += 1 + length
+    offset += -offset % 8
+
+    index = np.frombuffer(payload, dtype='<i8', count=rows, offset=offset).view('datetime64[ns]')
+    offset += rows * 8
+    block = np.frombuffer(payload, dtype='<f8', count=rows * column_count, offset=offset)
+    return {
+        'index': index,
+        'index_name': index_name,
+        'tz': tz,
+        'names': names,
+        'block': block.reshape(column_count, rows),
+    }
+
+
+def decode_frame(payload: bytes) -> pd.DataFrame:
+    """Rebuild a frame from encode_frame's output as a view of payload"""
+    decoded = decode_columns(payload)
+    index = pd.DatetimeIndex(decoded['index'], name=decoded['index_name'])
+    if decoded['tz']:
+        index = index.tz_localize('UTC').tz_convert(decoded['tz'])
+    return pd.DataFrame(decoded['block'].T, index=index, columns=decoded['names'], copy=False)
@@ -16,6 +16,7 @@ from .models import (
     UserPreference, Watchlist, UserStock
 )
 from .services import stock_service
+from .valuation import Holdings, value_holdings
 
 logger = logging.getLogger(__name__)
 
@@ -26,10 +27,11 @@ def price_alerts_view(request):
     alerts = PriceAlert.objects.filter(user=request.user).select_related()
     
     # Enhance alerts with current prices
+    live_data = stock_service.get_multiple_stocks([alert.stock_symbol for alert in alerts])
     enhanced_alerts = []
     for alert in alerts:
         try:
-            stock_data = stock_service.get_stock_data(alert.stock_symbol)
+            stock_data = live_data.get(alert.stock_symbol)
             current_price = stock_data['current_price'] if stock_data else 0
             
             # Check if alert should be triggered
@@ -121,11 +123,12 @@ def stock_comparison_view(request):
     comparison_data = []
     
     if symbols:
+        live_data = stock_service.get_multiple_stocks([symbol.upper() for symbol in symbols[:5]])
         for symbol in symbols[:5]:  # Limit to 5 stocks
             try:
                 stock = Stocks.objects.filter(ticker=symbol.upper()).first()
                 if stock:
-                    stock_data = stock_service.get_stock_data(symbol.upper())
+                    stock_data = live_data.get(symbol.upper())
                     if stock_data:
                         comparison_data.append({
                             'symbol': stock.ticker,
@@ -198,6 +201,8 @@ def user_preferences_view(request):
             preferences.price_alert_notifications = request.POST.get('price_alert_notifications') == 'on'
             preferences.transaction_notifications = request.POST.get('transaction_notifications') == 'on'
             preferences.theme = request.POST.get('theme', 'light')
+            if request.POST.get('lot_method') in ('FIFO', 'LIFO'):
+                preferences.lot_method = request.POST['lot_method']
             preferences.save()
             
             messages.success(request, "Preferences updated successfully.")
@@ -217,35 +222,24 @@ def dashboard_analytics(request):
     # Get portfolio data
     user_stocks = UserStock.objects.select_related('stock').filter(user=user)
     
-    total_value = 0
-    invested = 0
-    portfolio_data = []
+    holdings = Holdings.from_user_stocks(user_stocks)
+    valuation = value_holdings(holdings, stock_service.get_multiple_stocks(holdings.symbols))
     
-    for item in user_stocks:
-        stock_data = stock_service.get_stock_data(item.stock.ticker)
-        current_price = stock_data['current_price'] if stock_data else float(item.stock.curr_price)
-        
-        stock_value = item.purchase_quantity * Decimal(str(current_price))
-        invested_value = item.purchase_quantity * item.purchase_price
-        gain_loss = stock_value - invested_value
-        gain_loss_pct = (gain_loss / invested_value * 100) if invested_value > 0 else 0
-        
-        total_value += stock_value
-        invested += invested_value
-        
-        portfolio_data.append({
-            'stock': item.stock,
-            'quantity': item.purchase_quantity,
-            'current_price': current_price,
-            'purchase_price': float(item.purchase_price),
-            'current_value': float(stock_value),
-            'invested_value': float(invested_value),
-            'gain_loss': float(gain_loss),
-            'gain_loss_pct': float(gain_loss_pct)
-        })
-    
-    total_gain_loss = total_value - invested
-    total_gain_loss_pct = (total_gain_loss / invested * 100) if invested > 0 else 0
+    portfolio_data = [
+        {
+            'stock': row['item'].stock,
+            'quantity': row['quantity'],
+            'current_price': row['current_price'],
+            'purchase_price': float(row['item'].purchase_price),
+            'current_value': row['current_value'],
+            'invested_value': row['invested_value'],
+            'gain_loss': row['gain_loss'],
+            'gain_loss_pct': row['gain_loss_percent'],
+            'weight': row['weight'],
+            'sector': row['sector'],
+        }
+        for row in valuation.rows()
+    ]
     
     # Get watchlist count
     watchlist_count = Watchlist.objects.filter(user=user).count()
@@ -255,10 +249,11 @@ def dashboard_analytics(request):
     
     context = {
         'portfolio_data': portfolio_data,
-        'total_value': float(total_value),
-        'invested': float(invested),
-        'total_gain_loss': float(total_gain_loss),
-        'total_gain_loss_pct': float(total_gain_loss_pct),
+        'total_value': valuation.total_value,
+        'invested': valuation.total_cost,
+        'total_gain_loss': valuation.total_pnl,
+        'total_gain_loss_pct': valuation.total_return_percent,
+        'sector_allocation': valuation.sector_allocation(),
         'watchlist_count': watchlist_count,
         'active_alerts': active_alerts,
         'portfolio_count': len(portfolio_data)
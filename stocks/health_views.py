@@ -6,6 +6,7 @@ from django.db import connection
 from django.core.cache import cache
 from django.utils import timezone
 from stocks.models import Stocks
+from stocks.services import price_hub, price_writer, quote_board, request_coalescer, stock_service
 import logging
 
 logger = logging.getLogger(__name__)
@@ -52,6 +53,55 @@ def health_check(request):
     except Exception as e:
         health_status['checks']['cache'] = f'unavailable: {str(e)}'
     
+    # Report upstream calls saved by request coalescing
+    try:
+        health_status['checks']['request_coalescing'] = request_coalescer.stats()
+    except Exception as e:
+        health_status['checks']['request_coalescing'] = f'unavailable: {str(e)}'
+    
+    # Report cache memory use per key family
+    try:
+        health_status['checks']['cache_usage'] = stock_service.cache_stats()
+    except Exception as e:
+        health_status['checks']['cache_usage'] = f'unavailable: {str(e)}'
+    
+    # Report the trading session driving quote freshness
+    try:
+        health_status['checks']['market'] = stock_service.market_status()
+    except Exception as e:
+        health_status['checks']['market'] = f'unavailable: {str(e)}'
+    
+    # Report server-sent event clients and the symbols they stream
+    try:
+        health_status['checks']['price_streams'] = price_hub.stats()
+    except Exception as e:
+        health_status['checks']['price_streams'] = f'unavailable: {str(e)}'
+    
+    # Report price updates waiting to be written to the database
+    try:
+        health_status['checks']['price_writes'] = price_writer.stats()
+    except Exception as e:
+        health_status['checks']['price_writes'] = f'unavailable: {str(e)}'
+    
+    # Report symbols skipped because no provider has data for them
+    try:
+        health_status['checks']['negative_cache'] = stock_service.negative_cache_stats()
+    except Exception as e:
+        health_status['checks']['negative_cache'] = f'unavailable: {str(e)}'
+    
+    # Report provider circuit breakers and latencies
+    try:
+        health_status['checks']['providers'] = stock_service.providers.stats()
+    except Exception as e:
+        health_status['checks']['providers'] = f'unavailable: {str(e)}'
+    
+    # Report shared quote board usage
+    if quote_board is not None:
+        try:
+            health_status['checks']['quote_board'] = quote_board.stats()
+        except Exception as e:
+            health_status['checks']['quote_board'] = f'unavailable: {str(e)}'
+    
     # Return appropriate HTTP status
     if health_status['status'] == 'unhealthy':
         return JsonResponse(health_status, status=503)
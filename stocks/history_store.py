@@ -0,0 +1,407 @@
+"""
+Local on-disk store for daily OHLCV price history.
+
+Each symbol gets a directory with one append-only binary file per column
+(date, open, high, low, close, volume). Reads memory-map the columns, so
+serving a history slice does not parse anything and only touches the
+pages that are used.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locking
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Column name -> on-disk dtype. Dates are stored as days since 1970-01-01.
+COLUMNS = (
+    ('date', np.dtype('<i8')),
+    ('open', np.dtype('<f8')),
+    ('high', np.dtype('<f8')),
+    ('low', np.dtype('<f8')),
+    ('close', np.dtype('<f8')),
+    ('volume', np.dtype('<i8')),
+)
+
+# Column name -> DataFrame column name, matching yfinance
+FRAME_COLUMNS = {'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close', 'volume': 'Volume'}
+
+_SYMBOL_RE = re.compile(r'^[A-Z0-9.\-^=]{1,20}$')
+
+
+def to_day_number(value) -> int:
+    """Convert a date or timestamp to days since the epoch"""
+    return int(np.datetime64(pd.Timestamp(value).date(), 'D').astype('<i8'))
+
+
+def to_day_numbers(index: pd.Index) -> np.ndarray:
+    """Convert a (possibly tz-aware) DatetimeIndex to days since the epoch, using its local dates"""
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.normalize().values.astype('datetime64[D]').astype('<i8')
+
+
+class PriceHistoryStore:
+    """Per-symbol append-only OHLCV columns on disk"""
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self._locks = defaultdict(threading.Lock)
+        self._locks_guard = threading.Lock()
+
+    def _symbol_dir(self, symbol: str) -> Path:
+        symbol = symbol.upper()
+        if not _SYMBOL_RE.match(symbol):
+            raise ValueError(f"Invalid symbol for history store: {symbol}")
+        return self.root / symbol
+
+    def _lock(self, symbol: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks[symbol.upper()]
+
+    def _write_locked(self, symbol: str, write):
+        """Run write while holding the per-symbol thread and file locks"""
+        directory = self._symbol_dir(symbol)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        with self._lock(symbol):
+            with open(directory / '.lock', 'a') as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    return write(directory)
+                finally:
+                    if fcntl:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _length(self, directory: Path) -> int:
+        """Number of complete rows, ignoring a partially written tail"""
+        lengths = []
+        for name, dtype in COLUMNS:
+            path = directory / f"{name}.bin"
+            lengths.append(path.stat().st_size // dtype.itemsize if path.exists() else 0)
+        return min(lengths)
+
+    def read(self, symbol: str, start: Optional[date] = None) -> Dict[str, np.ndarray]:
+        """Return memory-mapped columns for a symbol, optionally from a start date"""
+        directory = self._symbol_dir(symbol)
+        length = self._length(directory) if directory.exists() else 0
+        if length == 0:
+            return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS}
+
+        columns = {
+            name: np.memmap(directory / f"{name}.bin", dtype=dtype, mode='r', shape=(length,))
+            for name, dtype in COLUMNS
+        }
+        if start is not None:
+            offset = int(np.searchsorted(columns['date'], to_day_number(start)))
+            columns = {name: values[offset:] for name, values in columns.items()}
+        return columns
+
+    def read_frame(self, symbol: str, start: Optional[date] = None) -> pd.DataFrame:
+        """Return stored history as a DataFrame shaped like yfinance's output"""
+        return self.to_frame(self.read(symbol, start))
+
+    @staticmethod
+    def to_frame(columns: Dict[str, np.ndarray]) -> pd.DataFrame:
+        index = pd.DatetimeIndex(np.asarray(columns['date']).astype('datetime64[D]'), name='Date')
+        return pd.DataFrame(
+            {FRAME_COLUMNS[name]: np.asarray(columns[name]) for name in FRAME_COLUMNS},
+            index=index,
+        )
+
+    def date_range(self, symbol: str) -> Optional[tuple]:
+        """Return (first, last) stored dates, or None if nothing is stored"""
+        dates = self.read(symbol)['date']
+        if len(dates) == 0:
+            return None
+        first, last = np.asarray(dates[[0, -1]]).astype('datetime64[D]').tolist()
+        return first, last
+
+    def append(self, symbol: str, bars: pd.DataFrame, before: Optional[date] = None) -> int:
+        """
+        Append daily bars newer than the last stored bar.
+
+        Bars on or after before (usually today, whose bar is not final yet)
+        are skipped. Returns the number of rows written.
+        """
+        if bars is None or bars.empty:
+            return 0
+
+        days = to_day_numbers(bars.index)
+        keep = np.ones(len(days), dtype=bool)
+        if before is not None:
+            keep &= days < to_day_number(before)
+
+        def write(directory: Path) -> int:
+            length = self._length(directory)
+            mask = keep
+            if length:
+                last_day = np.memmap(directory / 'date.bin', dtype='<i8', mode='r', shape=(length,))[-1]
+                mask = mask & (days > last_day)
+            if not mask.any():
+                return 0
+
+            values = {
+                'date': days[mask],
+                'open': bars['Open'].to_numpy(dtype='<f8')[mask],
+                'high': bars['High'].to_numpy(dtype='<f8')[mask],
+                'low': bars['Low'].to_numpy(dtype='<f8')[mask],
+                'close': bars['Close'].to_numpy(dtype='<f8')[mask],
+                'volume': np.nan_to_num(bars['Volume'].to_numpy(dtype='<f8')[mask]).astype('<i8'),
+            }
+            for name, dtype in COLUMNS:
+                path = directory / f"{name}.bin"
+                with open(path, 'r+b' if path.exists() else 'wb') as f:
+                    # Drop any partially written tail before appending
+                    f.truncate(length * dtype.itemsize)
+                    f.seek(0, os.SEEK_END)
+                    f.write(values[name].astype(dtype).tobytes())
+            return int(mask.sum())
+
+        return self._write_locked(symbol, write)
+
+    def merge(self, symbol: str, bars: pd.DataFrame, before: Optional[date] = None) -> int:
+        """Insert bars anywhere in the series (e.g. an older backfill) and rewrite it"""
+        if bars is None or bars.empty:
+            return 0
+        days = to_day_numbers(bars.index)
+        if before is not None:
+            bars, days = bars[days < to_day_number(before)], days[days < to_day_number(before)]
+        bars = bars[list(FRAME_COLUMNS.values())].set_axis(
+            pd.DatetimeIndex(days.astype('datetime64[D]'), name='Date'), axis=0
+        )
+        return self.compact(symbol, extra=bars)
+
+    def compact(self, symbol: str, extra: Optional[pd.DataFrame] = None) -> int:
+        """
+        Sort, de-duplicate and rewrite a symbol's columns atomically.
+
+        Rows in extra are merged in; stored rows win on duplicate dates.
+        Returns the change in row count.
+        """
+        def write(directory: Path) -> int:
+            length = self._length(directory)
+            data = self.read_frame(symbol).copy()
+            if extra is not None:
+                data = pd.concat([extra, data])
+            data = data.dropna(subset=['Close'])
+            days = to_day_numbers(data.index)
+
+            # Sort by date and keep the last row for each day
+            order = np.argsort(days, kind='stable')
+            days = days[order]
+            keep = np.append(days[1:] != days[:-1], True) if len(days) else np.empty(0, dtype=bool)
+
+            values = {'date': days[keep]}
+            for name, column in FRAME_COLUMNS.items():
+                values[name] = data[column].to_numpy(dtype='<f8')[order][keep]
+            values['volume'] = np.nan_to_num(values['volume']).astype('<i8')
+
+            for name, dtype in COLUMNS:
+                tmp_path = directory / f"{name}.bin.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(values[name].astype(dtype).tobytes())
+                os.replace(tmp_path, directory / f"{name}.bin")
+            return len(values['date']) - length
+
+        return self._write_locked(symbol, write)
+
+    def get_meta(self, symbol: str) -> Dict:
+        path = self._symbol_dir(symbol) / 'meta.json'
+        try:
+            return json.loads(path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def set_meta(self, symbol: str, **values):
+        directory = self._symbol_dir(symbol)
+        directory.mkdir(parents=True, exist_ok=True)
+        meta = self.get_meta(symbol)
+        meta.update(values)
+        tmp_path = directory / 'meta.json.tmp'
+        tmp_path.write_text(json.dumps(meta))
+        os.replace(tmp_path, directory / 'meta.json')
+
+    def symbols(self) -> List[str]:
+        """Symbols that have a directory in the store"""
+        if not self.root.exists():
+            return []
+        return sorted(path.name for path in self.root.iterdir() if path.is_dir())
+
+
+_PERIOD_RE = re.compile(r'^(\d+)(d|wk|mo|y)$')
+
+
+def period_start(period: str, today: date) -> Optional[date]:
+    """
+    Translate a yfinance period string ('7d', '1mo', '5y', 'ytd', 'max')
+    into the first calendar date it covers. Returns None for 'max'.
+    """
+    if period == 'max':
+        return None
+    if period == 'ytd':
+        return date(today.year, 1, 1)
+
+    match = _PERIOD_RE.match(period)
+    if not match:
+        raise ValueError(f"Unsupported history period: {period}")
+
+    count, unit = int(match.group(1)), match.group(2)
+    offsets = {
+        'd': pd.DateOffset(days=count),
+        'wk': pd.DateOffset(weeks=count),
+        'mo': pd.DateOffset(months=count),
+        'y': pd.DateOffset(years=count),
+    }
+    return (pd.Timestamp(today) - offsets[unit]).date()
+
+
+class HistorySeriesCache:
+    """
+    In-process cache holding one widest series per (symbol, interval).
+
+    Narrower periods are served as slices of the held frame rather than
+    cached separately, so the same bars are kept in memory only once.
+    Entries are evicted when either max_entries or the max_bytes budget
+    (measured with DataFrame.memory_usage) is exceeded, least recently
+    ('lru') or least frequently ('lfu') used first.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: int = 900,
+                 max_bytes: Optional[int] = None, policy: str = 'lru'):
+        if policy not in ('lru', 'lfu'):
+            raise ValueError(f"Unsupported eviction policy: {policy}")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self._entries: 'OrderedDict[tuple, dict]' = OrderedDict()
+        self._bytes = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def covers(held_start: Optional[date], start: Optional[date]) -> bool:
+        """True if a series starting at held_start includes everything from start (None = all history)"""
+        if held_start is None:
+            return True
+        return start is not None and held_start <= start
+
+    @staticmethod
+    def slice(frame: pd.DataFrame, start: Optional[date]) -> pd.DataFrame:
+        """Return the rows from start onwards as a slice of frame"""
+        if start is None or frame.empty:
+            return frame
+        boundary = pd.Timestamp(start)
+        if frame.index.tz is not None:
+            boundary = boundary.tz_localize(frame.index.tz)
+        offset = int(frame.index.searchsorted(boundary))
+        if offset >= len(frame):
+            # e.g. '1d' on a weekend: serve the latest bar
+            offset = len(frame) - 1
+        return frame.iloc[offset:]
+
+    def peek(self, symbol: str, interval: str) -> Optional[dict]:
+        """Return the held entry for a series even if it has expired"""
+        with self._lock:
+            return self._entries.get((symbol.upper(), interval))
+
+    def get(self, symbol: str, interval: str, start: Optional[date]) -> Optional[pd.DataFrame]:
+        """Return the requested range if a fresh held series covers it"""
+        key = (symbol.upper(), interval)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry['fetched_at'] > self.ttl:
+                return None
+            if not self.covers(entry['start'], start):
+                return None
+            self._entries.move_to_end(key)
+            entry['hits'] += 1
+        return self.slice(entry['frame'], start)
+
+    def put(self, symbol: str, interval: str, start: Optional[date], frame: pd.DataFrame,
+            fetched_at: Optional[float] = None):
+        """Hold frame as the widest series for (symbol, interval)"""
+        key = (symbol.upper(), interval)
+        size = int(frame.memory_usage(index=True, deep=True).sum())
+        if self.max_bytes is not None and size > self.max_bytes:
+            logger.warning(f"Not caching {interval} history for {symbol}: {size} bytes exceeds the budget")
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous['bytes']
+            self._entries[key] = {
+                'start': start,
+                'frame': frame,
+                'fetched_at': fetched_at if fetched_at is not None else time.time(),
+                'bytes': size,
+                'hits': 0,
+            }
+            self._bytes += size
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                self._evict(protect=key)
+
+    def _evict(self, protect: tuple):
+        """Drop one entry other than protect, by the eviction policy (caller holds the lock)"""
+        candidates = (key for key in self._entries if key != protect)
+        if self.policy == 'lru':
+            victim = next(candidates)
+        else:
+            # Least frequently used, ties going to the least recently used
+            victim = min(candidates, key=lambda key: self._entries[key]['hits'])
+        self._bytes -= self._entries.pop(victim)['bytes']
+        self._evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Return held bytes, entry count and evictions"""
+        with self._lock:
+            return {'bytes': self._bytes, 'entries': len(self._entries), 'evictions': self._evictions}
+
+    def export(self) -> List[tuple]:
+        """Return (symbol, interval, start, frame, fetched_at) for every unexpired series"""
+        now = time.time()
+        with self._lock:
+            return [
+                (symbol, interval, entry['start'], entry['frame'], entry['fetched_at'])
+                for (symbol, interval), entry in self._entries.items()
+                if now - entry['fetched_at'] <= self.ttl
+            ]
+
+    def restore(self, entries: List[tuple]) -> int:
+        """Put back series from export(), skipping expired ones and keeping newer held ones"""
+        now = time.time()
+        restored = 0
+        for symbol, interval, start, frame, fetched_at in entries:
+            if now - fetched_at > self.ttl:
+                continue
+            held = self.peek(symbol, interval)
+            if held is not None and held['fetched_at'] >= fetched_at:
+                continue
+            self.put(symbol, interval, start, frame, fetched_at)
+            restored += 1
+        return restored
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
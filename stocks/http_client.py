@@ -0,0 +1,58 @@
+"""
+Shared HTTP session for the REST-based stock data providers.
+"""
+import logging
+import threading
+from typing import Optional
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def _adapter(pool_size: int, api_settings: dict) -> HTTPAdapter:
+    retry = Retry(
+        total=api_settings.get('HTTP_RETRIES', 2),
+        backoff_factor=api_settings.get('HTTP_BACKOFF', 0.5),
+        # 429 is left to the providers, which report it to the rate limiter
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset(['GET']),
+        raise_on_status=False,
+    )
+    return HTTPAdapter(
+        pool_connections=api_settings.get('HTTP_POOL_CONNECTIONS', 10),
+        pool_maxsize=pool_size,
+        max_retries=retry,
+    )
+
+
+def get_http_session() -> requests.Session:
+    """
+    Return the process-wide pooled session.
+
+    Connections are kept alive and reused per host. Each host gets a pool
+    of HTTP_POOL_MAXSIZE connections unless HTTP_POOL_SIZES overrides it,
+    and idempotent requests are retried with exponential backoff on
+    connection errors and 5xx responses.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            api_settings = getattr(settings, 'STOCK_API_SETTINGS', {})
+            session = requests.Session()
+            session.headers.update({'Content-Type': 'application/json'})
+
+            default_adapter = _adapter(api_settings.get('HTTP_POOL_MAXSIZE', 10), api_settings)
+            session.mount('https://', default_adapter)
+            session.mount('http://', default_adapter)
+            for host, pool_size in api_settings.get('HTTP_POOL_SIZES', {}).items():
+                session.mount(f'https://{host}/', _adapter(pool_size, api_settings))
+
+            _session = session
+        return _session
@@ -0,0 +1,176 @@
+"""
+Trade ledger: records buys and sells and keeps Position rows in step with them.
+
+Tax lots (stocks.tax_lots) are folded in with each trade as well.
+
+Positions use the average-cost method. A buy adds its notional to the
+cost basis; a sell removes the average cost of the shares sold and books
+the difference to the sale proceeds as realized P&L.
+"""
+import logging
+from dataclasses import dataclass, field
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict, Iterable, List, Optional
+
+from django.db import transaction
+
+from .models import Position, Transaction
+from .tax_lots import check_lot_selection, default_lot_method, sync_lots
+
+logger = logging.getLogger(__name__)
+
+CENT = Decimal('0.01')
+POSITION_FIELDS = ('quantity', 'cost_basis', 'realized_pnl', 'last_transaction_id')
+
+
+class InsufficientShares(ValueError):
+    """A sell asked for more shares than the position holds"""
+
+
+@dataclass
+class PositionState:
+    """Position figures as replayed from transactions"""
+    stock_name: str = ''
+    quantity: int = 0
+    cost_basis: Decimal = field(default_factory=lambda: Decimal('0'))
+    realized_pnl: Decimal = field(default_factory=lambda: Decimal('0'))
+    last_transaction_id: Optional[int] = None
+
+
+def _money(value: Decimal) -> Decimal:
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def apply_trade(state, trade: Transaction):
+    """
+    Apply one transaction to a Position or PositionState in place.
+
+    Raises InsufficientShares when a sell exceeds the held quantity.
+    """
+    if trade.type == 'BUY':
+        state.quantity += trade.quantity
+        state.cost_basis = _money(state.cost_basis + trade.price * trade.quantity)
+    elif trade.type == 'SELL':
+        if trade.quantity > state.quantity:
+            raise InsufficientShares(
+                f"Cannot sell {trade.quantity} {trade.stock_symbol}: only {state.quantity} held"
+            )
+        # Remaining shares keep their average cost; rounding stays in the sold part
+        remaining = state.quantity - trade.quantity
+        remaining_cost = _money(state.cost_basis * remaining / state.quantity)
+        sold_cost = state.cost_basis - remaining_cost
+        state.realized_pnl = _money(state.realized_pnl + trade.price * trade.quantity - sold_cost)
+        state.quantity = remaining
+        state.cost_basis = remaining_cost
+    state.stock_name = trade.stock_name or state.stock_name
+    state.last_transaction_id = trade.id
+
+
+def replay(trades: Iterable[Transaction],
+           states: Optional[Dict[str, PositionState]] = None) -> Dict[str, PositionState]:
+    """
+    Fold transactions (oldest first) into positions per symbol.
+
+    Pass the states of an earlier replay to continue it. Sells beyond the
+    held quantity, which the old sell view allowed, are clamped to what is
+    held and logged.
+    """
+    states = {} if states is None else states
+    for trade in trades:
+        state = states.setdefault(trade.stock_symbol, PositionState())
+        if trade.type == 'SELL' and trade.quantity > state.quantity:
+            logger.warning(f"Transaction {trade.id} sells {trade.quantity} {trade.stock_symbol} "
+                           f"with only {state.quantity} held; clamping")
+            trade = Transaction(id=trade.id, stock_symbol=trade.stock_symbol, stock_name=trade.stock_name,
+                                quantity=state.quantity, price=trade.price, type='SELL')
+            if not trade.quantity:
+                state.last_transaction_id = trade.id
+                continue
+        apply_trade(state, trade)
+    return states
+
+
+def record_trade(user, stock, trade_type: str, quantity: int, price: Decimal,
+                 lot_method: str = '', lot_selection: Optional[List[int]] = None) -> Transaction:
+    """
+    Record a trade and update the user's position and tax lots in one database transaction.
+
+    The position row is locked (SELECT ... FOR UPDATE where supported), so
+    concurrent trades on the same symbol apply one after the other. Sells
+    close lots by lot_method, defaulting to the user's preference; a
+    'SPECIFIC' sell closes the buys listed in lot_selection.
+    """
+    with transaction.atomic():
+        position, _ = Position.objects.select_for_update().get_or_create(
+            user=user,
+            stock_symbol=stock.ticker,
+            defaults={'stock_name': stock.name},
+        )
+        if trade_type == 'SELL' and quantity > position.quantity:
+            raise InsufficientShares(f"Cannot sell {quantity} {stock.ticker}: only {position.quantity} held")
+
+        lot_selection = lot_selection or []
+        if trade_type == 'SELL':
+            lot_method = lot_method or default_lot_method(user)
+            if lot_method == 'SPECIFIC':
+                lot_selection = check_lot_selection(user, stock.ticker, quantity, lot_selection)
+        else:
+            lot_method, lot_selection = '', []
+
+        trade = Transaction.objects.create(
+            user=user,
+            stock_symbol=stock.ticker,
+            stock_name=stock.name,
+            quantity=quantity,
+            price=price,
+            type=trade_type,
+            lot_method=lot_method,
+            lot_selection=lot_selection,
+        )
+        apply_trade(position, trade)
+        position.save()
+        sync_lots(user)
+    return trade
+
+
+def user_trades(user):
+    return Transaction.objects.filter(user=user).order_by('date', 'id')
+
+
+def diff_positions(user) -> List[str]:
+    """Describe every difference between stored positions and a replay of the ledger"""
+    expected = replay(user_trades(user))
+    stored = {position.stock_symbol: position for position in Position.objects.filter(user=user)}
+    problems = []
+    for symbol in sorted(set(expected) | set(stored)):
+        state, position = expected.get(symbol), stored.get(symbol)
+        if position is None:
+            problems.append(f"{symbol}: missing position")
+            continue
+        if state is None:
+            problems.append(f"{symbol}: position without transactions")
+            continue
+        for name in POSITION_FIELDS:
+            if getattr(position, name) != getattr(state, name):
+                problems.append(f"{symbol}: {name} is {getattr(position, name)}, ledger says {getattr(state, name)}")
+    return problems
+
+
+def rebuild_positions(user) -> int:
+    """Replace the user's positions with a replay of their transactions"""
+    states = replay(user_trades(user))
+    with transaction.atomic():
+        Position.objects.filter(user=user).exclude(stock_symbol__in=list(states)).delete()
+        for symbol, state in states.items():
+            Position.objects.update_or_create(
+                user=user,
+                stock_symbol=symbol,
+                defaults={
+                    'stock_name': state.stock_name,
+                    'quantity': state.quantity,
+                    'cost_basis': state.cost_basis,
+                    'realized_pnl': state.realized_pnl,
+                    'last_transaction_id': state.last_transaction_id,
+                },
+            )
+    return len(states)
@@ -0,0 +1,91 @@
+"""
+Django management command to backfill and compact the local price history store.
+"""
+import shutil
+from django.core.management.base import BaseCommand
+from stocks.models import Stocks
+from stocks.services import stock_service
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Backfill daily OHLCV history into the local store and compact it'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--symbols',
+            nargs='+',
+            type=str,
+            help='Specific stock symbols to backfill (defaults to all active stocks)',
+            default=None
+        )
+        parser.add_argument(
+            '--period',
+            type=str,
+            default='5y',
+            help='History period to cover, e.g. 1y, 5y or max',
+        )
+        parser.add_argument(
+            '--compact',
+            action='store_true',
+            help='Sort and de-duplicate the stored columns after backfilling',
+        )
+        parser.add_argument(
+            '--compact-only',
+            action='store_true',
+            help='Only compact what is already stored, without fetching',
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Discard stored history first (e.g. after a split changed adjusted prices)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Number of concurrent fetch threads (defaults to MAX_WORKERS)',
+        )
+
+    def handle(self, *args, **options):
+        """Main command handler"""
+        store = stock_service.history_store
+
+        if options['symbols']:
+            symbols = sorted({symbol.upper() for symbol in options['symbols']})
+        elif options['compact_only']:
+            symbols = store.symbols()
+        else:
+            symbols = list(Stocks.objects.filter(is_active=True).values_list('ticker', flat=True))
+
+        self.stdout.write(f'Processing {len(symbols)} symbols in {store.root}...')
+
+        if options['rebuild']:
+            for symbol in symbols:
+                shutil.rmtree(store.root / symbol, ignore_errors=True)
+
+        if not options['compact_only']:
+            spans = stock_service.backfill_history(symbols, options['period'], options['workers'])
+
+            for symbol in symbols:
+                span = spans.get(symbol)
+                if span:
+                    rows = len(store.read(symbol)['date'])
+                    self.stdout.write(
+                        self.style.SUCCESS(f'  ✓ {symbol}: {rows} bars, {span[0]} to {span[1]}')
+                    )
+                else:
+                    self.stdout.write(self.style.ERROR(f'  ✗ {symbol}: No history stored'))
+
+        if options['compact'] or options['compact_only']:
+            removed = 0
+            for symbol in symbols:
+                try:
+                    removed -= store.compact(symbol)
+                except Exception as e:
+                    self.stdout.write(self.style.ERROR(f'  ✗ {symbol}: Compaction failed - {str(e)}'))
+                    logger.error(f'Error compacting history for {symbol}: {str(e)}')
+            self.stdout.write(self.style.SUCCESS(f'Compaction removed {removed} duplicate bars'))
+
+        self.stdout.write('\n' + self.style.SUCCESS('History backfill completed!'))
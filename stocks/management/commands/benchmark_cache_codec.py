@@ -0,0 +1,92 @@
+"""
+Django management command to compare the binary cache codecs with pickle.
+"""
+import pickle
+import time
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+from stocks.codecs import decode_columns, decode_frame, decode_quote, encode_frame, encode_quote
+from stocks.providers import quote_from_bars
+from stocks.services import stock_service
+
+class Command(BaseCommand):
+    help = 'Benchmark encode/decode time and size of cached quotes and history: pickle vs binary codec'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=10000,
+            help='Encode/decode round trips per quote measurement (history uses a tenth)',
+        )
+        parser.add_argument(
+            '--symbol',
+            type=str,
+            default=None,
+            help='Benchmark history stored locally for this symbol instead of synthetic bars',
+        )
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=1260,
+            help='Number of synthetic daily bars (about 5 years)',
+        )
+
+    def handle(self, *args, **options):
+        """Main command handler"""
+        history = self._history(options['symbol'], options['rows'])
+        quote = quote_from_bars('BENCH', history.tail(5))
+        fetched_at = time.time()
+        quote_iterations = max(options['iterations'], 1)
+        history_iterations = max(quote_iterations // 10, 1)
+
+        self.stdout.write(f'{"payload":<10} {"format":<8} {"bytes":>10} {"encode µs":>12} {"decode µs":>12}')
+
+        envelope = {'data': quote, 'fetched_at': fetched_at}
+        self._report('quote', 'pickle', quote_iterations,
+                     lambda: pickle.dumps(envelope, pickle.HIGHEST_PROTOCOL), pickle.loads)
+        self._report('quote', 'struct', quote_iterations,
+                     lambda: encode_quote(quote, fetched_at), decode_quote)
+
+        self._report('history', 'pickle', history_iterations,
+                     lambda: pickle.dumps(history, pickle.HIGHEST_PROTOCOL), pickle.loads)
+        self._report('history', 'columns', history_iterations,
+                     lambda: encode_frame(history), decode_frame)
+        self._report('history', 'arrays', history_iterations,
+                     lambda: encode_frame(history), decode_columns)
+
+        self.stdout.write('\n' + self.style.SUCCESS(f'Benchmark completed ({len(history)} history rows)'))
+
+    def _history(self, symbol, rows) -> pd.DataFrame:
+        if symbol:
+            frame = stock_service.history_store.read_frame(symbol.upper())
+            if not frame.empty:
+                return frame
+            self.stdout.write(self.style.WARNING(f'No stored history for {symbol}, using synthetic bars'))
+
+        rng = np.random.default_rng(0)
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, rows)))
+        return pd.DataFrame(
+            {
+                'Open': close * 0.995,
+                'High': close * 1.01,
+                'Low': close * 0.99,
+                'Close': close,
+                'Volume': rng.integers(1_000_000, 50_000_000, rows),
+            },
+            index=pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=rows, name='Date'),
+        )
+
+    def _report(self, payload, name, iterations, encode, decode):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            encoded = encode()
+        encode_time = (time.perf_counter() - start) / iterations * 1e6
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            decode(encoded)
+        decode_time = (time.perf_counter() - start) / iterations * 1e6
+
+        self.stdout.write(f'{payload:<10} {name:<8} {len(encoded):>10} {encode_time:>12.2f} {decode_time:>12.2f}')
@@ -32,6 +32,12 @@ class Command(BaseCommand):
             default=50,
             help='Number of stocks to process in each batch',
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Number of concurrent fetch threads (defaults to MAX_WORKERS)',
+        )
 
     def handle(self, *args, **options):
         """Main command handler"""
@@ -77,6 +83,14 @@ class Command(BaseCommand):
             batch = symbols_to_process[i:i + batch_size]
             self.stdout.write(f'Processing batch {i//batch_size + 1}: {", ".join(batch)}')
             
+            # Fetch every new symbol of the batch concurrently before writing
+            existing = set(Stocks.objects.filter(ticker__in=batch).values_list('ticker', flat=True))
+            batch_data = stock_service.get_multiple_stocks(
+                [symbol for symbol in batch if symbol not in existing],
+                max_workers=options['workers'],
+                full_details=True,
+            )
+            
             try:
                 with transaction.atomic():
                     for symbol in batch:
@@ -89,8 +103,7 @@ class Command(BaseCommand):
                                 skipped_count += 1
                                 continue
                             
-                            # Fetch stock data
-                            stock_data = stock_service.get_stock_data(symbol)
+                            stock_data = batch_data.get(symbol)
                             
                             if stock_data:
                                 # Create stock record
@@ -0,0 +1,56 @@
+"""
+Django management command to reconcile materialized positions with the transaction ledger.
+"""
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from stocks.ledger import diff_positions, rebuild_positions
+from stocks.models import Position, Transaction
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Rebuild positions from transactions, or with --verify only report where they differ'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            nargs='+',
+            type=str,
+            help='Usernames to process (defaults to everyone with transactions or positions)',
+            default=None
+        )
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Compare positions with a replay of the ledger without changing anything',
+        )
+
+    def handle(self, *args, **options):
+        """Main command handler"""
+        if options['users']:
+            users = User.objects.filter(username__in=options['users'])
+        else:
+            user_ids = set(Transaction.objects.values_list('user_id', flat=True))
+            user_ids.update(Position.objects.values_list('user_id', flat=True))
+            users = User.objects.filter(id__in=user_ids)
+
+        mismatched = 0
+        for user in users.order_by('username'):
+            problems = diff_positions(user)
+            if not problems:
+                self.stdout.write(self.style.SUCCESS(f'  ✓ {user.username}: positions match the ledger'))
+                continue
+
+            mismatched += 1
+            for problem in problems:
+                self.stdout.write(self.style.ERROR(f'  ✗ {user.username}: {problem}'))
+            if not options['verify']:
+                count = rebuild_positions(user)
+                self.stdout.write(self.style.SUCCESS(f'  ✓ {user.username}: rebuilt {count} positions'))
+
+        if options['verify']:
+            summary = f'{mismatched} of {users.count()} users have positions that differ from the ledger'
+            self.stdout.write('\n' + (self.style.ERROR(summary) if mismatched else self.style.SUCCESS(summary)))
+        else:
+            self.stdout.write('\n' + self.style.SUCCESS(f'Rebuilt positions for {mismatched} of {users.count()} users'))
@@ -0,0 +1,47 @@
+"""
+Django management command to rebuild tax lots and realized gains from the transaction ledger.
+"""
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from stocks.models import Transaction
+from stocks.tax_lots import rebuild_lots, sync_lots
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Fold new transactions into tax lots, or with --rebuild recompute them from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            nargs='+',
+            type=str,
+            help='Usernames to process (defaults to everyone with transactions)',
+            default=None
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Discard existing lots and gains and replay every transaction',
+        )
+
+    def handle(self, *args, **options):
+        """Main command handler"""
+        if options['users']:
+            users = User.objects.filter(username__in=options['users'])
+        else:
+            users = User.objects.filter(id__in=Transaction.objects.values_list('user_id', flat=True))
+
+        folded = 0
+        for user in users.order_by('username'):
+            try:
+                count = rebuild_lots(user) if options['rebuild'] else sync_lots(user)
+            except Exception as e:
+                logger.error(f"Error building tax lots for {user.username}: {str(e)}")
+                self.stdout.write(self.style.ERROR(f'  ✗ {user.username}: {str(e)}'))
+                continue
+            folded += count
+            self.stdout.write(self.style.SUCCESS(f'  ✓ {user.username}: {count} transactions folded'))
+
+        self.stdout.write('\n' + self.style.SUCCESS(f'Folded {folded} transactions for {users.count()} users'))
@@ -0,0 +1,83 @@
+"""
+Django management command that keeps quotes and stored prices fresh in the background.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from stocks.refresher import PriceRefresher
+from stocks.services import stock_service
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Continuously refresh quotes and Stocks.curr_price, most demanded symbols first'
+
+    def add_arguments(self, parser):
+        api_settings = getattr(settings, 'STOCK_API_SETTINGS', {})
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run a single refresh pass and exit',
+        )
+        parser.add_argument(
+            '--min-interval',
+            type=int,
+            default=api_settings.get('REFRESH_MIN_INTERVAL', 60),
+            help='Seconds between refreshes of the most demanded symbol',
+        )
+        parser.add_argument(
+            '--max-interval',
+            type=int,
+            default=api_settings.get('REFRESH_MAX_INTERVAL', 900),
+            help='Seconds between refreshes of symbols nobody holds, watches or has alerts on',
+        )
+        parser.add_argument(
+            '--max-per-pass',
+            type=int,
+            default=api_settings.get('REFRESH_MAX_PER_PASS', 200),
+            help='Most symbols fetched in one pass',
+        )
+        parser.add_argument(
+            '--poll',
+            type=float,
+            default=5.0,
+            help='Longest sleep between passes in seconds',
+        )
+
+    def handle(self, *args, **options):
+        """Main command handler"""
+        api_settings = getattr(settings, 'STOCK_API_SETTINGS', {})
+        # The refresher is the one writer of the shared quote board; web workers only read it
+        stock_service.publish_quotes = True
+        refresher = PriceRefresher(
+            stock_service,
+            min_interval=options['min_interval'],
+            max_interval=options['max_interval'],
+            max_per_pass=options['max_per_pass'],
+            demand_refresh=api_settings.get('REFRESH_DEMAND_INTERVAL', 300),
+            weights=api_settings.get('REFRESH_DEMAND_WEIGHTS'),
+        )
+
+        demand = refresher.demand()
+        hot = sorted(demand, key=lambda symbol: -demand[symbol])[:5]
+        self.stdout.write(f'Refreshing {len(demand)} symbols (most demanded: {", ".join(hot) or "none"})')
+
+        if options['once']:
+            self._report(refresher.run_once())
+            return
+
+        try:
+            refresher.run_forever(options['poll'], on_pass=self._report)
+        except KeyboardInterrupt:
+            self.stdout.write('\n' + self.style.SUCCESS('Price refresher stopped'))
+
+    def _report(self, stats):
+        if not stats['due']:
+            return
+        line = (f'Refreshed {stats["refreshed"]} of {stats["due"]} due symbols '
+                f'({stats["failed"]} failed, {stats["skipped"]} skipped, '
+                f'{stats["persisted"]} prices saved) in {stats["elapsed"]:.1f}s')
+        if stats['failed']:
+            self.stdout.write(self.style.WARNING(line))
+        else:
+            self.stdout.write(self.style.SUCCESS(line))
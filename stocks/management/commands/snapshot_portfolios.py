@@ -0,0 +1,83 @@
+"""
+Django management command to record end-of-day portfolio snapshots.
+"""
+from datetime import date
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from stocks.market_hours import MarketCalendar
+from stocks.models import Transaction
+from stocks.services import market_policy, price_history_store
+from stocks.snapshots import backfill_snapshots, take_snapshots
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Snapshot every portfolio at the last close, or with --backfill rebuild missing days from the ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            type=str,
+            help='Trading day to snapshot, or last day to backfill (YYYY-MM-DD, defaults to the last close)',
+            default=None
+        )
+        parser.add_argument(
+            '--backfill',
+            action='store_true',
+            help='Create missing snapshots from transactions and stored price history',
+        )
+        parser.add_argument(
+            '--since',
+            type=str,
+            help='First day to backfill (YYYY-MM-DD, defaults to each user\'s first trade)',
+            default=None
+        )
+        parser.add_argument(
+            '--users',
+            nargs='+',
+            type=str,
+            help='Usernames to process (defaults to everyone)',
+            default=None
+        )
+
+    def handle(self, *args, **options):
+        """Main command handler"""
+        if market_policy:
+            calendar = market_policy.calendar
+        else:
+            api_settings = getattr(settings, 'STOCK_API_SETTINGS', {})
+            calendar = MarketCalendar(api_settings.get('MARKET_TIMEZONE', 'America/New_York'),
+                                      api_settings.get('MARKET_HOLIDAYS', ()))
+        try:
+            day = date.fromisoformat(options['date']) if options['date'] else calendar.last_close().date()
+            since = date.fromisoformat(options['since']) if options['since'] else None
+        except ValueError as e:
+            raise CommandError(f'Invalid date: {str(e)}')
+
+        if price_history_store is None:
+            self.stdout.write(self.style.WARNING('No price history store; valuing at stored and last traded prices'))
+
+        users = User.objects.filter(username__in=options['users']) if options['users'] else None
+
+        if not options['backfill']:
+            user_ids = list(users.values_list('id', flat=True)) if users is not None else None
+            count = take_snapshots(day, price_history_store, user_ids)
+            self.stdout.write(self.style.SUCCESS(f'Wrote {count} portfolio snapshots for {day}'))
+            return
+
+        if users is None:
+            users = User.objects.filter(id__in=Transaction.objects.values_list('user_id', flat=True))
+        created = 0
+        for user in users.order_by('username'):
+            try:
+                count = backfill_snapshots(user, price_history_store, calendar, end=day, start=since)
+            except Exception as e:
+                logger.error(f"Error backfilling snapshots for {user.username}: {str(e)}")
+                self.stdout.write(self.style.ERROR(f'  ✗ {user.username}: {str(e)}'))
+                continue
+            created += count
+            self.stdout.write(self.style.SUCCESS(f'  ✓ {user.username}: {count} days added'))
+
+        self.stdout.write('\n' + self.style.SUCCESS(f'Backfilled {created} snapshots through {day}'))
@@ -0,0 +1,77 @@
+"""
+Django management command to preload the stock data cache before serving traffic.
+"""
+from django.core.management.base import BaseCommand
+from stocks.models import Stocks
+from stocks.services import refresh_executor, stock_service
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Fetch quotes for all active stocks and write the cache snapshot that workers load on startup'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--symbols',
+            nargs='+',
+            type=str,
+            help='Specific stock symbols to warm (defaults to all active stocks)',
+            default=None
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Number of concurrent fetch threads (defaults to MAX_WORKERS)',
+        )
+        parser.add_argument(
+            '--skip-fundamentals',
+            action='store_true',
+            help='Only warm quotes and sparklines, leaving company data to be fetched lazily',
+        )
+        parser.add_argument(
+            '--history',
+            type=str,
+            default=None,
+            help='Also warm daily history for this period, e.g. 1mo or 1y',
+        )
+
+    def handle(self, *args, **options):
+        """Main command handler"""
+        if options['symbols']:
+            symbols = sorted({symbol.upper() for symbol in options['symbols']})
+        else:
+            symbols = list(Stocks.objects.filter(is_active=True).values_list('ticker', flat=True))
+
+        self.stdout.write(f'Warming cache for {len(symbols)} stocks...')
+
+        data = stock_service.get_multiple_stocks(
+            symbols,
+            max_workers=options['workers'],
+            full_details=not options['skip_fundamentals'],
+            refresh=True,
+        )
+
+        for symbol in symbols:
+            if symbol in data:
+                self.stdout.write(self.style.SUCCESS(f'  ✓ {symbol}: ${data[symbol]["current_price"]}'))
+            else:
+                self.stdout.write(self.style.ERROR(f'  ✗ {symbol}: No data available'))
+
+        if options['history']:
+            warmed = stock_service.fetch_concurrently(
+                [symbol for symbol in symbols if symbol in data],
+                lambda symbol: stock_service.get_stock_history(symbol, period=options['history']) is not None,
+                options['workers'],
+            )
+            self.stdout.write(f'Warmed {options["history"]} history for {len(warmed)} stocks')
+
+        # Let background sparkline refreshes land before snapshotting
+        refresh_executor.shutdown(wait=True)
+
+        saved = stock_service.save_cache_snapshot()
+        self.stdout.write(
+            '\n' + self.style.SUCCESS(f'Cache warmed: {len(data)} of {len(symbols)} stocks, '
+                                      f'{saved} entries written to {stock_service.snapshot.path}')
+        )
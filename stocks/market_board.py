@@ -0,0 +1,108 @@
+"""
+Market-wide lists for the home page, computed once per refresh cycle.
+"""
+import logging
+import time
+from typing import Any, Dict
+
+from django.db import connections
+
+from .models import Stocks
+
+logger = logging.getLogger(__name__)
+
+
+class MarketBoard:
+    """
+    Trending, top-priced, gainers and losers lists shared by every user.
+
+    The lists are built together from one batch quote read and cached as a
+    single snapshot, so a page view costs one cache lookup. The snapshot
+    and its rebuild claim live in the coordination cache shared by every
+    worker, so one rebuild serves them all. A snapshot older than ttl is
+    still served while one background rebuild runs; only a cold cache
+    builds it on the request, coalesced across callers.
+    """
+
+    CACHE_KEY = 'market_board'
+    REFRESH_KEY = 'market_board_refresh'
+
+    def __init__(self, service, executor, ttl: int = 60, universe: int = 50,
+                 trending_count: int = 6, top_count: int = 4, movers_count: int = 4):
+        self.service = service
+        self.executor = executor
+        self.ttl = ttl
+        self.universe = universe
+        self.trending_count = trending_count
+        self.top_count = top_count
+        self.movers_count = movers_count
+        self.cache = service.single_flight.cache
+
+    def get(self) -> Dict[str, Any]:
+        """Return the current snapshot, building or refreshing it as needed"""
+        board = self.cache.get(self.CACHE_KEY)
+        if board is None:
+            try:
+                board = self.service.single_flight.do(self.CACHE_KEY, self.refresh, lambda: self.cache.get(self.CACHE_KEY))
+            except Exception as e:
+                logger.error(f"Market board build failed: {str(e)}")
+                return self.empty()
+            if board is None:
+                logger.warning("Market board build returned nothing; serving an empty board")
+                return self.empty()
+            return board
+
+        if time.time() - board['built_at'] > self.ttl and self.cache.add(self.REFRESH_KEY, 1, self.service.single_flight.lease_timeout):
+            self.executor.submit(self._refresh_in_background)
+        return board
+
+    @staticmethod
+    def empty() -> Dict[str, Any]:
+        """A board with no entries, served (uncached) when building one fails"""
+        return {'built_at': time.time(), 'trending': [], 'top_priced': [], 'gainers': [], 'losers': []}
+
+    def refresh(self) -> Dict[str, Any]:
+        """Build the snapshot and cache it (kept for five cycles in case rebuilds fail)"""
+        board = self.build()
+        self.cache.set(self.CACHE_KEY, board, self.ttl * 5)
+        return board
+
+    def build(self) -> Dict[str, Any]:
+        """Rank the most traded active stocks from one batch quote read"""
+        fields = ('id', 'ticker', 'name', 'sector', 'curr_price', 'volume')
+        active = Stocks.objects.filter(is_active=True)
+        by_volume = list(active.order_by('-volume').values(*fields)[:self.universe])
+        by_price = list(active.order_by('-curr_price').values(*fields)[:self.top_count])
+
+        rows = {row['ticker']: row for row in by_volume + by_price}
+        live_data = self.service.get_multiple_stocks(list(rows))
+        entries = {ticker: self._entry(row, live_data.get(ticker)) for ticker, row in rows.items()}
+
+        priced = [entries[row['ticker']] for row in by_volume if row['ticker'] in live_data]
+        movers = sorted(priced, key=lambda entry: entry['day_change_percent'], reverse=True)
+        return {
+            'built_at': time.time(),
+            'trending': [entries[row['ticker']] for row in by_volume[:self.trending_count]],
+            'top_priced': [entries[row['ticker']] for row in by_price],
+            'gainers': [entry for entry in movers if entry['day_change_percent'] > 0][:self.movers_count],
+            'losers': [entry for entry in reversed(movers) if entry['day_change_percent'] < 0][:self.movers_count],
+        }
+
+    def _entry(self, row: Dict[str, Any], stock_data) -> Dict[str, Any]:
+        entry = dict(row, day_change=0, day_change_percent=0, sparkline_prices=[])
+        if stock_data:
+            entry['curr_price'] = stock_data['current_price']
+            entry['day_change'] = stock_data.get('day_change') or 0
+            entry['day_change_percent'] = stock_data.get('day_change_percent') or 0
+            entry['sparkline_prices'] = stock_data.get('sparkline_prices', [])
+            entry['sector'] = row['sector'] or stock_data.get('sector', '')
+        return entry
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.error(f"Market board refresh failed: {str(e)}")
+        finally:
+            self.cache.delete(self.REFRESH_KEY)
+            connections.close_all()
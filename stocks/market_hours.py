@@ -0,0 +1,208 @@
+"""
+US equity market calendar and the quote freshness policy built on it.
+
+Holidays and early closes follow the NYSE rules and are computed locally,
+so no calendar service is needed. Extra closures (e.g. national days of
+mourning) can be listed in STOCK_API_SETTINGS['MARKET_HOLIDAYS'].
+"""
+import logging
+from datetime import date, datetime, time as dt_time, timedelta
+from functools import lru_cache
+from typing import Dict, Iterable, Optional
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+PRE_MARKET = 'pre_market'
+REGULAR = 'regular'
+POST_MARKET = 'post_market'
+CLOSED = 'closed'
+HOLIDAY = 'holiday'
+
+PRE_MARKET_OPEN = dt_time(4, 0)
+REGULAR_OPEN = dt_time(9, 30)
+REGULAR_CLOSE = dt_time(16, 0)
+EARLY_CLOSE = dt_time(13, 0)
+POST_MARKET_CLOSE = dt_time(20, 0)
+
+
+def _easter(year: int) -> date:
+    """Western Easter Sunday (anonymous Gregorian algorithm)"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """n-th weekday (0 = Monday) of a month; n = -1 for the last one"""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _observed(day: date) -> date:
+    """Saturday holidays are observed on Friday, Sunday holidays on Monday"""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+@lru_cache(maxsize=32)
+def nyse_holidays(year: int) -> Dict[date, str]:
+    """Full-day NYSE closures for a year"""
+    holidays = {
+        _nth_weekday(year, 1, 0, 3): "Martin Luther King Jr. Day",
+        _nth_weekday(year, 2, 0, 3): "Washington's Birthday",
+        _easter(year) - timedelta(days=2): "Good Friday",
+        _nth_weekday(year, 5, 0, -1): "Memorial Day",
+        _observed(date(year, 7, 4)): "Independence Day",
+        _nth_weekday(year, 9, 0, 1): "Labor Day",
+        _nth_weekday(year, 11, 3, 4): "Thanksgiving Day",
+        _observed(date(year, 12, 25)): "Christmas Day",
+    }
+    # NYSE does not close on Friday Dec 31 when New Year's Day is a Saturday
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:
+        holidays[_observed(new_year)] = "New Year's Day"
+    if year >= 2022:
+        holidays[_observed(date(year, 6, 19))] = "Juneteenth"
+    return holidays
+
+
+@lru_cache(maxsize=32)
+def nyse_early_closes(year: int) -> Dict[date, str]:
+    """Days the regular session ends at 13:00"""
+    early = {}
+    july_3 = date(year, 7, 3)
+    if july_3.weekday() < 5 and date(year, 7, 4).weekday() < 5:
+        early[july_3] = "Independence Day eve"
+    early[_nth_weekday(year, 11, 3, 4) + timedelta(days=1)] = "Day after Thanksgiving"
+    christmas_eve = date(year, 12, 24)
+    if christmas_eve.weekday() < 5:
+        early[christmas_eve] = "Christmas Eve"
+    return early
+
+
+class MarketCalendar:
+    """Trading sessions of a US exchange in its local time zone"""
+
+    def __init__(self, timezone: str = 'America/New_York', extra_holidays: Iterable = ()):
+        self.tz = ZoneInfo(timezone)
+        self.extra_holidays = {
+            date.fromisoformat(day) if isinstance(day, str) else day for day in extra_holidays
+        }
+
+    def local(self, moment: Optional[datetime] = None) -> datetime:
+        """Convert a datetime or epoch seconds (default now) to exchange time"""
+        if moment is None:
+            return datetime.now(self.tz)
+        if isinstance(moment, (int, float)):
+            return datetime.fromtimestamp(moment, self.tz)
+        if moment.tzinfo is None:
+            moment = moment.astimezone()
+        return moment.astimezone(self.tz)
+
+    def holiday_name(self, day: date) -> Optional[str]:
+        if day in self.extra_holidays:
+            return "Special closure"
+        return nyse_holidays(day.year).get(day)
+
+    def is_trading_day(self, day: date) -> bool:
+        return day.weekday() < 5 and self.holiday_name(day) is None
+
+    def regular_close(self, day: date) -> dt_time:
+        return EARLY_CLOSE if day in nyse_early_closes(day.year) else REGULAR_CLOSE
+
+    def state(self, moment=None) -> str:
+        """Session state at a moment: pre_market, regular, post_market, closed or holiday"""
+        now = self.local(moment)
+        day = now.date()
+        if day.weekday() >= 5:
+            return CLOSED
+        if self.holiday_name(day):
+            return HOLIDAY
+
+        clock = now.time()
+        close = self.regular_close(day)
+        if REGULAR_OPEN <= clock < close:
+            return REGULAR
+        if PRE_MARKET_OPEN <= clock < REGULAR_OPEN:
+            return PRE_MARKET
+        # Early-close days have no extended session after 17:00
+        if close <= clock < (POST_MARKET_CLOSE if close == REGULAR_CLOSE else dt_time(17, 0)):
+            return POST_MARKET
+        return CLOSED
+
+    def next_open(self, moment=None) -> datetime:
+        """Start of the next regular session strictly after moment"""
+        now = self.local(moment)
+        day = now.date()
+        if self.is_trading_day(day) and now.time() < REGULAR_OPEN:
+            return datetime.combine(day, REGULAR_OPEN, self.tz)
+        day += timedelta(days=1)
+        while not self.is_trading_day(day):
+            day += timedelta(days=1)
+        return datetime.combine(day, REGULAR_OPEN, self.tz)
+
+    def last_close(self, moment=None) -> datetime:
+        """End of the most recent regular session at or before moment"""
+        now = self.local(moment)
+        day = now.date()
+        if self.is_trading_day(day) and now.time() >= self.regular_close(day):
+            return datetime.combine(day, self.regular_close(day), self.tz)
+        day -= timedelta(days=1)
+        while not self.is_trading_day(day):
+            day -= timedelta(days=1)
+        return datetime.combine(day, self.regular_close(day), self.tz)
+
+
+class QuoteFreshnessPolicy:
+    """
+    Decide how long a quote stays fresh from the session it was fetched in.
+
+    Quotes fetched during the regular session are fresh for regular_ttl
+    seconds and during pre/post-market for extended_ttl (never past the
+    next open). Quotes fetched while the market is closed or on a holiday
+    hold the last close, so they stay fresh until the next regular open.
+    """
+
+    def __init__(self, calendar: MarketCalendar, regular_ttl: int = 60, extended_ttl: int = 300):
+        self.calendar = calendar
+        self.regular_ttl = regular_ttl
+        self.extended_ttl = extended_ttl
+
+    def fresh_until(self, fetched_at: float) -> float:
+        """Epoch time after which a quote fetched at fetched_at is stale"""
+        state = self.calendar.state(fetched_at)
+        next_open = self.calendar.next_open(fetched_at).timestamp()
+        if state == REGULAR:
+            return fetched_at + self.regular_ttl
+        if state in (PRE_MARKET, POST_MARKET):
+            return min(fetched_at + self.extended_ttl, next_open)
+        return next_open
+
+    def status(self, moment=None) -> Dict[str, str]:
+        """Current state and session boundaries, for health reporting"""
+        now = self.calendar.local(moment)
+        state = self.calendar.state(now)
+        status = {
+            'state': state,
+            'local_time': now.isoformat(),
+            'last_close': self.calendar.last_close(now).isoformat(),
+            'next_open': self.calendar.next_open(now).isoformat(),
+        }
+        if state == HOLIDAY:
+            status['holiday'] = self.calendar.holiday_name(now.date())
+        return status
@@ -0,0 +1,79 @@
+# Generated by Django 4.2.30 on 2026-10-17 22:19
+
+from decimal import Decimal, ROUND_HALF_UP
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+CENT = Decimal('0.01')
+
+
+def _money(value):
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def build_positions(apps, schema_editor):
+    """
+    Materialize positions from the existing transaction history.
+
+    A frozen copy of the average-cost replay as of this migration: buys add
+    to the cost basis, sells realize against the average cost and keep the
+    rounding in the sold part, and sells beyond the held quantity (which
+    the old sell view allowed) are clamped.
+    """
+    Transaction = apps.get_model('stocks', 'Transaction')
+    Position = apps.get_model('stocks', 'Position')
+    for user_id in Transaction.objects.order_by().values_list('user_id', flat=True).distinct():
+        positions = {}
+        for trade in Transaction.objects.filter(user_id=user_id).order_by('date', 'id'):
+            position = positions.setdefault(trade.stock_symbol, Position(
+                user_id=user_id, stock_symbol=trade.stock_symbol, quantity=0,
+                cost_basis=Decimal('0'), realized_pnl=Decimal('0'),
+            ))
+            if trade.type == 'BUY':
+                position.quantity += trade.quantity
+                position.cost_basis = _money(position.cost_basis + trade.price * trade.quantity)
+            elif trade.type == 'SELL':
+                quantity = min(trade.quantity, position.quantity)
+                if quantity:
+                    remaining = position.quantity - quantity
+                    remaining_cost = _money(position.cost_basis * remaining / position.quantity)
+                    sold_cost = position.cost_basis - remaining_cost
+                    position.realized_pnl = _money(position.realized_pnl + trade.price * quantity - sold_cost)
+                    position.quantity = remaining
+                    position.cost_basis = remaining_cost
+            position.stock_name = trade.stock_name or position.stock_name
+            position.last_transaction_id = trade.id
+        Position.objects.bulk_create(positions.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('stocks', '0007_watchlist_added_at_userpreference_stockcomparison_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Position',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stock_symbol', models.CharField(db_index=True, max_length=10)),
+                ('stock_name', models.CharField(max_length=300)),
+                ('quantity', models.PositiveIntegerField(default=0, help_text='Shares currently held')),
+                ('cost_basis', models.DecimalField(decimal_places=2, default=Decimal('0'), help_text='Total cost of the shares currently held', max_digits=14)),
+                ('realized_pnl', models.DecimalField(decimal_places=2, default=Decimal('0'), help_text='Profit or loss realized by sells, at average cost', max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('last_transaction', models.ForeignKey(blank=True, help_text='Latest trade applied to this position', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='stocks.transaction')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='positions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Position',
+                'verbose_name_plural': 'Positions',
+                'unique_together': {('user', 'stock_symbol')},
+            },
+        ),
+        migrations.RunPython(build_positions, migrations.RunPython.noop),
+    ]
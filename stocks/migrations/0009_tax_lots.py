@@ -0,0 +1,102 @@
+# Generated by Django 4.2.30 on 2026-10-17 22:23
+
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('stocks', '0008_position'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='lot_method',
+            field=models.CharField(blank=True, choices=[('FIFO', 'First in, first out'), ('LIFO', 'Last in, first out'), ('SPECIFIC', 'Specific lots')], help_text='How a sell picks the lots it closes (blank means FIFO)', max_length=8),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='lot_selection',
+            field=models.JSONField(blank=True, default=list, help_text='Buy transaction ids closed first by a specific-lot sell'),
+        ),
+        migrations.AddField(
+            model_name='userpreference',
+            name='lot_method',
+            field=models.CharField(choices=[('FIFO', 'First in, first out'), ('LIFO', 'Last in, first out')], default='FIFO', help_text="Lots closed by sells that don't pick specific lots", max_length=8),
+        ),
+        migrations.CreateModel(
+            name='LotCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_transaction_id', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='lot_cursor', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TaxLot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stock_symbol', models.CharField(max_length=10)),
+                ('quantity_open', models.PositiveIntegerField(help_text='Shares of the buy not yet sold')),
+                ('cost_per_share', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('acquired_at', models.DateTimeField()),
+                ('buy_transaction', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='tax_lot', to='stocks.transaction')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tax_lots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Tax Lot',
+                'verbose_name_plural': 'Tax Lots',
+                'ordering': ['acquired_at', 'id'],
+                'indexes': [models.Index(fields=['user', 'stock_symbol', 'acquired_at'], name='stocks_taxl_user_id_be97fd_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RealizedLot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stock_symbol', models.CharField(max_length=10)),
+                ('quantity', models.PositiveIntegerField()),
+                ('cost_basis', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('proceeds', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('realized_gain', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('acquired_at', models.DateTimeField()),
+                ('closed_at', models.DateTimeField()),
+                ('tax_year', models.PositiveSmallIntegerField()),
+                ('term', models.CharField(choices=[('SHORT', 'Short term'), ('LONG', 'Long term')], max_length=5)),
+                ('buy_transaction', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='stocks.transaction')),
+                ('sell_transaction', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='realized_lots', to='stocks.transaction')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='realized_lots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Realized Lot',
+                'verbose_name_plural': 'Realized Lots',
+                'ordering': ['closed_at', 'id'],
+                'indexes': [models.Index(fields=['user', 'tax_year'], name='stocks_real_user_id_65ed3f_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RealizedGainSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tax_year', models.PositiveSmallIntegerField()),
+                ('short_term_gain', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('long_term_gain', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('proceeds', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('cost_basis', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('lots_closed', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='realized_gain_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Realized Gain Summary',
+                'verbose_name_plural': 'Realized Gain Summaries',
+                'ordering': ['-tax_year'],
+                'unique_together': {('user', 'tax_year')},
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-17 22:28
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('stocks', '0009_tax_lots'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PortfolioSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('total_value', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('invested', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('realized_pnl', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('unrealized_pnl', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('sector_weights', models.JSONField(blank=True, default=dict, help_text='Percent of value per sector')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='portfolio_snapshots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Portfolio Snapshot',
+                'verbose_name_plural': 'Portfolio Snapshots',
+                'ordering': ['date'],
+                'unique_together': {('user', 'date')},
+            },
+        ),
+    ]
@@ -101,6 +101,12 @@ class UserStock(models.Model):
 
 
 
+LOT_METHODS = [
+    ('FIFO', 'First in, first out'),
+    ('LIFO', 'Last in, first out'),
+    ('SPECIFIC', 'Specific lots'),
+]
+
 class Transaction(models.Model):
     TRANSACTION_TYPES = [
         ('BUY', 'Buy'),
@@ -119,6 +125,17 @@ class Transaction(models.Model):
     )
     type = models.CharField(max_length=4, choices=TRANSACTION_TYPES, db_index=True)
     date = models.DateTimeField(auto_now_add=True, db_index=True)
+    lot_method = models.CharField(
+        max_length=8,
+        blank=True,
+        choices=LOT_METHODS,
+        help_text="How a sell picks the lots it closes (blank means FIFO)"
+    )
+    lot_selection = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="Buy transaction ids closed first by a specific-lot sell"
+    )
     
     @property
     def total_value(self):
@@ -132,6 +149,146 @@ class Transaction(models.Model):
         verbose_name = "Transaction"
         verbose_name_plural = "Transactions"
 
+class Position(models.Model):
+    """Open position per user and symbol, maintained with every trade (see stocks.ledger)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='positions')
+    stock_symbol = models.CharField(max_length=10, db_index=True)
+    stock_name = models.CharField(max_length=300)
+    quantity = models.PositiveIntegerField(default=0, help_text="Shares currently held")
+    cost_basis = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0'),
+        help_text="Total cost of the shares currently held"
+    )
+    realized_pnl = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0'),
+        help_text="Profit or loss realized by sells, at average cost"
+    )
+    last_transaction = models.ForeignKey(
+        Transaction, null=True, blank=True, on_delete=models.SET_NULL, related_name='+',
+        help_text="Latest trade applied to this position"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    @property
+    def average_cost(self):
+        if self.quantity:
+            return self.cost_basis / self.quantity
+        return Decimal('0')
+    
+    def __str__(self):
+        return f'{self.user.username} - {self.stock_symbol} ({self.quantity} shares)'
+    
+    class Meta:
+        unique_together = ('user', 'stock_symbol')
+        verbose_name = "Position"
+        verbose_name_plural = "Positions"
+
+class TaxLot(models.Model):
+    """Open shares from one buy, drawn down by sells (see stocks.tax_lots)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tax_lots')
+    stock_symbol = models.CharField(max_length=10)
+    buy_transaction = models.OneToOneField(Transaction, on_delete=models.CASCADE, related_name='tax_lot')
+    quantity_open = models.PositiveIntegerField(help_text="Shares of the buy not yet sold")
+    cost_per_share = models.DecimalField(max_digits=10, decimal_places=2)
+    acquired_at = models.DateTimeField()
+    
+    @property
+    def cost_basis(self):
+        return self.cost_per_share * self.quantity_open
+    
+    def __str__(self):
+        return f'{self.user.username} - {self.quantity_open} {self.stock_symbol} @ {self.cost_per_share}'
+    
+    class Meta:
+        ordering = ['acquired_at', 'id']
+        indexes = [models.Index(fields=['user', 'stock_symbol', 'acquired_at'])]
+        verbose_name = "Tax Lot"
+        verbose_name_plural = "Tax Lots"
+
+class RealizedLot(models.Model):
+    """The part of one lot closed by one sell, with its realized gain"""
+    TERMS = [
+        ('SHORT', 'Short term'),
+        ('LONG', 'Long term'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='realized_lots')
+    stock_symbol = models.CharField(max_length=10)
+    buy_transaction = models.ForeignKey(Transaction, on_delete=models.CASCADE, related_name='+')
+    sell_transaction = models.ForeignKey(Transaction, on_delete=models.CASCADE, related_name='realized_lots')
+    quantity = models.PositiveIntegerField()
+    cost_basis = models.DecimalField(max_digits=14, decimal_places=2)
+    proceeds = models.DecimalField(max_digits=14, decimal_places=2)
+    realized_gain = models.DecimalField(max_digits=14, decimal_places=2)
+    acquired_at = models.DateTimeField()
+    closed_at = models.DateTimeField()
+    tax_year = models.PositiveSmallIntegerField()
+    term = models.CharField(max_length=5, choices=TERMS)
+    
+    def __str__(self):
+        return f'{self.user.username} - {self.quantity} {self.stock_symbol} closed {self.closed_at.strftime("%Y-%m-%d")}'
+    
+    class Meta:
+        ordering = ['closed_at', 'id']
+        indexes = [models.Index(fields=['user', 'tax_year'])]
+        verbose_name = "Realized Lot"
+        verbose_name_plural = "Realized Lots"
+
+class RealizedGainSummary(models.Model):
+    """Realized gains per user and tax year, updated as lots close"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='realized_gain_summaries')
+    tax_year = models.PositiveSmallIntegerField()
+    short_term_gain = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0'))
+    long_term_gain = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0'))
+    proceeds = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0'))
+    cost_basis = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0'))
+    lots_closed = models.PositiveIntegerField(default=0)
+    
+    @property
+    def total_gain(self):
+        return self.short_term_gain + self.long_term_gain
+    
+    def __str__(self):
+        return f'{self.user.username} - {self.tax_year}: {self.total_gain}'
+    
+    class Meta:
+        unique_together = ('user', 'tax_year')
+        ordering = ['-tax_year']
+        verbose_name = "Realized Gain Summary"
+        verbose_name_plural = "Realized Gain Summaries"
+
+class LotCursor(models.Model):
+    """Latest transaction folded into a user's tax lots"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='lot_cursor')
+    last_transaction_id = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f'{self.user.username} lots through transaction {self.last_transaction_id}'
+
+class PortfolioSnapshot(models.Model):
+    """End-of-day portfolio figures per user, for value-over-time charts"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='portfolio_snapshots')
+    date = models.DateField()
+    total_value = models.DecimalField(max_digits=14, decimal_places=2)
+    invested = models.DecimalField(max_digits=14, decimal_places=2)
+    realized_pnl = models.DecimalField(max_digits=14, decimal_places=2)
+    unrealized_pnl = models.DecimalField(max_digits=14, decimal_places=2)
+    sector_weights = models.JSONField(default=dict, blank=True, help_text="Percent of value per sector")
+    
+    def __str__(self):
+        return f'{self.user.username} - {self.date}: {self.total_value}'
+    
+    class Meta:
+        unique_together = ('user', 'date')
+        ordering = ['date']
+        verbose_name = "Portfolio Snapshot"
+        verbose_name_plural = "Portfolio Snapshots"
+
 class Watchlist(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     stock_symbol = models.CharField(max_length=10)
@@ -210,6 +367,12 @@ class UserPreference(models.Model):
     transaction_notifications = models.BooleanField(default=True, help_text="Receive transaction notifications")
     theme = models.CharField(max_length=20, default='light', choices=[('light', 'Light'), ('dark', 'Dark')])
     default_currency = models.CharField(max_length=3, default='USD')
+    lot_method = models.CharField(
+        max_length=8,
+        default='FIFO',
+        choices=LOT_METHODS[:2],
+        help_text="Lots closed by sells that don't pick specific lots"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -0,0 +1,128 @@
+"""
+Write-behind persistence of live prices to the Stocks table.
+
+Request handlers record the prices they served instead of saving each
+Stocks row; updates are coalesced per ticker and written with a single
+bulk_update on an interval or once enough tickers are pending.
+"""
+import atexit
+import logging
+import threading
+from decimal import Decimal
+from typing import Any, Dict, Optional, Tuple
+
+from django.db import connections
+from django.utils import timezone
+
+from .models import Stocks
+
+logger = logging.getLogger(__name__)
+
+CENT = Decimal('0.01')
+
+
+def write_prices(updates: Dict[str, Tuple[float, Optional[int], Any]]) -> int:
+    """
+    Apply {ticker: (price, volume, updated_at)} to Stocks in one bulk_update.
+
+    Tickers without a Stocks row and non-positive prices are ignored.
+    Returns the number of rows written.
+    """
+    if not updates:
+        return 0
+    stocks = list(Stocks.objects.filter(ticker__in=list(updates)))
+    fields = {'curr_price', 'last_updated'}
+    for stock in stocks:
+        price, volume, updated_at = updates[stock.ticker]
+        price = Decimal(str(price)).quantize(CENT)
+        if price > 0:
+            stock.curr_price = price
+        if volume is not None:
+            stock.volume = int(volume)
+            fields.add('volume')
+        # bulk_update skips auto_now, so stamp it here
+        stock.last_updated = updated_at
+    Stocks.objects.bulk_update(stocks, sorted(fields))
+    return len(stocks)
+
+
+class PriceWriteBuffer:
+    """
+    Coalesce price updates per ticker and flush them in the background.
+
+    record() only touches an in-memory dict, so read-only views do no
+    database writes. A daemon thread flushes every flush_interval seconds,
+    or as soon as max_pending tickers are waiting, and once more at exit.
+    """
+
+    def __init__(self, flush_interval: float = 10.0, max_pending: int = 500):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Dict[str, Tuple[float, Optional[int], Any]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._stats = {'recorded': 0, 'written': 0, 'flushes': 0, 'errors': 0}
+
+    def record(self, ticker: str, price: float, volume: Optional[int] = None):
+        """Queue the latest price for ticker, replacing any pending one"""
+        if price is None:
+            return
+        with self._lock:
+            self._pending[ticker.upper()] = (price, volume, timezone.now())
+            self._stats['recorded'] += 1
+            full = len(self._pending) >= self.max_pending
+        self._start()
+        if full:
+            self._wakeup.set()
+
+    def record_quote(self, ticker: str, quote: Dict[str, Any]):
+        """Queue a price from a quote dict, skipping prices read back from the database"""
+        if quote.get('source') == 'database':
+            return
+        self.record(ticker, quote.get('current_price'), quote.get('volume'))
+
+    def flush(self) -> int:
+        """Write all pending updates now; returns the number of rows written"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+            try:
+                written = write_prices(pending)
+            except Exception as e:
+                logger.error(f"Error flushing {len(pending)} price updates: {str(e)}")
+                with self._lock:
+                    self._stats['errors'] += 1
+                    # Keep newer updates recorded while this flush failed
+                    for ticker, update in pending.items():
+                        self._pending.setdefault(ticker, update)
+                return 0
+            with self._lock:
+                self._stats['written'] += written
+                self._stats['flushes'] += 1
+            return written
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, pending=len(self._pending))
+
+    def _start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='price-writer', daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            finally:
+                connections.close_all()
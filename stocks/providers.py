@@ -0,0 +1,601 @@
+"""
+Quote providers, chained with circuit breakers, latency ordering and hedging.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from django.conf import settings
+
+from .http_client import get_http_session
+from .throttling import get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# Runs the independent requests a single provider call needs in parallel
+http_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='stock-http')
+
+
+class ProviderError(Exception):
+    """A provider call failed and counts against its circuit breaker"""
+
+
+class RateLimited(ProviderError):
+    """The provider's quota is exhausted; skip it without counting a failure"""
+
+
+class NoProviderAnswered(ProviderError):
+    """Every provider was skipped or failed, so nothing is known about the symbol"""
+
+
+def quote_from_bars(symbol: str, hist: pd.DataFrame, source: str = 'yfinance') -> Dict[str, Any]:
+    """Build a quote record from recent daily bars"""
+    latest = hist.iloc[-1]
+    current_price = float(latest['Close'])
+    previous_close = float(hist['Close'].iloc[-2]) if len(hist) > 1 else current_price
+
+    day_change = current_price - previous_close
+    day_change_percent = (day_change / previous_close) * 100 if previous_close else 0
+
+    return {
+        'symbol': symbol.upper(),
+        'current_price': current_price,
+        'previous_close': previous_close,
+        'day_change': day_change,
+        'day_change_percent': day_change_percent,
+        'volume': int(latest.get('Volume', 0) or 0),
+        'day_high': float(latest.get('High', current_price)),
+        'day_low': float(latest.get('Low', current_price)),
+        'open_price': float(latest.get('Open', current_price)),
+        'last_updated': datetime.now().isoformat(),
+        'source': source
+    }
+
+
+class CircuitBreaker:
+    """
+    Skip a provider for a cooldown after repeated consecutive failures.
+
+    After the cooldown one trial call is let through (half-open); success
+    closes the breaker, failure opens it for another cooldown. A trial that
+    ends without either (rate limited, interrupted) is released so the next
+    call can try.
+    """
+
+    def __init__(self, name: str = '', failure_threshold: int = 3, cooldown: float = 60):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return 'half_open'
+        return 'open'
+
+    def allow(self) -> bool:
+        """True if a call may go through now"""
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def release_trial(self):
+        """End a half-open trial that was skipped before it had an outcome"""
+        with self._lock:
+            self._trial_running = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None or time.monotonic() - self.opened_at >= self.cooldown:
+                    logger.warning(f"Circuit for {self.name} opened after {self.failures} consecutive failures")
+                self.opened_at = time.monotonic()
+
+
+class LatencyStats:
+    """EWMA and rolling-window percentiles of call latencies"""
+
+    def __init__(self, window: int = 200, alpha: float = 0.2):
+        self.alpha = alpha
+        self.ewma: Optional[float] = None
+        self.samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self.samples.append(seconds)
+            self.ewma = seconds if self.ewma is None else self.alpha * seconds + (1 - self.alpha) * self.ewma
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if not self.samples:
+                return None
+            return float(np.percentile(self.samples, q))
+
+
+class QuoteProvider:
+    """
+    Interface shared by the quote providers.
+
+    Subclasses implement _fetch, returning a quote dict (optionally with
+    fundamental fields), None when the provider has no data for the symbol,
+    or raising ProviderError. fetch_quote wraps it with the rate limiter,
+    circuit breaker and latency stats.
+    """
+
+    name = ''
+    requests_per_quote = 1
+    supports_batch = False
+    batch_size = 100
+
+    def __init__(self, api_key: Optional[str] = None, timeout: float = 10,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.api_key = api_key
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker(self.name)
+        self.latency = LatencyStats()
+        self.calls = 0
+        self.errors = 0
+
+    @property
+    def configured(self) -> bool:
+        return True
+
+    def fetch_quote(self, symbol: str, rate_limit_wait: float = 30) -> Optional[Dict[str, Any]]:
+        return self._call(lambda: self._fetch(symbol), self.requests_per_quote, rate_limit_wait, symbol)
+
+    def fetch_quotes(self, symbols: List[str], rate_limit_wait: float = 30) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetch many quotes with the provider's multi-ticker endpoint, batch_size symbols per request.
+
+        If a request fails after earlier ones succeeded, the quotes already
+        fetched are returned so the caller only retries the rest elsewhere.
+        """
+        quotes = {}
+        for i in range(0, len(symbols), self.batch_size):
+            chunk = symbols[i:i + self.batch_size]
+            try:
+                quotes.update(self._call(lambda: self._fetch_many(chunk), 1, rate_limit_wait, ', '.join(chunk)) or {})
+            except ProviderError as e:
+                if not quotes:
+                    raise
+                logger.warning(f"{str(e)}; keeping {len(quotes)} quotes from earlier requests")
+                break
+        return quotes
+
+    def _call(self, fetch, tokens: int, rate_limit_wait: float, label: str) -> Any:
+        """Run fetch under the rate limiter, circuit breaker and latency stats"""
+        if not get_rate_limiter(self.name).acquire(tokens, timeout=rate_limit_wait):
+            self.breaker.release_trial()
+            raise RateLimited(f"{self.name} rate limit exhausted")
+
+        started = time.monotonic()
+        self.calls += 1
+        try:
+            result = fetch()
+        except RateLimited:
+            self.breaker.release_trial()
+            raise
+        except Exception as e:
+            self.errors += 1
+            # A failure costs the caller as much as a timeout, so fast errors don't rank a provider up
+            self.latency.record(max(time.monotonic() - started, self.timeout))
+            self.breaker.record_failure()
+            raise ProviderError(f"{self.name} failed for {label}: {str(e)}") from e
+        except BaseException:
+            self.breaker.release_trial()
+            raise
+
+        self.latency.record(time.monotonic() - started)
+        self.breaker.record_success()
+        return result
+
+    def _fetch_many(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        raise NotImplementedError
+
+    def _fetch(self, symbol: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        p95 = self.latency.percentile(95)
+        return {
+            'configured': self.configured,
+            'circuit': self.breaker.state,
+            'calls': self.calls,
+            'errors': self.errors,
+            'ewma_ms': round(self.latency.ewma * 1000, 1) if self.latency.ewma is not None else None,
+            'p95_ms': round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
+
+class YFinanceProvider(QuoteProvider):
+    """Latest daily bars from Yahoo Finance"""
+
+    name = 'yfinance'
+
+    def _fetch(self, symbol: str) -> Optional[Dict[str, Any]]:
+        hist = yf.Ticker(symbol).history(period="5d", timeout=self.timeout)
+        if hist.empty:
+            return None
+        return quote_from_bars(symbol, hist)
+
+
+class TiingoProvider(QuoteProvider):
+    """Tiingo end-of-day prices plus ticker metadata"""
+
+    name = 'tiingo'
+    requests_per_quote = 2
+    supports_batch = True
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+    def _fetch(self, symbol: str) -> Optional[Dict[str, Any]]:
+        session = get_http_session()
+        meta_url = f"https://api.tiingo.com/tiingo/daily/{symbol}"
+        price_url = f"https://api.tiingo.com/tiingo/daily/{symbol}/prices"
+        params = {'token': self.api_key}
+
+        # The metadata and price requests are independent, so run them side by side
+        meta_future = http_executor.submit(session.get, meta_url, params=params, timeout=self.timeout)
+        price_response = session.get(price_url, params=params, timeout=self.timeout)
+        meta_response = meta_future.result()
+
+        if meta_response.status_code == 404 or price_response.status_code == 404:
+            return None
+        if meta_response.status_code == 429 or price_response.status_code == 429:
+            raise RateLimited("Tiingo returned 429")
+        meta_response.raise_for_status()
+        price_response.raise_for_status()
+
+        metadata = meta_response.json()
+        price_data = price_response.json()
+        if not price_data:
+            return None
+
+        latest_price = price_data[0]
+        current_price = latest_price['close']
+        previous_close = latest_price.get('prevClose', current_price)
+
+        return {
+            'symbol': metadata['ticker'],
+            'name': metadata['name'],
+            'current_price': float(current_price),
+            'previous_close': float(previous_close),
+            'day_change': float(current_price - previous_close),
+            'day_change_percent': float((current_price - previous_close) / previous_close * 100) if previous_close else 0,
+            'volume': int(latest_price.get('volume', 0)),
+            'description': metadata.get('description', ''),
+            'last_updated': datetime.now().isoformat(),
+            'source': 'tiingo'
+        }
+
+    def _fetch_many(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Top-of-book quotes for many tickers from Tiingo's IEX endpoint in one request"""
+        response = get_http_session().get(
+            'https://api.tiingo.com/iex/',
+            params={'tickers': ','.join(symbols), 'token': self.api_key},
+            timeout=self.timeout,
+        )
+        if response.status_code == 429:
+            raise RateLimited("Tiingo returned 429")
+        response.raise_for_status()
+
+        quotes = {}
+        requested = {symbol.upper(): symbol for symbol in symbols}
+        for row in response.json() or []:
+            symbol = requested.get(str(row.get('ticker', '')).upper())
+            current_price = row.get('tngoLast') or row.get('last')
+            if symbol is None or not current_price:
+                continue
+
+            current_price = float(current_price)
+            previous_close = float(row.get('prevClose') or current_price)
+            quote = {
+                'symbol': symbol.upper(),
+                'current_price': current_price,
+                'previous_close': previous_close,
+                'day_change': current_price - previous_close,
+                'day_change_percent': (current_price - previous_close) / previous_close * 100 if previous_close else 0,
+                'last_updated': datetime.now().isoformat(),
+                'source': 'tiingo'
+            }
+            if row.get('volume') is not None:
+                quote['volume'] = int(row['volume'])
+            for field, key in (('day_high', 'high'), ('day_low', 'low'), ('open_price', 'open')):
+                if row.get(key) is not None:
+                    quote[field] = float(row[key])
+            quotes[symbol] = quote
+        return quotes
+
+
+class AlphaVantageProvider(QuoteProvider):
+    """Alpha Vantage GLOBAL_QUOTE endpoint"""
+
+    name = 'alpha_vantage'
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+    def _fetch(self, symbol: str) -> Optional[Dict[str, Any]]:
+        response = get_http_session().get(
+            'https://www.alphavantage.co/query',
+            params={'function': 'GLOBAL_QUOTE', 'symbol': symbol, 'apikey': self.api_key},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        payload = response.json()
+
+        # Quota messages come back with a 200 status
+        if 'Note' in payload or 'Information' in payload:
+            raise RateLimited(payload.get('Note') or payload.get('Information'))
+
+        data = payload.get('Global Quote') or {}
+        if not data.get('05. price'):
+            return None
+
+        current_price = float(data['05. price'])
+        previous_close = float(data.get('08. previous close') or current_price)
+        return {
+            'symbol': data.get('01. symbol', symbol).upper(),
+            'current_price': current_price,
+            'previous_close': previous_close,
+            'day_change': float(data.get('09. change') or current_price - previous_close),
+            'day_change_percent': float(str(data.get('10. change percent') or '0').rstrip('%')),
+            'volume': int(data.get('06. volume') or 0),
+            'day_high': float(data.get('03. high') or current_price),
+            'day_low': float(data.get('04. low') or current_price),
+            'open_price': float(data.get('02. open') or current_price),
+            'last_updated': datetime.now().isoformat(),
+            'source': 'alpha_vantage'
+        }
+
+
+class FinnhubProvider(QuoteProvider):
+    """Finnhub real-time quote endpoint"""
+
+    name = 'finnhub'
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+    def _fetch(self, symbol: str) -> Optional[Dict[str, Any]]:
+        response = get_http_session().get(
+            'https://finnhub.io/api/v1/quote',
+            params={'symbol': symbol, 'token': self.api_key},
+            timeout=self.timeout,
+        )
+        if response.status_code == 429:
+            raise RateLimited("Finnhub returned 429")
+        response.raise_for_status()
+        data = response.json()
+
+        # Unknown symbols come back as all zeros
+        if not data or not data.get('c'):
+            return None
+
+        current_price = float(data['c'])
+        previous_close = float(data.get('pc') or current_price)
+        return {
+            'symbol': symbol.upper(),
+            'current_price': current_price,
+            'previous_close': previous_close,
+            'day_change': float(data.get('d') or current_price - previous_close),
+            'day_change_percent': float(data.get('dp') or 0),
+            'day_high': float(data.get('h') or current_price),
+            'day_low': float(data.get('l') or current_price),
+            'open_price': float(data.get('o') or current_price),
+            'last_updated': datetime.fromtimestamp(data['t']).isoformat() if data.get('t') else datetime.now().isoformat(),
+            'source': 'finnhub'
+        }
+
+
+PROVIDER_CLASSES = {
+    provider.name: provider
+    for provider in (YFinanceProvider, TiingoProvider, AlphaVantageProvider, FinnhubProvider)
+}
+
+
+class ProviderChain:
+    """
+    Try quote providers in order of observed latency, skipping open circuits.
+
+    With hedging enabled, if the current provider has not answered by its
+    p95 latency (at least hedge_min_delay), the next provider is started as
+    well and the first usable answer wins.
+    """
+
+    def __init__(self, providers: List[QuoteProvider], hedge: bool = False,
+                 hedge_percentile: float = 95, hedge_min_delay: float = 0.5,
+                 rate_limit_wait: float = 30):
+        self.providers = {provider.name: provider for provider in providers}
+        self.priority = [provider.name for provider in providers]
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.rate_limit_wait = rate_limit_wait
+        self.hedges_fired = 0
+        self.hedges_won = 0
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='stock-hedge') if hedge else None
+
+    def get(self, name: str) -> Optional[QuoteProvider]:
+        return self.providers.get(name)
+
+    def ordered(self) -> List[QuoteProvider]:
+        """Configured providers, fastest EWMA latency first; untried ones keep their configured place"""
+        def sort_key(name):
+            ewma = self.providers[name].latency.ewma
+            return (ewma is None, ewma or 0, self.priority.index(name))
+
+        return [
+            self.providers[name] for name in sorted(self.priority, key=sort_key)
+            if self.providers[name].configured
+        ]
+
+    def fetch_quote(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the first quote any provider can supply.
+
+        Returns None if the providers that answered have no data for the
+        symbol, and raises NoProviderAnswered if none of them answered.
+        """
+        candidates = self.ordered()
+        if self.hedge:
+            return self._fetch_hedged(symbol, candidates)
+
+        answered = False
+        for provider in candidates:
+            if not provider.breaker.allow():
+                continue
+            quote, provider_answered = self._call(provider, symbol)
+            if quote:
+                return quote
+            answered = answered or provider_answered
+
+        if not answered:
+            raise NoProviderAnswered(f"No provider answered for {symbol}")
+        return None
+
+    def fetch_quotes(self, symbols: List[str], exclude: tuple = ()) -> Dict[str, Dict[str, Any]]:
+        """Fetch many quotes with the multi-ticker endpoints of the providers that have one"""
+        quotes = {}
+        remaining = list(symbols)
+        for provider in self.ordered():
+            if not remaining:
+                break
+            if not provider.supports_batch or provider.name in exclude or not provider.breaker.allow():
+                continue
+            try:
+                quotes.update(provider.fetch_quotes(remaining, self.rate_limit_wait))
+            except ProviderError as e:
+                logger.warning(str(e))
+                continue
+            remaining = [symbol for symbol in remaining if symbol not in quotes]
+        return quotes
+
+    def _call(self, provider: QuoteProvider, symbol: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """Return (quote, answered); answered is False if the provider was rate limited or failed"""
+        try:
+            return provider.fetch_quote(symbol, self.rate_limit_wait), True
+        except ProviderError as e:
+            logger.warning(str(e))
+            return None, False
+
+    def _hedge_delay(self, provider: QuoteProvider) -> float:
+        p95 = provider.latency.percentile(self.hedge_percentile)
+        return max(p95 or provider.timeout, self.hedge_min_delay)
+
+    def _fetch_hedged(self, symbol: str, candidates: List[QuoteProvider]) -> Optional[Dict[str, Any]]:
+        pending = {}
+        hedged = set()
+        remaining = list(candidates)
+        answered = False
+
+        def start_next() -> bool:
+            while remaining:
+                provider = remaining.pop(0)
+                if provider.breaker.allow():
+                    pending[self._executor.submit(self._call, provider, symbol)] = provider
+                    return True
+            return False
+
+        start_next()
+        while pending:
+            # Wait for an answer until the newest provider's hedge deadline
+            newest = list(pending.values())[-1]
+            done, _ = wait(pending, timeout=self._hedge_delay(newest) if remaining else None,
+                           return_when=FIRST_COMPLETED)
+
+            if not done:
+                if start_next():
+                    self.hedges_fired += 1
+                    hedged.add(list(pending.values())[-1].name)
+                continue
+
+            for future in done:
+                provider = pending.pop(future)
+                quote, provider_answered = future.result()
+                if quote:
+                    if provider.name in hedged:
+                        self.hedges_won += 1
+                    # Slower calls finish in the background and still feed the stats
+                    return quote
+                answered = answered or provider_answered
+
+            # Every finished call came back empty: move on to the next provider
+            start_next()
+
+        if not answered:
+            raise NoProviderAnswered(f"No provider answered for {symbol}")
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'order': [provider.name for provider in self.ordered()],
+            'hedging': self.hedge,
+            'hedges_fired': self.hedges_fired,
+            'hedges_won': self.hedges_won,
+            'providers': {name: provider.stats() for name, provider in self.providers.items()},
+        }
+
+
+def build_provider_chain() -> ProviderChain:
+    """Create the provider chain described by STOCK_API_SETTINGS"""
+    api_settings = getattr(settings, 'STOCK_API_SETTINGS', {})
+    keys = {
+        'tiingo': api_settings.get('TIINGO_API_TOKEN'),
+        'alpha_vantage': api_settings.get('ALPHA_VANTAGE_API_KEY'),
+        'finnhub': api_settings.get('FINNHUB_API_KEY'),
+    }
+
+    providers = []
+    for name in api_settings.get('QUOTE_PROVIDERS', ['yfinance', 'tiingo', 'finnhub', 'alpha_vantage']):
+        if name not in PROVIDER_CLASSES:
+            logger.error(f"Unknown quote provider {name}, skipping")
+            continue
+        providers.append(PROVIDER_CLASSES[name](
+            api_key=keys.get(name),
+            timeout=api_settings.get('PROVIDER_TIMEOUT', 10),
+            breaker=CircuitBreaker(
+                name,
+                failure_threshold=api_settings.get('CIRCUIT_BREAKER_FAILURES', 3),
+                cooldown=api_settings.get('CIRCUIT_BREAKER_COOLDOWN', 60),
+            ),
+        ))
+
+    return ProviderChain(
+        providers,
+        hedge=api_settings.get('HEDGE_REQUESTS', False),
+        hedge_percentile=api_settings.get('HEDGE_PERCENTILE', 95),
+        hedge_min_delay=api_settings.get('HEDGE_MIN_DELAY', 0.5),
+        rate_limit_wait=api_settings.get('RATE_LIMIT_WAIT', 30),
+    )
@@ -0,0 +1,255 @@
+"""
+Quote table shared by every worker process through a memory-mapped file.
+
+The file is a small header followed by fixed-width rows, one per ticker.
+Rows are never moved or freed, so a ticker keeps its slot for the life of
+the file. Writers serialize on a file lock; readers take no lock and use
+the per-row version as a seqlock: a writer makes the version odd while it
+updates a row and even again afterwards, and a reader retries if the
+version was odd or changed while it copied the row.
+"""
+import logging
+import math
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locking
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'QBRD'
+LAYOUT_VERSION = 1
+HEADER_SIZE = 64
+
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S4'),
+    ('layout', '<u4'),
+    ('capacity', '<u4'),
+    ('count', '<u4'),
+])
+
+ROW_DTYPE = np.dtype([
+    ('version', '<u8'),
+    ('ticker', 'S16'),
+    ('source', 'S16'),
+    ('current_price', '<f8'),
+    ('previous_close', '<f8'),
+    ('day_change', '<f8'),
+    ('day_change_percent', '<f8'),
+    ('volume', '<i8'),
+    ('day_high', '<f8'),
+    ('day_low', '<f8'),
+    ('open_price', '<f8'),
+    ('fetched_at', '<f8'),
+], align=True)
+
+# Quote fields stored as floats; NaN means the provider did not supply them
+PRICE_FIELDS = (
+    'current_price', 'previous_close', 'day_change', 'day_change_percent',
+    'day_high', 'day_low', 'open_price',
+)
+
+
+class QuoteBoard:
+    """Fixed-layout quote rows in a memory-mapped file"""
+
+    def __init__(self, path, capacity: int = 4096, read_retries: int = 5):
+        self.path = Path(path)
+        self.capacity = capacity
+        self.read_retries = read_retries
+        self._header = None
+        self._rows = None
+        self._slots: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _open(self, create: bool = False) -> bool:
+        """Map the file, creating it if asked. Returns False if it is not available."""
+        if self._rows is not None:
+            return True
+
+        with self._lock:
+            if self._rows is not None:
+                return True
+
+            if create and not self._valid_file():
+                self._create()
+            if not self._valid_file():
+                return False
+
+            header = np.memmap(self.path, dtype=HEADER_DTYPE, mode='r+', shape=(1,))
+            capacity = int(header['capacity'][0])
+            self._rows = np.memmap(
+                self.path, dtype=ROW_DTYPE, mode='r+', offset=HEADER_SIZE, shape=(capacity,)
+            )
+            self._header = header
+            return True
+
+    def _valid_file(self) -> bool:
+        try:
+            with open(self.path, 'rb') as f:
+                header = np.frombuffer(f.read(HEADER_DTYPE.itemsize), dtype=HEADER_DTYPE)
+            size = self.path.stat().st_size
+        except (OSError, ValueError):
+            return False
+        if len(header) != 1 or header['magic'][0] != MAGIC or header['layout'][0] != LAYOUT_VERSION:
+            return False
+        return size >= HEADER_SIZE + int(header['capacity'][0]) * ROW_DTYPE.itemsize
+
+    def _create(self):
+        """Write an empty board, unless another process just did"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._file_lock():
+            if self._valid_file():
+                return
+            header = np.zeros(1, dtype=HEADER_DTYPE)
+            header['magic'] = MAGIC
+            header['layout'] = LAYOUT_VERSION
+            header['capacity'] = self.capacity
+
+            tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            with open(tmp_path, 'wb') as f:
+                f.write(header.tobytes().ljust(HEADER_SIZE, b'\0'))
+                f.truncate(HEADER_SIZE + self.capacity * ROW_DTYPE.itemsize)
+            os.replace(tmp_path, self.path)
+
+    def _file_lock(self):
+        return _FileLock(self.path.with_name(f"{self.path.name}.lock"))
+
+    def _slot(self, ticker: str) -> Optional[int]:
+        """Row index for a ticker, picking up rows other processes have added"""
+        slot = self._slots.get(ticker)
+        if slot is not None:
+            return slot
+
+        count = int(self._header['count'][0])
+        if count > len(self._slots):
+            tickers = self._rows['ticker'][len(self._slots):count]
+            for offset, name in enumerate(tickers, start=len(self._slots)):
+                self._slots.setdefault(name.decode(), offset)
+        return self._slots.get(ticker)
+
+    def get(self, symbol: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """Return (quote, fetched_at) for a symbol, or None if it is not on the board"""
+        if not self._open():
+            return None
+
+        ticker = symbol.upper()
+        slot = self._slot(ticker)
+        if slot is None:
+            return None
+
+        rows = self._rows
+        for _ in range(self.read_retries):
+            before = int(rows['version'][slot])
+            if before % 2:
+                continue
+            row = rows[slot].copy()
+            if int(rows['version'][slot]) == before:
+                break
+        else:
+            return None
+
+        if row['version'] == 0:
+            return None
+
+        quote = {'symbol': ticker, 'source': row['source'].decode()}
+        for field in PRICE_FIELDS:
+            value = float(row[field])
+            if not math.isnan(value):
+                quote[field] = value
+        if row['volume'] >= 0:
+            quote['volume'] = int(row['volume'])
+
+        fetched_at = float(row['fetched_at'])
+        quote['last_updated'] = datetime.fromtimestamp(fetched_at).isoformat()
+        return quote, fetched_at
+
+    def publish(self, symbol: str, quote: Dict[str, Any], fetched_at: float) -> bool:
+        """Write a quote to the symbol's row. Returns False if the board is unavailable or full."""
+        ticker = symbol.upper()
+        encoded = ticker.encode()
+        if len(encoded) > ROW_DTYPE['ticker'].itemsize:
+            return False
+
+        if not self._open(create=True):
+            return False
+
+        with self._file_lock():
+            slot = self._slot(ticker)
+            if slot is None:
+                count = int(self._header['count'][0])
+                if count >= len(self._rows):
+                    logger.warning(f"Quote board {self.path} is full, not publishing {ticker}")
+                    return False
+                slot = count
+                self._rows['ticker'][slot] = encoded
+
+            rows = self._rows
+            version = int(rows['version'][slot])
+            rows['version'][slot] = version + 1 if version % 2 == 0 else version
+
+            for field in PRICE_FIELDS:
+                value = quote.get(field)
+                rows[field][slot] = float(value) if value is not None else math.nan
+            volume = quote.get('volume')
+            rows['volume'][slot] = int(volume) if volume is not None else -1
+            rows['source'][slot] = str(quote.get('source', ''))[:16].encode()
+            rows['fetched_at'][slot] = fetched_at
+
+            rows['version'][slot] = int(rows['version'][slot]) + 1
+            if slot == int(self._header['count'][0]):
+                # Publish the new row only once it is complete
+                self._header['count'][0] = slot + 1
+                self._slots[ticker] = slot
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        if not self._open():
+            return {'path': str(self.path), 'available': False}
+        return {
+            'path': str(self.path),
+            'available': True,
+            'rows': int(self._header['count'][0]),
+            'capacity': len(self._rows),
+            'row_bytes': ROW_DTYPE.itemsize,
+        }
+
+
+class _FileLock:
+    """Exclusive lock on a file, shared by threads and processes"""
+
+    _thread_locks: Dict[str, threading.Lock] = {}
+    _guard = threading.Lock()
+
+    def __init__(self, path: Path):
+        self.path = path
+        with self._guard:
+            self._thread_lock = self._thread_locks.setdefault(str(path), threading.Lock())
+        self._file = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        try:
+            self._file = open(self.path, 'a')
+            if fcntl:
+                fcntl.flock(self._file, fcntl.LOCK_EX)
+        except Exception:
+            self._thread_lock.release()
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if fcntl:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+        finally:
+            self._thread_lock.release()
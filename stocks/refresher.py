@@ -0,0 +1,166 @@
+"""
+Background price refresher that keeps quotes fresh ahead of requests.
+
+Symbols are ranked by demand (holders, watchlist entries and active price
+alerts referencing them) and refreshed on an interval that shrinks as
+demand grows, so hot symbols stay current and cold ones are only kept
+warm. Quotes are written through StockDataService, so they land on the
+shared quote board, and current prices are persisted to Stocks.
+"""
+import logging
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from django.db import close_old_connections
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import PriceAlert, Stocks, UserStock, Watchlist
+from .price_writer import write_prices
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DEMAND_WEIGHTS = {'holders': 2, 'watchlists': 1, 'alerts': 2}
+
+
+def symbol_demand(weights: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+    """
+    Weighted count of holders, watchlist entries and active alerts per symbol.
+
+    Active stocks nobody references are included with zero demand.
+    """
+    weights = dict(DEFAULT_DEMAND_WEIGHTS, **(weights or {}))
+    demand = Counter({ticker: 0 for ticker in Stocks.objects.filter(is_active=True).values_list('ticker', flat=True)})
+
+    holders = UserStock.objects.values('stock__ticker').annotate(count=Count('user', distinct=True))
+    for row in holders:
+        demand[row['stock__ticker']] += weights['holders'] * row['count']
+
+    watchlists = Watchlist.objects.values('stock_symbol').annotate(count=Count('id'))
+    for row in watchlists:
+        demand[row['stock_symbol'].upper()] += weights['watchlists'] * row['count']
+
+    alerts = PriceAlert.objects.filter(status='ACTIVE').values('stock_symbol').annotate(count=Count('id'))
+    for row in alerts:
+        demand[row['stock_symbol'].upper()] += weights['alerts'] * row['count']
+
+    return dict(demand)
+
+
+class PriceRefresher:
+    """
+    Refresh quotes in demand order, each symbol on its own interval.
+
+    The most demanded symbol refreshes every min_interval seconds and
+    others proportionally less often, up to max_interval for symbols with
+    no demand. A quote is never refetched before it goes stale under the
+    service's freshness policy, so closed-market quotes wait for the open.
+    """
+
+    def __init__(self, service, min_interval: int = 60, max_interval: int = 900,
+                 max_per_pass: int = 200, demand_refresh: int = 300,
+                 weights: Optional[Dict[str, int]] = None):
+        self.service = service
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.max_per_pass = max_per_pass
+        self.demand_refresh = demand_refresh
+        self.weights = weights
+        self._demand: Dict[str, int] = {}
+        self._demand_loaded_at = 0.0
+        self._next_due: Dict[str, float] = {}
+
+    def demand(self) -> Dict[str, int]:
+        """Symbol demand, reloaded from the database every demand_refresh seconds"""
+        if not self._demand or time.time() - self._demand_loaded_at >= self.demand_refresh:
+            self._demand = symbol_demand(self.weights)
+            self._demand_loaded_at = time.time()
+            self._next_due = {symbol: due for symbol, due in self._next_due.items() if symbol in self._demand}
+        return self._demand
+
+    def interval(self, demand: int, top_demand: int) -> float:
+        """Refresh interval for a symbol given the highest demand"""
+        if demand <= 0 or top_demand <= 0:
+            return self.max_interval
+        return min(self.min_interval * top_demand / demand, self.max_interval)
+
+    def due(self, now: Optional[float] = None) -> List[str]:
+        """Symbols due for a refresh, most demanded first"""
+        now = now or time.time()
+        demand = self.demand()
+        due = [symbol for symbol in demand if self._next_due_at(symbol, demand) <= now]
+        return sorted(due, key=lambda symbol: -demand[symbol])
+
+    def _next_due_at(self, symbol: str, demand: Dict[str, int]) -> float:
+        if symbol not in self._next_due:
+            envelope = self.service.read_quote_envelope(symbol)
+            if envelope is None:
+                return 0.0
+            self._schedule(symbol, envelope['fetched_at'], demand)
+        return self._next_due[symbol]
+
+    def _schedule(self, symbol: str, fetched_at: float, demand: Dict[str, int]):
+        interval = self.interval(demand.get(symbol, 0), max(demand.values(), default=0))
+        self._next_due[symbol] = max(fetched_at + interval, self.service.fresh_until(fetched_at))
+
+    def run_once(self) -> Dict[str, Any]:
+        """Refresh the symbols that are due, up to max_per_pass of them"""
+        close_old_connections()
+        now = time.time()
+        due = self.due(now)
+        batch = due[:self.max_per_pass]
+        skipped = self.service.missing_symbols(batch) if batch else set()
+        batch = [symbol for symbol in batch if symbol not in skipped]
+
+        quotes = {}
+        if batch:
+            quotes, _ = self.service.load_quotes(batch, store=True)
+
+        demand = self.demand()
+        for symbol in batch:
+            if symbol in quotes:
+                self._schedule(symbol, now, demand)
+            else:
+                # Try again at the cold cadence rather than on every pass
+                self._next_due[symbol] = now + self.max_interval
+        for symbol in skipped:
+            self._next_due[symbol] = now + self.min_interval
+
+        updated = self._persist_prices(quotes)
+        return {
+            'due': len(due),
+            'refreshed': len(quotes),
+            'failed': len(batch) - len(quotes),
+            'skipped': len(skipped),
+            'persisted': updated,
+            'elapsed': time.time() - now,
+        }
+
+    def seconds_until_next(self) -> float:
+        """Seconds until the next symbol becomes due"""
+        if not self._next_due:
+            return 0.0
+        return max(min(self._next_due.values()) - time.time(), 0.0)
+
+    def run_forever(self, poll_interval: float = 5.0, on_pass=None):
+        """Refresh in a loop, sleeping until the next symbol is due (at most poll_interval)"""
+        while True:
+            try:
+                stats = self.run_once()
+                if on_pass:
+                    on_pass(stats)
+            except Exception as e:
+                logger.error(f"Price refresh pass failed: {str(e)}")
+            time.sleep(min(max(self.seconds_until_next(), 1.0), poll_interval))
+
+    def _persist_prices(self, quotes: Dict[str, Dict[str, Any]]) -> int:
+        """Write refreshed prices to Stocks in one bulk update"""
+        now = timezone.now()
+        try:
+            return write_prices({
+                symbol: (quote['current_price'], quote.get('volume'), now) for symbol, quote in quotes.items()
+            })
+        except Exception as e:
+            logger.error(f"Error persisting refreshed prices: {str(e)}")
+            return 0
@@ -2,184 +2,1035 @@
 Stock data services for fetching and processing stock market data.
 """
 import logging
-import requests
+import time
 import yfinance as yf
 import pandas as pd
-from typing import Dict, List, Optional, Any
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Tuple, Any
 from django.core.cache import cache
 from django.conf import settings
-from datetime import datetime, timedelta
+from django.db import connections
+from datetime import date, datetime, timedelta
 from decimal import Decimal
 
+from .cache_backends import SharedCache
+from .cache_snapshot import CacheSnapshot
+from .codecs import decode_quote, encode_quote
+from .history_store import HistorySeriesCache, PriceHistoryStore, period_start
+from .market_board import MarketBoard
+from .market_hours import MarketCalendar, QuoteFreshnessPolicy
+from .models import Stocks
+from .price_writer import PriceWriteBuffer
+from .providers import NoProviderAnswered, build_provider_chain, quote_from_bars
+from .quote_board import QuoteBoard
+from .singleflight import SingleFlight
+from .streaming import PriceHub
+from .throttling import get_rate_limiter
+from .valuation import UNKNOWN_SECTOR, Holdings, PriceVector, Valuation
+
 logger = logging.getLogger(__name__)
 
+# Fast-moving price fields, refreshed on every quote TTL
+QUOTE_FIELDS = (
+    'symbol', 'current_price', 'previous_close', 'day_change', 'day_change_percent',
+    'volume', 'day_high', 'day_low', 'open_price', 'last_updated', 'source',
+)
+
+# Slow-moving company data, refreshed on FUNDAMENTALS_TTL
+FUNDAMENTAL_FIELDS = (
+    'name', 'market_cap', 'description', 'sector', 'industry',
+    'fifty_two_week_high', 'fifty_two_week_low', 'pe_ratio', 'forward_pe',
+    'dividend_yield', 'average_volume', 'beta', 'eps',
+)
+
+
+def quote_version(fetched_at: float) -> int:
+    """Version of a quote: its fetch time in microseconds, increasing with every refresh"""
+    return int(fetched_at * 1_000_000)
+
+
+# Leases, refresh claims and counters that every worker process must see
+coordination_cache = SharedCache(getattr(settings, 'STOCK_API_SETTINGS', {}).get('COORDINATION_CACHE', 'default'))
+
+# Shared by every service instance so coalescing and its stats are process-wide
+request_coalescer = SingleFlight(
+    lease_timeout=getattr(settings, 'STOCK_API_SETTINGS', {}).get('SINGLE_FLIGHT_LEASE', 30),
+    cache=coordination_cache,
+)
+
+# Daily OHLCV bars persisted across restarts
+price_history_store = PriceHistoryStore(
+    getattr(settings, 'STOCK_API_SETTINGS', {}).get(
+        'HISTORY_STORE_DIR', settings.BASE_DIR / 'data' / 'price_history'
+    )
+)
+
+# Widest history series per symbol and interval, shared by every service instance
+history_series_cache = HistorySeriesCache(
+    max_entries=getattr(settings, 'STOCK_API_SETTINGS', {}).get('HISTORY_CACHE_ENTRIES', 256),
+    ttl=getattr(settings, 'STOCK_API_SETTINGS', {}).get('CACHE_TIMEOUT', 300),
+    max_bytes=getattr(settings, 'STOCK_API_SETTINGS', {}).get('HISTORY_CACHE_BYTES'),
+    policy=getattr(settings, 'STOCK_API_SETTINGS', {}).get('HISTORY_CACHE_POLICY', 'lru'),
+)
+
+# Quotes shared by every worker process through a memory-mapped file
+quote_board = (
+    QuoteBoard(
+        getattr(settings, 'STOCK_API_SETTINGS', {}).get('QUOTE_BOARD_PATH'),
+        capacity=getattr(settings, 'STOCK_API_SETTINGS', {}).get('QUOTE_BOARD_CAPACITY', 4096),
+    )
+    if getattr(settings, 'STOCK_API_SETTINGS', {}).get('QUOTE_BOARD_PATH') else None
+)
+
+# How long quotes stay fresh depending on the trading session they were fetched in
+market_policy = (
+    QuoteFreshnessPolicy(
+        MarketCalendar(
+            getattr(settings, 'STOCK_API_SETTINGS', {}).get('MARKET_TIMEZONE', 'America/New_York'),
+            getattr(settings, 'STOCK_API_SETTINGS', {}).get('MARKET_HOLIDAYS', ()),
+        ),
+        regular_ttl=getattr(settings, 'STOCK_API_SETTINGS', {}).get('QUOTE_TTL_REGULAR', 60),
+        extended_ttl=getattr(settings, 'STOCK_API_SETTINGS', {}).get('QUOTE_TTL_EXTENDED', 300),
+    )
+    if getattr(settings, 'STOCK_API_SETTINGS', {}).get('MARKET_HOURS_POLICY', True) else None
+)
+
+# Quote providers with their circuit breakers and latency stats, shared process-wide
+provider_chain = build_provider_chain()
+
+# Cached records and history series written to disk so restarts start warm
+cache_snapshot = CacheSnapshot(
+    getattr(settings, 'STOCK_API_SETTINGS', {}).get(
+        'CACHE_SNAPSHOT_PATH', settings.BASE_DIR / 'data' / 'cache_snapshot.bin'
+    ),
+    history_cache=history_series_cache,
+)
+
+# Live prices served by views, persisted to Stocks in coalesced batches
+price_writer = PriceWriteBuffer(
+    flush_interval=getattr(settings, 'STOCK_API_SETTINGS', {}).get('PRICE_WRITE_INTERVAL', 10),
+    max_pending=getattr(settings, 'STOCK_API_SETTINGS', {}).get('PRICE_WRITE_MAX_PENDING', 500),
+)
+
+# Runs stale-while-revalidate refreshes off the request thread
+refresh_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'STOCK_API_SETTINGS', {}).get('REFRESH_WORKERS', 2),
+    thread_name_prefix='stock-refresh',
+)
+
 
 class StockDataService:
     """Service for fetching stock data from various APIs"""
     
+    NEGATIVE_INDEX_KEY = 'stock_negative_index'
+    
     def __init__(self):
         self.tiingo_token = getattr(settings, 'STOCK_API_SETTINGS', {}).get('TIINGO_API_TOKEN')
         self.alpha_vantage_key = getattr(settings, 'STOCK_API_SETTINGS', {}).get('ALPHA_VANTAGE_API_KEY')
         self.finnhub_key = getattr(settings, 'STOCK_API_SETTINGS', {}).get('FINNHUB_API_KEY')
         self.cache_timeout = getattr(settings, 'STOCK_API_SETTINGS', {}).get('CACHE_TIMEOUT', 300)
+        self.soft_ttl = getattr(settings, 'STOCK_API_SETTINGS', {}).get('QUOTE_SOFT_TTL', self.cache_timeout)
+        self.hard_ttl = max(
+            getattr(settings, 'STOCK_API_SETTINGS', {}).get('QUOTE_HARD_TTL', self.cache_timeout),
+            self.soft_ttl,
+        )
+        self.fundamentals_ttl = getattr(settings, 'STOCK_API_SETTINGS', {}).get('FUNDAMENTALS_TTL', 86400)
+        self.sparkline_ttl = getattr(settings, 'STOCK_API_SETTINGS', {}).get('SPARKLINE_TTL', 3600)
+        self.batch_size = getattr(settings, 'STOCK_API_SETTINGS', {}).get('BATCH_SIZE', 50)
+        self.max_workers = getattr(settings, 'STOCK_API_SETTINGS', {}).get('MAX_WORKERS', 8)
+        self.rate_limit_wait = getattr(settings, 'STOCK_API_SETTINGS', {}).get('RATE_LIMIT_WAIT', 30)
+        self.negative_ttl = getattr(settings, 'STOCK_API_SETTINGS', {}).get('NEGATIVE_CACHE_TTL', 60)
+        self.negative_max_ttl = getattr(settings, 'STOCK_API_SETTINGS', {}).get('NEGATIVE_CACHE_MAX_TTL', 3600)
+        self.single_flight = request_coalescer
+        self.history_store = price_history_store
+        self.history_cache = history_series_cache
+        self.snapshot = cache_snapshot
+        self.quote_board = quote_board
+        self.providers = provider_chain
+        self.market_policy = market_policy
+        self.request_path_fetch = getattr(settings, 'STOCK_API_SETTINGS', {}).get('REQUEST_PATH_FETCH', True)
+        self.publish_quotes = getattr(settings, 'STOCK_API_SETTINGS', {}).get('QUOTE_BOARD_PUBLISH', False)
+        self.snapshot_interval = getattr(settings, 'STOCK_API_SETTINGS', {}).get('CACHE_SNAPSHOT_INTERVAL', 300)
         
     def get_stock_data(self, symbol: str, use_cache: bool = True) -> Optional[Dict[str, Any]]:
         """
         Get comprehensive stock data for a given symbol.
-        """
-        cache_key = f"stock_data_{symbol}"
         
-        if use_cache:
-            cached_data = cache.get(cache_key)
-            if cached_data:
-                logger.info(f"Retrieved cached data for {symbol}")
-                return cached_data
+        The result is assembled from three cache records with their own
+        TTLs: the quote, the fundamentals and the 7-day sparkline, so a
+        price refresh only costs the cheap quote call. Quotes older than
+        the soft TTL are returned immediately, tagged as stale, while one
+        background refresh runs. Only a cold cache or an entry past the
+        hard TTL blocks on the providers, and concurrent misses for the
+        same symbol are coalesced so only one caller goes upstream. Missing
+        fundamentals never block: the stored profile is served while they
+        are fetched in the background.
         
+        With REQUEST_PATH_FETCH off, refresh_prices owns quote refreshes:
+        stale quotes are served as they are and misses fall back to the
+        price stored in the database.
+        """
         try:
-            # Try yfinance first (free and reliable)
-            stock_data = self._get_yfinance_data(symbol)
+            if not use_cache:
+                return self._fetch_stock_data(symbol)
+            
+            quote = self._read_quote(symbol)
+            if quote:
+                if quote['is_stale'] and self.request_path_fetch:
+                    self._schedule_refresh('quote', [symbol])
+                logger.info(f"Retrieved cached data for {symbol}")
+            elif self._is_missing(symbol):
+                logger.info(f"Skipping {symbol}: no provider had data for it recently")
+                return None
+            else:
+                if not self.request_path_fetch:
+                    # refresh_prices keeps this current; only unknown symbols go upstream
+                    quote = self._get_stored_quotes([symbol.upper()]).get(symbol.upper())
+                if not quote:
+                    quote = self._fetch_coalesced('quote', symbol)
+                if not quote:
+                    return None
             
-            if not stock_data and self.tiingo_token:
-                # Fallback to Tiingo
-                stock_data = self._get_tiingo_data(symbol)
+            fundamentals = cache.get(f"stock_fundamentals_{symbol}")
+            if fundamentals is None:
+                self._schedule_refresh('fundamentals', [symbol])
+            if not fundamentals:
+                fundamentals = self._get_stored_profiles([symbol.upper()]).get(symbol.upper())
             
-            if stock_data and use_cache:
-                cache.set(cache_key, stock_data, self.cache_timeout)
-                logger.info(f"Cached data for {symbol}")
-                
-            return stock_data
+            sparkline = cache.get(f"stock_sparkline_{symbol}")
+            if sparkline is None:
+                self._schedule_refresh('sparkline', [symbol])
+            
+            return self._assemble(symbol, quote, fundamentals, sparkline)
             
         except Exception as e:
             logger.error(f"Error fetching stock data for {symbol}: {str(e)}")
             return None
     
-    def _get_yfinance_data(self, symbol: str) -> Optional[Dict[str, Any]]:
-        """Fetch stock data using yfinance"""
+    def _fetch_stock_data(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Fetch all records for a symbol from the providers without caching them"""
+        quote = self._fetch_quote(symbol, store=False)
+        if not quote:
+            return None
+        
+        return self._assemble(
+            symbol,
+            quote,
+            self._fetch_fundamentals(symbol, store=False),
+            self._fetch_sparkline(symbol, store=False),
+        )
+    
+    def _assemble(self, symbol: str, quote: Dict[str, Any], fundamentals: Optional[Dict[str, Any]],
+                  sparkline: Optional[List[float]]) -> Dict[str, Any]:
+        """Merge the quote, fundamentals and sparkline records into one stock data dict"""
+        current_price = quote['current_price']
+        
+        # Defaults match what a missing yfinance info field used to produce
+        stock_data = {
+            'name': symbol,
+            'market_cap': 0,
+            'description': '',
+            'sector': '',
+            'industry': '',
+            'fifty_two_week_high': current_price,
+            'fifty_two_week_low': current_price,
+            'pe_ratio': None,
+            'forward_pe': None,
+            'dividend_yield': 0,
+            'average_volume': 0,
+            'beta': None,
+            'eps': None,
+        }
+        stock_data.update(fundamentals or {})
+        stock_data['name'] = stock_data['name'] or symbol
+        stock_data['sparkline_prices'] = sparkline or []
+        stock_data.update(quote)
+        stock_data.setdefault('is_stale', False)
+        stock_data.setdefault('age_seconds', 0)
+        stock_data.setdefault('version', quote_version(time.time()))
+        return stock_data
+    
+    def _fetch_record(self, kind: str, symbol: str, store: bool = True) -> Any:
+        """Fetch one cache record ('quote', 'fundamentals' or 'sparkline') from upstream"""
+        fetchers = {
+            'quote': self._fetch_quote,
+            'fundamentals': self._fetch_fundamentals,
+            'sparkline': self._fetch_sparkline,
+        }
+        return fetchers[kind](symbol, store)
+    
+    def _fetch_coalesced(self, kind: str, symbol: str) -> Any:
+        """Fetch and cache a record, sharing the result with concurrent callers"""
+        cache_key = f"stock_{kind}_{symbol}"
+        if kind == 'quote':
+            read_cached = lambda: self._read_quote(symbol, fresh_only=True)
+        else:
+            read_cached = lambda: cache.get(cache_key)
+        
+        return self.single_flight.do(cache_key, lambda: self._fetch_record(kind, symbol), read_cached)
+    
+    def _fetch_quote(self, symbol: str, store: bool = True) -> Optional[Dict[str, Any]]:
+        """Fetch a quote from the provider chain and optionally cache it"""
         try:
-            ticker = yf.Ticker(symbol)
-            info = ticker.info
-            hist = ticker.history(period="1d")
-            hist_7d = ticker.history(period="7d")  # For sparkline
+            data = self.providers.fetch_quote(symbol)
+        except NoProviderAnswered as e:
+            # Nothing was learned about the symbol, so don't count it against it
+            logger.warning(str(e))
+            return None
+        
+        if not data:
+            if store:
+                self._record_missing(symbol)
+            return None
+        
+        if store:
+            self._clear_missing(symbol)
+        
+        quote = {k: v for k, v in data.items() if k in QUOTE_FIELDS}
+        fundamentals = {k: v for k, v in data.items() if k in FUNDAMENTAL_FIELDS}
+        if fundamentals and store:
+            # Keep the provider's company data (e.g. Tiingo metadata) if we have none yet
+            self._cache_add(f"stock_fundamentals_{symbol}", fundamentals, self.fundamentals_ttl)
+        
+        if store:
+            self._write_quote(symbol, quote)
+            logger.info(f"Cached quote for {symbol}")
             
-            if hist.empty:
+        return quote
+    
+    def _fetch_fundamentals(self, symbol: str, store: bool = True) -> Dict[str, Any]:
+        """Fetch slow-moving company data and optionally cache it"""
+        fundamentals = self._get_yfinance_fundamentals(symbol)
+        
+        if store:
+            if fundamentals:
+                self.cache_set(f"stock_fundamentals_{symbol}", fundamentals, self.fundamentals_ttl)
+            else:
+                # Remember the miss briefly so every request doesn't retry ticker.info
+                self.cache_set(f"stock_fundamentals_{symbol}", {}, self.soft_ttl)
+        
+        return fundamentals or {}
+    
+    def _fetch_sparkline(self, symbol: str, store: bool = True) -> Optional[List[float]]:
+        """Fetch the 7-day closing prices and optionally cache them"""
+        hist = self.get_stock_history(symbol, period="7d")
+        if hist is None or hist.empty:
+            return None
+        
+        sparkline = [float(price) for price in hist['Close'].tolist()]
+        if store:
+            self.cache_set(f"stock_sparkline_{symbol}", sparkline, self.sparkline_ttl)
+        return sparkline
+    
+    def _read_quote(self, symbol: str, fresh_only: bool = False) -> Optional[Dict[str, Any]]:
+        """Read a cached quote tagged with its age and whether it is past its freshness window"""
+        entry = self.read_quote_envelope(symbol)
+        if not entry:
+            return None
+        
+        now = time.time()
+        age = now - entry['fetched_at']
+        is_stale = now > self.fresh_until(entry['fetched_at'])
+        if is_stale and fresh_only:
+            return None
+        
+        return dict(entry['data'], is_stale=is_stale, age_seconds=int(age),
+                    version=quote_version(entry['fetched_at']))
+    
+    def _write_quote(self, symbol: str, quote: Dict[str, Any]):
+        """
+        Cache a quote until its freshness window plus the stale grace, recording when it was fetched.
+        
+        Also tags quote with the version readers will see for it.
+        """
+        entry = {'data': quote, 'fetched_at': time.time()}
+        quote['version'] = quote_version(entry['fetched_at'])
+        if self.quote_board is not None and self.publish_quotes:
+            try:
+                if self.quote_board.publish(symbol, quote, entry['fetched_at']):
+                    return
+            except Exception as e:
+                logger.error(f"Error publishing {symbol} to the quote board: {str(e)}")
+        
+        self.cache_set(f"stock_quote_{symbol}", encode_quote(quote, entry['fetched_at']),
+                        self._quote_timeout(entry['fetched_at']))
+    
+    def fresh_until(self, fetched_at: float) -> float:
+        """When a quote fetched at fetched_at becomes stale (past the soft TTL)"""
+        if self.market_policy is None:
+            return fetched_at + self.soft_ttl
+        return self.market_policy.fresh_until(fetched_at)
+    
+    def _quote_timeout(self, fetched_at: float) -> int:
+        """Seconds to keep a quote: fresh period plus the stale-while-revalidate grace"""
+        grace = self.hard_ttl - self.soft_ttl
+        return max(int(self.fresh_until(fetched_at) - time.time()), 0) + grace
+    
+    def market_status(self) -> Dict[str, Any]:
+        """Current trading session and how long quotes fetched now stay fresh"""
+        if self.market_policy is None:
+            return {'state': 'unknown', 'quote_ttl': self.soft_ttl}
+        now = time.time()
+        status = self.market_policy.status(now)
+        status['quote_ttl'] = int(self.fresh_until(now) - now)
+        return status
+    
+    def read_quote_envelope(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """The cached quote with its fetch time ({'data', 'fetched_at'}), board first, without tagging it"""
+        return self._read_board(symbol) or self._read_cached_quote(symbol)
+    
+    def _read_cached_quote(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Read a quote envelope from the cache, where it is stored packed by encode_quote"""
+        payload = cache.get(f"stock_quote_{symbol}")
+        if not payload:
+            return None
+        try:
+            data, fetched_at = decode_quote(payload)
+        except Exception as e:
+            logger.warning(f"Discarding undecodable cached quote for {symbol}: {str(e)}")
+            return None
+        return {'data': data, 'fetched_at': fetched_at}
+    
+    def _read_board(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Read a quote envelope from the shared quote board, if it holds one within the hard TTL"""
+        if self.quote_board is None:
+            return None
+        try:
+            row = self.quote_board.get(symbol)
+        except Exception as e:
+            logger.error(f"Error reading {symbol} from the quote board: {str(e)}")
+            return None
+        if row is None or time.time() > self.fresh_until(row[1]) + self.hard_ttl - self.soft_ttl:
+            return None
+        return {'data': row[0], 'fetched_at': row[1]}
+    
+    def cache_set(self, key: str, value: Any, timeout: int):
+        """Cache a record and register it for the on-disk snapshot"""
+        cache.set(key, value, timeout)
+        self.snapshot.register(key, timeout)
+        self.snapshot.start(self.snapshot_interval)
+    
+    def _cache_add(self, key: str, value: Any, timeout: int) -> bool:
+        """Cache a record unless one exists, registering it for the snapshot"""
+        added = cache.add(key, value, timeout)
+        if added:
+            self.snapshot.register(key, timeout)
+            self.snapshot.start(self.snapshot_interval)
+        return added
+    
+    def load_cache_snapshot(self) -> int:
+        """Restore cached records from the last snapshot with their remaining TTLs"""
+        try:
+            return self.snapshot.load()
+        except Exception as e:
+            logger.error(f"Error loading cache snapshot: {str(e)}")
+            return 0
+    
+    def save_cache_snapshot(self) -> int:
+        """Write the records this process has cached to the snapshot file"""
+        try:
+            return self.snapshot.save()
+        except Exception as e:
+            logger.error(f"Error saving cache snapshot: {str(e)}")
+            return 0
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Memory used by cached stock data, per key family"""
+        stats = cache.stats() if hasattr(cache, 'stats') else {'families': {}}
+        stats['families']['history'] = self.history_cache.stats()
+        return stats
+    
+    def _is_missing(self, symbol: str) -> bool:
+        """True if providers had no data for the symbol and its retry time has not come yet"""
+        entry = cache.get(f"stock_negative_{symbol}")
+        return bool(entry) and entry['retry_at'] > time.time()
+    
+    def missing_symbols(self, symbols: List[str]) -> set:
+        """Subset of symbols that are currently negatively cached, in one cache lookup"""
+        now = time.time()
+        entries = cache.get_many([f"stock_negative_{symbol}" for symbol in symbols])
+        return {
+            key[len('stock_negative_'):] for key, entry in entries.items()
+            if entry['retry_at'] > now
+        }
+    
+    def _record_missing(self, symbol: str):
+        """Skip a symbol no provider has data for, backing off exponentially while it keeps failing"""
+        key = f"stock_negative_{symbol}"
+        now = time.time()
+        entry = cache.get(key) or {'failures': 0, 'first_failed': now}
+        entry['failures'] += 1
+        entry['last_failed'] = now
+        entry['retry_at'] = now + min(
+            self.negative_ttl * 2 ** (entry['failures'] - 1), self.negative_max_ttl
+        )
+        # Keep the record past retry_at so the failure count survives until the next attempt
+        cache.set(key, entry, self.negative_max_ttl * 2)
+        
+        index = cache.get(self.NEGATIVE_INDEX_KEY) or set()
+        if symbol not in index:
+            index.add(symbol)
+            cache.set(self.NEGATIVE_INDEX_KEY, index, None)
+        logger.info(f"No data for {symbol} ({entry['failures']} times), skipping it for "
+                    f"{int(entry['retry_at'] - now)}s")
+    
+    def _clear_missing(self, symbol: str):
+        cache.delete(f"stock_negative_{symbol}")
+    
+    def negative_cache_stats(self) -> Dict[str, Any]:
+        """Symbols currently skipped because providers had no data for them"""
+        index = cache.get(self.NEGATIVE_INDEX_KEY) or set()
+        entries = cache.get_many([f"stock_negative_{symbol}" for symbol in index])
+        
+        now = time.time()
+        symbols = {}
+        for symbol in sorted(index):
+            entry = entries.get(f"stock_negative_{symbol}")
+            if entry:
+                symbols[symbol] = {
+                    'failures': entry['failures'],
+                    'retry_in': max(0, int(entry['retry_at'] - now)),
+                }
+        
+        if len(symbols) != len(index):
+            # Drop symbols whose records expired or were cleared
+            cache.set(self.NEGATIVE_INDEX_KEY, set(symbols), None)
+        
+        return {
+            'count': len(symbols),
+            'skipping': sum(1 for entry in symbols.values() if entry['retry_in'] > 0),
+            'symbols': symbols,
+        }
+    
+    def _schedule_refresh(self, kind: str, symbols: List[str]):
+        """Refresh records in the background, once per symbol across workers"""
+        # Claims live in the coordination cache so other workers see them
+        claimed = [
+            symbol for symbol in symbols
+            if self.single_flight.cache.add(f"stock_refresh_{kind}_{symbol}", 1, self.single_flight.lease_timeout)
+        ]
+        if claimed:
+            refresh_executor.submit(self._refresh_records, kind, claimed)
+    
+    def _refresh_records(self, kind: str, symbols: List[str]):
+        """Background job that refetches records and releases their refresh claims"""
+        try:
+            if kind == 'quote' and len(symbols) > 1:
+                self.load_quotes(symbols, store=True)
+            else:
+                self.fetch_concurrently(symbols, lambda symbol: self._fetch_coalesced(kind, symbol))
+        except Exception as e:
+            logger.error(f"Background {kind} refresh failed for {', '.join(symbols)}: {str(e)}")
+        finally:
+            self.single_flight.cache.delete_many([f"stock_refresh_{kind}_{symbol}" for symbol in symbols])
+            connections.close_all()
+    
+    def _throttle(self, provider: str, requests_needed: int = 1) -> bool:
+        """Wait for the provider's shared rate limit; False if the quota stays exhausted"""
+        return get_rate_limiter(provider).acquire(requests_needed, timeout=self.rate_limit_wait)
+    
+    def fetch_concurrently(self, items: List[Any], fetch: Callable[[Any], Any],
+                            max_workers: Optional[int] = None) -> Dict[Any, Any]:
+        """Run fetch for every item on a bounded thread pool, returning non-empty results"""
+        results = {}
+        workers = min(max_workers or self.max_workers, len(items))
+        if workers <= 1:
+            for item in items:
+                result = fetch(item)
+                if result:
+                    results[item] = result
+            return results
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='stock-fetch') as executor:
+            futures = {executor.submit(fetch, item): item for item in items}
+            for future in as_completed(futures):
+                item = futures[future]
+                try:
+                    result = future.result()
+                    if result:
+                        results[item] = result
+                except Exception as e:
+                    logger.error(f"Concurrent fetch failed for {item}: {str(e)}")
+        return results
+    
+    def _get_yfinance_fundamentals(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Fetch company profile and valuation fields using yfinance"""
+        if not self._throttle('yfinance'):
+            return None
+        
+        try:
+            info = yf.Ticker(symbol).info
+            if not info:
                 return None
-                
-            current_price = hist['Close'].iloc[-1]
-            previous_close = info.get('previousClose', current_price)
-            
-            # Calculate day change
-            day_change = float(current_price - previous_close)
-            day_change_percent = float((day_change / previous_close) * 100) if previous_close else 0
             
-            # Get 7-day prices for sparkline
-            sparkline_prices = []
-            if not hist_7d.empty:
-                sparkline_prices = [float(price) for price in hist_7d['Close'].tolist()]
-            
-            return {
-                'symbol': symbol.upper(),
+            fundamentals = {
                 'name': info.get('longName', symbol),
-                'current_price': float(current_price),
-                'previous_close': float(previous_close),
-                'day_change': day_change,
-                'day_change_percent': day_change_percent,
-                'volume': int(info.get('volume', 0)),
                 'market_cap': info.get('marketCap', 0),
                 'description': info.get('longBusinessSummary', ''),
                 'sector': info.get('sector', ''),
                 'industry': info.get('industry', ''),
-                # New fields for improved cards
-                'day_high': float(info.get('dayHigh', current_price)),
-                'day_low': float(info.get('dayLow', current_price)),
-                'open_price': float(info.get('open', current_price)),
-                'fifty_two_week_high': float(info.get('fiftyTwoWeekHigh', current_price)),
-                'fifty_two_week_low': float(info.get('fiftyTwoWeekLow', current_price)),
                 'pe_ratio': info.get('trailingPE', None),
                 'forward_pe': info.get('forwardPE', None),
                 'dividend_yield': info.get('dividendYield', 0),
                 'average_volume': int(info.get('averageVolume', 0)),
                 'beta': info.get('beta', None),
                 'eps': info.get('trailingEps', None),
-                'sparkline_prices': sparkline_prices,
-                'last_updated': datetime.now().isoformat(),
-                'source': 'yfinance'
             }
+            # The 52-week range falls back to the current price when missing
+            if info.get('fiftyTwoWeekHigh') is not None:
+                fundamentals['fifty_two_week_high'] = float(info['fiftyTwoWeekHigh'])
+            if info.get('fiftyTwoWeekLow') is not None:
+                fundamentals['fifty_two_week_low'] = float(info['fiftyTwoWeekLow'])
+            
+            return fundamentals
             
         except Exception as e:
-            logger.warning(f"yfinance failed for {symbol}: {str(e)}")
+            logger.warning(f"yfinance info failed for {symbol}: {str(e)}")
             return None
     
-    def _get_tiingo_data(self, symbol: str) -> Optional[Dict[str, Any]]:
-        """Fetch stock data using Tiingo API"""
-        if not self.tiingo_token:
-            return None
-            
+    def _get_yfinance_batch(self, symbols: List[str], max_workers: Optional[int] = None) -> Dict[str, pd.DataFrame]:
+        """Download 7 days of daily bars for many symbols with bulk requests"""
+        tickers = sorted({symbol.upper() for symbol in symbols})
+        chunks = [tuple(tickers[i:i + self.batch_size]) for i in range(0, len(tickers), self.batch_size)]
+        
+        results = {}
+        for frames in self.fetch_concurrently(chunks, self._download_chunk, max_workers).values():
+            results.update(frames)
+        return results
+    
+    def _download_chunk(self, chunk: tuple) -> Dict[str, pd.DataFrame]:
+        """Download 7 days of daily bars for one chunk of tickers"""
+        # Share yfinance's circuit breaker so an outage sends symbols straight to the fallback chain
+        breaker = self.providers.get('yfinance').breaker if self.providers.get('yfinance') else None
+        if breaker is not None and not breaker.allow():
+            return {}
+        
+        # yf.download issues one chart request per ticker
+        if not self._throttle('yfinance', len(chunk)):
+            if breaker is not None:
+                breaker.release_trial()
+            return {}
+        
         try:
-            headers = {'Content-Type': 'application/json'}
+            frame = yf.download(
+                list(chunk),
+                period="7d",
+                interval="1d",
+                group_by="ticker",
+                auto_adjust=True,
+                progress=False,
+            )
+        except Exception as e:
+            logger.warning(f"yfinance batch download failed for {', '.join(chunk)}: {str(e)}")
+            if breaker is not None:
+                breaker.record_failure()
+            return {}
+        
+        if breaker is not None:
+            breaker.record_success()
+        
+        if frame is None or frame.empty:
+            return {}
+        
+        frames = {}
+        for ticker in chunk:
+            try:
+                hist = frame[ticker] if isinstance(frame.columns, pd.MultiIndex) else frame
+                hist = hist.dropna(subset=['Close'])
+                if not hist.empty:
+                    frames[ticker] = hist
+            except KeyError:
+                continue
+        return frames
+    
+    def _get_stored_profiles(self, tickers: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Load descriptive fields for tickers from the database in one query"""
+        try:
+            rows = Stocks.objects.filter(ticker__in=tickers).values(
+                'ticker', 'name', 'description', 'sector', 'industry', 'market_cap'
+            )
+            return {row.pop('ticker'): row for row in rows}
+        except Exception as e:
+            logger.warning(f"Could not load stored profiles: {str(e)}")
+            return {}
+    
+    def _get_stored_quotes(self, tickers: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Build stale-tagged quotes from the prices saved in the database, in one query"""
+        try:
+            rows = Stocks.objects.filter(ticker__in=tickers).values('ticker', 'curr_price', 'volume', 'last_updated')
+        except Exception as e:
+            logger.warning(f"Could not load stored prices: {str(e)}")
+            return {}
+        
+        quotes = {}
+        for row in rows:
+            age = (datetime.now(row['last_updated'].tzinfo) - row['last_updated']).total_seconds()
+            quotes[row['ticker']] = {
+                'symbol': row['ticker'],
+                'current_price': float(row['curr_price']),
+                'volume': row['volume'],
+                'last_updated': row['last_updated'].isoformat(),
+                'source': 'database',
+                'is_stale': True,
+                'age_seconds': int(age),
+                'version': quote_version(row['last_updated'].timestamp()),
+            }
+        return quotes
+    
+    def get_multiple_stocks(self, symbols: List[str], use_cache: bool = True,
+                            max_workers: Optional[int] = None,
+                            full_details: bool = False,
+                            refresh: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        Get data for multiple stocks.
+        
+        Cached quotes are served from the cache (stale ones are refreshed
+        in one background batch), the rest are fetched with bulk downloads
+        and only symbols the batch could not price fall back to the
+        per-symbol path. Downloads and fallbacks run on a thread pool of at
+        most max_workers threads (MAX_WORKERS by default, 1 = serial),
+        gated by the per-provider rate limiters.
+        
+        Missing fundamentals are filled from the database and fetched in
+        the background, unless full_details is set, in which case they are
+        fetched before returning (needed for stocks not in the database yet).
+        
+        With refresh set, cached quotes are ignored but fresh ones are still
+        written back (used to warm the cache). With REQUEST_PATH_FETCH off,
+        quotes are not refreshed here and misses use the stored prices.
+        """
+        quotes = {}
+        missing = []
+        stale = []
+        
+        for symbol in dict.fromkeys(symbols):
+            if use_cache and not refresh:
+                quote = self._read_quote(symbol)
+                if quote:
+                    quotes[symbol] = quote
+                    if quote['is_stale']:
+                        stale.append(symbol)
+                    continue
+            missing.append(symbol)
+        
+        if stale and self.request_path_fetch:
+            self._schedule_refresh('quote', stale)
+        
+        if missing and use_cache and not refresh:
+            skipped = self.missing_symbols(missing)
+            missing = [symbol for symbol in missing if symbol not in skipped]
+        
+        if missing and use_cache and not refresh and not self.request_path_fetch:
+            # refresh_prices keeps these current; only unknown symbols go upstream
+            stored = self._get_stored_quotes([symbol.upper() for symbol in missing])
+            for symbol in missing:
+                if symbol.upper() in stored:
+                    quotes[symbol] = stored[symbol.upper()]
+            missing = [symbol for symbol in missing if symbol not in quotes]
+        
+        sparklines = {}
+        if missing:
+            loaded_quotes, sparklines = self.load_quotes(missing, use_cache, max_workers)
+            quotes.update(loaded_quotes)
+        
+        return self._assemble_many(quotes, sparklines, use_cache, max_workers, full_details)
+    
+    def load_quotes(self, symbols: List[str], store: bool = True,
+                     max_workers: Optional[int] = None) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, List[float]]]:
+        """
+        Fetch quotes in batch with a per-symbol fallback, optionally caching them.
+        
+        Returns (quotes, sparklines); the batch download yields the 7-day
+        sparkline for free, so it is kept as well.
+        """
+        quotes = {}
+        sparklines = {}
+        frames = self._get_yfinance_batch(symbols, max_workers)
+        fallback = []
+        
+        for symbol in symbols:
+            hist = frames.get(symbol.upper())
+            if hist is None:
+                fallback.append(symbol)
+                continue
             
-            # Get stock metadata
-            meta_url = f"https://api.tiingo.com/tiingo/daily/{symbol}?token={self.tiingo_token}"
-            price_url = f"https://api.tiingo.com/tiingo/daily/{symbol}/prices?token={self.tiingo_token}"
+            try:
+                quotes[symbol] = quote_from_bars(symbol, hist)
+                sparklines[symbol] = [float(price) for price in hist['Close'].tolist()]
+            except Exception as e:
+                logger.warning(f"yfinance batch parse failed for {symbol}: {str(e)}")
+                fallback.append(symbol)
+                continue
             
-            meta_response = requests.get(meta_url, headers=headers, timeout=10)
-            price_response = requests.get(price_url, headers=headers, timeout=10)
+            if store:
+                self._write_quote(symbol, quotes[symbol])
+                self.cache_set(f"stock_sparkline_{symbol}", sparklines[symbol], self.sparkline_ttl)
+                self._extend_history(symbol, hist)
+        
+        if fallback:
+            # Multi-ticker endpoints of the other providers before going symbol by symbol
+            batch_quotes = self.providers.fetch_quotes(fallback, exclude=('yfinance',))
+            for symbol, quote in batch_quotes.items():
+                quotes[symbol] = quote
+                if store:
+                    self._write_quote(symbol, quote)
+            fallback = [symbol for symbol in fallback if symbol not in batch_quotes]
+        
+        if fallback:
+            if store:
+                fetch = lambda symbol: self._fetch_coalesced('quote', symbol)
+            else:
+                fetch = lambda symbol: self._fetch_quote(symbol, store=False)
+            quotes.update(self.fetch_concurrently(fallback, fetch, max_workers))
+        
+        logger.info(f"Fetched {len(symbols) - len(fallback)} of {len(symbols)} uncached symbols in batch")
+        return quotes, sparklines
+    
+    def _assemble_many(self, quotes: Dict[str, Dict[str, Any]], sparklines: Dict[str, List[float]],
+                       use_cache: bool = True, max_workers: Optional[int] = None,
+                       full_details: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Join quotes with their fundamentals and sparkline records"""
+        if not quotes:
+            return {}
+        
+        symbols = list(quotes)
+        fundamentals = {}
+        sparklines = dict(sparklines)
+        
+        if use_cache:
+            records = cache.get_many(
+                [f"stock_fundamentals_{symbol}" for symbol in symbols] +
+                [f"stock_sparkline_{symbol}" for symbol in symbols if symbol not in sparklines]
+            )
+            for symbol in symbols:
+                if f"stock_fundamentals_{symbol}" in records:
+                    fundamentals[symbol] = records[f"stock_fundamentals_{symbol}"]
+                if f"stock_sparkline_{symbol}" in records:
+                    sparklines[symbol] = records[f"stock_sparkline_{symbol}"]
+        
+        missing_fundamentals = [symbol for symbol in symbols if symbol not in fundamentals]
+        if missing_fundamentals:
+            if full_details or not use_cache:
+                fundamentals.update(self.fetch_concurrently(
+                    missing_fundamentals,
+                    lambda symbol: self._fetch_fundamentals(symbol, store=use_cache),
+                    max_workers,
+                ))
+            else:
+                self._schedule_refresh('fundamentals', missing_fundamentals)
+        
+        missing_sparklines = [symbol for symbol in symbols if symbol not in sparklines]
+        if missing_sparklines:
+            if use_cache:
+                self._schedule_refresh('sparkline', missing_sparklines)
+            else:
+                sparklines.update(self.fetch_concurrently(
+                    missing_sparklines,
+                    lambda symbol: self._fetch_sparkline(symbol, store=False),
+                    max_workers,
+                ))
+        
+        # Fall back to the stored profile for symbols without fundamentals
+        profiles = self._get_stored_profiles(
+            [symbol.upper() for symbol in symbols if not fundamentals.get(symbol)]
+        )
+        
+        return {
+            symbol: self._assemble(
+                symbol,
+                quotes[symbol],
+                fundamentals.get(symbol) or profiles.get(symbol.upper()),
+                sparklines.get(symbol),
+            )
+            for symbol in symbols
+        }
+    
+    def get_stock_history(self, symbol: str, period: str = "1mo", interval: str = "1d") -> Optional[pd.DataFrame]:
+        """
+        Get historical bars.
+        
+        One widest series is held per symbol and interval; narrower periods
+        are served as slices of it. Only a request reaching further back
+        than the held series, or an expired one, fetches, and then only the
+        missing range. Daily bars are read from the local history store,
+        whose gaps (usually just the tail since the last stored bar) are
+        the only part fetched upstream.
+        """
+        start = period_start(period, date.today())
+        
+        hist = self.history_cache.get(symbol, interval, start)
+        if hist is not None:
+            return hist
+        
+        def fetch():
+            held = self.history_cache.peek(symbol, interval)
+            widest = start
+            if held and self.history_cache.covers(held['start'], start):
+                widest = held['start']
             
-            if meta_response.status_code == 200 and price_response.status_code == 200:
-                metadata = meta_response.json()
-                price_data = price_response.json()
-                
-                if price_data:
-                    latest_price = price_data[0]
-                    current_price = latest_price['close']
-                    previous_close = latest_price.get('prevClose', current_price)
-                    
-                    return {
-                        'symbol': metadata['ticker'],
-                        'name': metadata['name'],
-                        'current_price': float(current_price),
-                        'previous_close': float(previous_close),
-                        'day_change': float(current_price - previous_close),
-                        'day_change_percent': float((current_price - previous_close) / previous_close * 100) if previous_close else 0,
-                        'volume': int(latest_price.get('volume', 0)),
-                        'description': metadata.get('description', ''),
-                        'last_updated': datetime.now().isoformat(),
-                        'source': 'tiingo'
-                    }
-                    
-        except Exception as e:
-            logger.warning(f"Tiingo API failed for {symbol}: {str(e)}")
+            if interval == "1d":
+                series = self._load_history(symbol, widest)
+            else:
+                series = self._load_intraday(symbol, interval, widest, held)
             
+            if series is not None and not series.empty:
+                self.history_cache.put(symbol, interval, widest, series)
+                return series
+            return None
+        
+        requested_at = time.time()
+        
+        def read_cached():
+            hist = self.history_cache.get(symbol, interval, start)
+            if hist is None and interval == "1d":
+                # Another process may have synced the shared store while we waited
+                hist = self._read_synced_history(symbol, start, requested_at)
+                if hist is not None:
+                    self.history_cache.put(symbol, interval, start, hist)
+            return hist
+        
+        try:
+            series = self.single_flight.do(f"stock_history_{symbol}_{interval}", fetch, read_cached)
+            if series is not None:
+                return self.history_cache.slice(series, start)
+        except Exception as e:
+            logger.error(f"Error fetching history for {symbol}: {str(e)}")
+        
         return None
     
-    def get_multiple_stocks(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
-        """Get data for multiple stocks"""
-        results = {}
-        for symbol in symbols:
-            data = self.get_stock_data(symbol)
-            if data:
-                results[symbol] = data
-        return results
+    def _load_history(self, symbol: str, start: Optional[date]) -> Optional[pd.DataFrame]:
+        """Sync the history store from start and read it back with today's bar"""
+        recent = self._sync_history(symbol, start)
+        
+        hist = self.history_store.read_frame(symbol, start)
+        if recent is not None:
+            hist = pd.concat([hist, recent])
+        
+        if hist.empty and start is not None:
+            # e.g. '1d' on a weekend: serve the latest stored bar
+            hist = self.history_store.read_frame(symbol).iloc[-1:]
+        return hist if not hist.empty else None
     
-    def get_stock_history(self, symbol: str, period: str = "1mo") -> Optional[pd.DataFrame]:
-        """Get historical stock data"""
-        cache_key = f"stock_history_{symbol}_{period}"
+    def _read_synced_history(self, symbol: str, start: Optional[date], since: float) -> Optional[pd.DataFrame]:
+        """Daily bars from start if the history store was synced to cover them after since"""
+        meta = self.history_store.get_meta(symbol)
+        covered_from = meta.get('covered_from')
+        if covered_from is None or meta.get('synced_at', 0) < since:
+            return None
+        if covered_from != 'max' and (start is None or start < date.fromisoformat(covered_from)):
+            return None
+        hist = self.history_store.read_frame(symbol, start)
+        return hist if not hist.empty else None
+    
+    def _load_intraday(self, symbol: str, interval: str, start: Optional[date],
+                       held: Optional[dict]) -> Optional[pd.DataFrame]:
+        """Extend a held intraday series with only the missing head and tail ranges"""
+        tomorrow = date.today() + timedelta(days=1)
+        if not held or held['frame'].empty:
+            return self._fetch_bars(symbol, start, tomorrow, interval)
         
-        cached_data = cache.get(cache_key)
-        if cached_data is not None:
-            return cached_data
+        frame = held['frame']
+        parts = []
+        if not self.history_cache.covers(held['start'], start):
+            head = self._fetch_bars(symbol, start, frame.index[0].date(), interval)
+            if head is None:
+                return None
+            parts.append(head)
+        
+        parts.append(frame)
+        # The last held bar may still have been forming, so refetch from it
+        tail = self._fetch_bars(symbol, frame.index[-1].date(), tomorrow, interval)
+        if tail is None:
+            return None
+        parts.append(tail)
+        
+        series = pd.concat([part for part in parts if not part.empty])
+        return series[~series.index.duplicated(keep='last')].sort_index()
+    
+    def sync_history(self, symbol: str, period: str = "1mo") -> Optional[pd.DataFrame]:
+        """
+        Make sure the history store covers period for symbol.
+        
+        Fetches older bars only if the period reaches further back than
+        anything fetched before, then the tail since the last stored bar.
+        Completed bars are persisted; returns the unsaved bars for today.
+        """
+        return self._sync_history(symbol, period_start(period, date.today()))
+    
+    def _sync_history(self, symbol: str, start: Optional[date]) -> Optional[pd.DataFrame]:
+        today = date.today()
+        meta = self.history_store.get_meta(symbol)
+        covered_from = meta.get('covered_from')
+        span = self.history_store.date_range(symbol)
+        
+        needs_head = (
+            span is None or covered_from is None or
+            (covered_from != 'max' and (start is None or start < date.fromisoformat(covered_from)))
+        )
+        if needs_head:
+            end = span[0] if span else today + timedelta(days=1)
+            bars = self._fetch_bars(symbol, start, end)
+            if bars is None:
+                return None
+            self.history_store.merge(symbol, bars, before=today)
+            self.history_store.set_meta(symbol, covered_from=start.isoformat() if start else 'max', synced_at=time.time())
+            span = self.history_store.date_range(symbol)
+            if span is None or end > today:
+                return self._unsaved_bars(bars, today)
+        
+        # Only the bars after the last stored one are missing
+        bars = self._fetch_bars(symbol, span[1] + timedelta(days=1), today + timedelta(days=1))
+        if bars is None:
+            return None
+        self.history_store.append(symbol, bars, before=today)
+        self.history_store.set_meta(symbol, synced_at=time.time())
+        return self._unsaved_bars(bars, today)
+    
+    def backfill_history(self, symbols: List[str], period: str = "5y",
+                         max_workers: Optional[int] = None) -> Dict[str, tuple]:
+        """Sync the history store for many symbols concurrently, returning stored date ranges"""
+        def backfill(symbol):
+            self.sync_history(symbol, period)
+            return self.history_store.date_range(symbol)
+        
+        return self.fetch_concurrently(symbols, backfill, max_workers)
+    
+    def _fetch_bars(self, symbol: str, start: Optional[date], end: date,
+                    interval: str = "1d") -> Optional[pd.DataFrame]:
+        """Fetch bars in [start, end) from yfinance; start None means all history"""
+        if start is not None and start >= end:
+            return pd.DataFrame()
+        if not self._throttle('yfinance'):
+            return None
         
         try:
             ticker = yf.Ticker(symbol)
-            hist = ticker.history(period=period)
-            
-            if not hist.empty:
-                cache.set(cache_key, hist, self.cache_timeout)
-                return hist
-                
+            if start is None:
+                return ticker.history(period="max", interval=interval)
+            return ticker.history(start=start.isoformat(), end=end.isoformat(), interval=interval)
         except Exception as e:
-            logger.error(f"Error fetching history for {symbol}: {str(e)}")
-        
-        return None
+            logger.warning(f"yfinance history failed for {symbol}: {str(e)}")
+            return None
+    
+    def _unsaved_bars(self, bars: pd.DataFrame, today: date) -> Optional[pd.DataFrame]:
+        """Today's bar is still forming, so it is returned but never stored"""
+        if bars is None or bars.empty:
+            return None
+        recent = bars[pd.DatetimeIndex(bars.index).date >= today]
+        if recent.empty:
+            return None
+        return recent[['Open', 'High', 'Low', 'Close', 'Volume']].set_axis(
+            pd.DatetimeIndex([pd.Timestamp(today)] * len(recent), name='Date'), axis=0
+        )
+    
+    def _extend_history(self, symbol: str, hist: pd.DataFrame):
+        """Append recent bars to the store when they connect to its last stored bar"""
+        try:
+            span = self.history_store.date_range(symbol)
+            if span and pd.DatetimeIndex(hist.index).date[0] <= span[1]:
+                self.history_store.append(symbol, hist, before=date.today())
+        except Exception as e:
+            logger.warning(f"Could not extend stored history for {symbol}: {str(e)}")
     
     def search_stocks(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
         """Search for stocks by name or symbol"""
@@ -217,58 +1068,57 @@ class PortfolioAnalyzer:
     def __init__(self):
         self.stock_service = StockDataService()
     
+    def _valuation(self, portfolio_data: List[Dict]) -> Valuation:
+        """
+        Value position dicts (current_price, quantity, avg_purchase_price, sector).
+
+        Each dict is priced on its own, keyed by its position in the list,
+        so dicts that share a symbol keep their own price and sector.
+        """
+        keys = [str(i) for i in range(len(portfolio_data))]
+        holdings = Holdings.build(
+            (key, position.get('quantity', 0),
+             Decimal(str(position.get('avg_purchase_price', 0))) * Decimal(str(position.get('quantity', 0))),
+             position)
+            for key, position in zip(keys, portfolio_data)
+        )
+        prices = PriceVector.from_prices(
+            {key: position.get('current_price', 0) for key, position in zip(keys, portfolio_data)},
+            {key: position.get('sector', UNKNOWN_SECTOR) for key, position in zip(keys, portfolio_data)},
+        )
+        return Valuation(holdings, prices)
+    
     def calculate_portfolio_metrics(self, portfolio_data: List[Dict]) -> Dict[str, Any]:
         """Calculate comprehensive portfolio metrics"""
-        total_value = 0
-        total_invested = 0
-        total_gain_loss = 0
-        
-        for position in portfolio_data:
-            current_price = position.get('current_price', 0)
-            quantity = position.get('quantity', 0)
-            avg_purchase_price = position.get('avg_purchase_price', 0)
-            
-            position_value = current_price * quantity
-            position_invested = avg_purchase_price * quantity
-            position_gain_loss = position_value - position_invested
-            
-            total_value += position_value
-            total_invested += position_invested
-            total_gain_loss += position_gain_loss
-        
-        total_return_pct = (total_gain_loss / total_invested * 100) if total_invested > 0 else 0
-        
+        valuation = self._valuation(portfolio_data)
         return {
-            'total_value': round(total_value, 2),
-            'total_invested': round(total_invested, 2),
-            'total_gain_loss': round(total_gain_loss, 2),
-            'total_return_percentage': round(total_return_pct, 2),
+            'total_value': valuation.total_value,
+            'total_invested': valuation.total_cost,
+            'total_gain_loss': valuation.total_pnl,
+            'total_return_percentage': round(valuation.total_return_percent, 2),
             'number_of_positions': len(portfolio_data),
         }
     
     def get_sector_allocation(self, portfolio_data: List[Dict]) -> Dict[str, float]:
         """Calculate portfolio allocation by sector"""
-        sector_allocation = {}
-        total_value = 0
-        
-        for position in portfolio_data:
-            sector = position.get('sector', 'Unknown')
-            value = position.get('current_price', 0) * position.get('quantity', 0)
-            
-            if sector not in sector_allocation:
-                sector_allocation[sector] = 0
-            
-            sector_allocation[sector] += value
-            total_value += value
-        
-        # Convert to percentages
-        if total_value > 0:
-            for sector in sector_allocation:
-                sector_allocation[sector] = round(sector_allocation[sector] / total_value * 100, 2)
-        
-        return sector_allocation
+        return self._valuation(portfolio_data).sector_allocation()
 
 
 # Singleton instances
 stock_service = StockDataService()
 portfolio_analyzer = PortfolioAnalyzer()
+
+# Polls each streamed symbol once per interval for every SSE client in the process
+price_hub = PriceHub(
+    stock_service,
+    poll_interval=getattr(settings, 'STOCK_API_SETTINGS', {}).get('STREAM_POLL_INTERVAL', 5),
+    on_change=price_writer.record_quote,
+)
+
+# Home page lists shared by all users, rebuilt once per MARKET_BOARD_TTL
+market_board = MarketBoard(
+    stock_service,
+    refresh_executor,
+    ttl=getattr(settings, 'STOCK_API_SETTINGS', {}).get('MARKET_BOARD_TTL', 60),
+    universe=getattr(settings, 'STOCK_API_SETTINGS', {}).get('MARKET_BOARD_UNIVERSE', 50),
+)
@@ -0,0 +1,145 @@
+"""
+Request coalescing for cache misses.
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from .cache_backends import SharedCache
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """An in-flight load that other threads can wait on"""
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Make sure only one caller loads a given cache key at a time.
+
+    Within a process, the first caller for a key becomes the leader and every
+    other thread waits for its result. Across processes, the leader also
+    takes a short lease in a cache shared by all workers and leaves its
+    result there; a process that finds the lease taken polls for that
+    result (or the caller's own cache) instead of going upstream itself.
+    """
+
+    STATS_KEY = 'singleflight_saved'
+
+    def __init__(self, lease_timeout: int = 30, poll_interval: float = 0.1,
+                 cache: Optional[SharedCache] = None):
+        self.lease_timeout = lease_timeout
+        self.poll_interval = poll_interval
+        self.cache = cache or SharedCache()
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self._stats = {'loads': 0, 'coalesced_local': 0, 'coalesced_remote': 0, 'timeouts': 0}
+
+    def do(self, key: str, fetch: Callable[[], Any], read_cached: Callable[[], Any]) -> Any:
+        """
+        Load key with fetch unless a load is already in flight.
+
+        fetch must store its result in the cache; read_cached reads it back
+        and is used to pick up results loaded by other processes.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            if call.event.wait(self.lease_timeout):
+                self._record_saved('coalesced_local')
+                if call.error is not None:
+                    raise call.error
+                return call.result
+            # The leader is stuck; don't hand back its missing result as if it were an answer
+            logger.info(f"Leader for {key} still running after {self.lease_timeout}s, fetching directly")
+            self._count('timeouts')
+            value = read_cached()
+            if value is not None:
+                return value
+            self._count('loads')
+            return fetch()
+
+        try:
+            call.result = self._fetch_with_lease(key, fetch, read_cached)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def _fetch_with_lease(self, key: str, fetch: Callable[[], Any], read_cached: Callable[[], Any]) -> Any:
+        """Fetch under a cross-process lease, or wait for the lease holder's result"""
+        lease_key = f"singleflight_{key}"
+        result_key = f"singleflight_result_{key}"
+
+        if self.cache.add(lease_key, 1, self.lease_timeout):
+            try:
+                self._count('loads')
+                value = fetch()
+                if value is not None:
+                    self._share(result_key, value)
+                return value
+            finally:
+                self.cache.delete(lease_key)
+
+        deadline = time.monotonic() + self.lease_timeout
+        while time.monotonic() < deadline:
+            value = read_cached()
+            if value is None:
+                value = self.cache.get(result_key)
+            if value is not None:
+                self._record_saved('coalesced_remote')
+                return value
+            if self.cache.get(lease_key) is None:
+                # The holder finished without caching anything
+                break
+
+            time.sleep(self.poll_interval)
+
+        logger.info(f"Lease for {key} not resolved, fetching directly")
+        self._count('loads')
+        return fetch()
+
+    def _share(self, result_key: str, value: Any):
+        """Leave a result where followers in other processes can pick it up"""
+        try:
+            self.cache.set(result_key, value, self.lease_timeout)
+        except Exception as e:
+            logger.warning(f"Could not share {result_key} with other workers: {str(e)}")
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _record_saved(self, name: str):
+        """Count a duplicate upstream call that was avoided"""
+        self._count(name)
+        try:
+            if not self.cache.add(self.STATS_KEY, 1, None):
+                self.cache.incr(self.STATS_KEY)
+        except ValueError:
+            self.cache.add(self.STATS_KEY, 1, None)
+
+    def stats(self) -> Dict[str, Optional[int]]:
+        """Return coalescing counters for this process and across all processes"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['saved_process'] = stats['coalesced_local'] + stats['coalesced_remote']
+        stats['saved_total'] = self.cache.get(self.STATS_KEY)
+        return stats
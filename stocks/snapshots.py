@@ -0,0 +1,177 @@
+"""
+Daily portfolio snapshots for value-over-time charts.
+
+take_snapshots values every user's holdings at the day's close in one
+pass: all open Position rows go through one valuation and are summed per
+user with NumPy, and the rows are bulk inserted. backfill_snapshots rebuilds
+missing days for a user by replaying the Transaction ledger against the
+closes in the local price history store.
+"""
+import logging
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from django.db.models import Sum
+
+from .history_store import to_day_number
+from .ledger import replay, user_trades
+from .models import PortfolioSnapshot, Position, Stocks
+from .valuation import Holdings, PriceVector, Valuation, cents_to_decimal
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FIELDS = ('total_value', 'invested', 'realized_pnl', 'unrealized_pnl', 'sector_weights')
+
+
+def stored_closes(store, symbol: str, days: List[date], exact: bool = False) -> np.ndarray:
+    """
+    Close of symbol on each day from the history store (NaN where unknown).
+
+    Days without a bar take the latest earlier close unless exact is set.
+    Without a store every close is unknown.
+    """
+    if store is None:
+        return np.full(len(days), np.nan)
+    columns = store.read(symbol)
+    dates, closes = np.asarray(columns['date']), np.asarray(columns['close'])
+    if not len(dates) or not days:
+        return np.full(len(days), np.nan)
+    day_numbers = np.array([to_day_number(day) for day in days], dtype=np.int64)
+    positions = np.searchsorted(dates, day_numbers, side='right') - 1
+    found = positions >= 0
+    if exact:
+        found &= dates[np.maximum(positions, 0)] == day_numbers
+    return np.where(found, closes[np.maximum(positions, 0)], np.nan)
+
+
+def _sector_weights(sector_names: List[str], sector_cents: np.ndarray, value_cents: int) -> Dict[str, float]:
+    if value_cents <= 0:
+        return {}
+    return {
+        sector_names[i]: round(float(sector_cents[i] * 100 / value_cents), 2)
+        for i in np.argsort(-sector_cents, kind='stable') if sector_cents[i]
+    }
+
+
+def _snapshot(user_id: int, day: date, value_cents: int, cost_cents: int, realized,
+              sector_weights: Dict[str, float]) -> PortfolioSnapshot:
+    return PortfolioSnapshot(
+        user_id=user_id,
+        date=day,
+        total_value=cents_to_decimal(value_cents),
+        invested=cents_to_decimal(cost_cents),
+        realized_pnl=realized,
+        unrealized_pnl=cents_to_decimal(value_cents - cost_cents),
+        sector_weights=sector_weights,
+    )
+
+
+def closing_price_vector(symbols: List[str], day: date, store) -> PriceVector:
+    """Closes on day from the history store, the stored current price where there is no bar yet"""
+    stored = {row['ticker']: row for row in Stocks.objects.filter(ticker__in=symbols).values('ticker', 'curr_price', 'sector')}
+    prices = {}
+    for symbol in symbols:
+        close = stored_closes(store, symbol, [day], exact=True)[0]
+        prices[symbol] = close if not np.isnan(close) else (stored.get(symbol) or {}).get('curr_price') or 0
+    return PriceVector.from_prices(prices, {symbol: row['sector'] for symbol, row in stored.items()})
+
+
+def take_snapshots(day: date, store, user_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Write (or overwrite) every user's snapshot for day in one pass.
+
+    Holdings, cost and realized P&L all come from positions (average cost,
+    as in backfill_snapshots). Users with holdings or with realized P&L
+    from earlier sells get a row. Returns the number of snapshots written.
+    """
+    positions = Position.objects.all()
+    if user_ids is not None:
+        positions = positions.filter(user_id__in=list(user_ids))
+    rows = list(positions.filter(quantity__gt=0))
+    realized = dict(positions.order_by().values('user_id').annotate(total=Sum('realized_pnl')).values_list('user_id', 'total'))
+
+    holdings = Holdings.from_positions(rows)
+    valuation = Valuation(holdings, closing_price_vector(holdings.symbols, day, store))
+
+    # Sum holdings per user, and per user and sector
+    users = np.array(sorted({row.user_id for row in rows} | set(realized)), dtype=np.int64)
+    codes = np.searchsorted(users, np.array([row.user_id for row in rows], dtype=np.int64))
+    value = np.zeros(len(users), dtype=np.int64)
+    cost = np.zeros(len(users), dtype=np.int64)
+    sectors = np.zeros((len(users), len(valuation.sector_names)), dtype=np.int64)
+    np.add.at(value, codes, valuation.value_cents)
+    np.add.at(cost, codes, holdings.cost_cents)
+    np.add.at(sectors, (codes, valuation.sector_codes), valuation.value_cents)
+
+    snapshots = [
+        _snapshot(int(user_id), day, int(value[i]), int(cost[i]), realized.get(int(user_id)) or 0,
+                  _sector_weights(valuation.sector_names, sectors[i], int(value[i])))
+        for i, user_id in enumerate(users)
+    ]
+    PortfolioSnapshot.objects.bulk_create(
+        snapshots, update_conflicts=True, unique_fields=['user', 'date'], update_fields=list(SNAPSHOT_FIELDS),
+    )
+    return len(snapshots)
+
+
+def backfill_snapshots(user, store, calendar, end: date, start: Optional[date] = None) -> int:
+    """
+    Create the user's missing snapshots for trading days up to end.
+
+    Holdings, cost and realized P&L come from replaying their transactions
+    (average cost, as for positions) and prices from stored daily closes,
+    or the last traded price where no history is stored. Existing
+    snapshots are left alone. Returns the number created.
+    """
+    trades = list(user_trades(user))
+    if not trades:
+        return 0
+    trade_days = [calendar.local(trade.date).date() for trade in trades]
+    first = max(trade_days[0], start) if start else trade_days[0]
+
+    existing = set(PortfolioSnapshot.objects.filter(user=user, date__gte=first, date__lte=end).values_list('date', flat=True))
+    days = []
+    day = first
+    while day <= end:
+        if calendar.is_trading_day(day) and day not in existing:
+            days.append(day)
+        day += timedelta(days=1)
+    if not days:
+        return 0
+
+    symbols = sorted({trade.stock_symbol for trade in trades})
+    closes = {symbol: stored_closes(store, symbol, days) for symbol in symbols}
+    sectors = dict(Stocks.objects.filter(ticker__in=symbols).values_list('ticker', 'sector'))
+
+    states, last_traded, snapshots, applied = {}, {}, [], 0
+    for index, day in enumerate(days):
+        while applied < len(trades) and trade_days[applied] <= day:
+            replay([trades[applied]], states)
+            last_traded[trades[applied].stock_symbol] = trades[applied].price
+            applied += 1
+
+        held = {symbol: state for symbol, state in states.items() if state.quantity}
+        prices = {
+            symbol: last_traded[symbol] if np.isnan(closes[symbol][index]) else closes[symbol][index]
+            for symbol in held
+        }
+        valuation = Valuation(
+            Holdings.build((symbol, state.quantity, state.cost_basis, None) for symbol, state in held.items()),
+            PriceVector.from_prices(prices, sectors),
+        )
+        snapshots.append(_snapshot(
+            user.id, day, valuation.total_value_cents, valuation.total_cost_cents,
+            sum((state.realized_pnl for state in states.values()), 0),
+            _sector_weights(valuation.sector_names, valuation.sector_cents, valuation.total_value_cents),
+        ))
+
+    PortfolioSnapshot.objects.bulk_create(snapshots, ignore_conflicts=True)
+    return len(snapshots)
+
+
+def downsample(count: int, points: int) -> np.ndarray:
+    """Indices of at most points evenly spaced rows out of count, keeping the first and last"""
+    if count <= points:
+        return np.arange(count)
+    return np.unique(np.linspace(0, count - 1, max(points, 2)).round().astype(np.int64))
@@ -0,0 +1,142 @@
+"""
+In-process fan-out of price changes for server-sent event streams.
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Fields pushed to clients; a symbol is re-sent when any of them changes
+STREAM_FIELDS = ('current_price', 'day_change', 'day_change_percent', 'volume', 'is_stale')
+
+
+class Subscription:
+    """One client's view of the hub: its symbols and an asyncio queue on its event loop"""
+
+    def __init__(self, symbols: Iterable[str], loop: asyncio.AbstractEventLoop):
+        self.symbols = frozenset(symbols)
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    def push(self, prices: List[Dict[str, Any]]):
+        """Hand prices to the client's loop; safe to call from any thread"""
+        try:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, prices)
+        except RuntimeError:
+            # The client's loop closed before it unsubscribed
+            pass
+
+
+class PriceHub:
+    """
+    Poll each watched symbol once and fan changes out to every subscriber.
+
+    A single daemon thread reads the distinct symbols that any client
+    subscribed to through get_multiple_stocks every poll_interval seconds,
+    so upstream and cache load grow with distinct symbols rather than with
+    open tabs. Only symbols whose STREAM_FIELDS changed since the last poll
+    are pushed, and new subscribers get the latest known prices at once.
+    """
+
+    def __init__(self, service, poll_interval: float = 5.0, on_change=None):
+        self.service = service
+        self.poll_interval = poll_interval
+        self.on_change = on_change
+        self._subscriptions: Set[Subscription] = set()
+        self._watchers: Dict[str, int] = {}
+        self._latest: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._stats = {'polls': 0, 'changes': 0, 'pushes': 0}
+
+    def subscribe(self, symbols: Iterable[str], loop: Optional[asyncio.AbstractEventLoop] = None) -> Subscription:
+        """Register a client for symbols; must be called from the client's event loop"""
+        subscription = Subscription(symbols, loop or asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions.add(subscription)
+            for symbol in subscription.symbols:
+                self._watchers[symbol] = self._watchers.get(symbol, 0) + 1
+            known = [self._latest[symbol] for symbol in subscription.symbols if symbol in self._latest]
+        if known:
+            subscription.push(known)
+        self._start()
+        self._wakeup.set()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            if subscription not in self._subscriptions:
+                return
+            self._subscriptions.discard(subscription)
+            for symbol in subscription.symbols:
+                self._watchers[symbol] -= 1
+                if not self._watchers[symbol]:
+                    del self._watchers[symbol]
+                    self._latest.pop(symbol, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, clients=len(self._subscriptions), symbols=len(self._watchers))
+
+    def poll(self):
+        """Read every watched symbol once and push the ones that changed"""
+        with self._lock:
+            symbols = list(self._watchers)
+        if not symbols:
+            return
+
+        live_data = self.service.get_multiple_stocks(symbols)
+        changed = {}
+        with self._lock:
+            self._stats['polls'] += 1
+            for symbol, stock_data in live_data.items():
+                if symbol not in self._watchers:
+                    continue
+                price = {'symbol': symbol}
+                price.update((field, stock_data.get(field)) for field in STREAM_FIELDS)
+                if self._latest.get(symbol) != price:
+                    self._latest[symbol] = price
+                    changed[symbol] = price
+            self._stats['changes'] += len(changed)
+            subscriptions = list(self._subscriptions)
+
+        if not changed:
+            return
+        if self.on_change:
+            for symbol in changed:
+                self.on_change(symbol, live_data[symbol])
+        for subscription in subscriptions:
+            prices = [changed[symbol] for symbol in subscription.symbols if symbol in changed]
+            if prices:
+                subscription.push(prices)
+                with self._lock:
+                    self._stats['pushes'] += 1
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='price-hub', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                idle = not self._subscriptions
+            if idle:
+                self._wakeup.wait()
+            self._wakeup.clear()
+
+            started = time.monotonic()
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Price hub poll failed: {str(e)}")
+            finally:
+                connections.close_all()
+            self._wakeup.wait(max(self.poll_interval - (time.monotonic() - started), 0))
@@ -0,0 +1,222 @@
+"""
+Tax lots: open shares per buy and the realized gain of every closed lot.
+
+Transactions are folded in id order from a per-user cursor, so each trade
+is processed once. A buy opens a lot at its price; a sell closes shares
+from the symbol's open lots in FIFO, LIFO or specific-lot order and
+records one RealizedLot per lot it touches. Yearly totals are kept in
+RealizedGainSummary, so gain reports read a handful of rows.
+
+Lots are synced when a trade is recorded and by rebuild_tax_lots; the
+read helpers only query, so page views do no writes.
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import LotCursor, RealizedGainSummary, RealizedLot, TaxLot, Transaction
+
+logger = logging.getLogger(__name__)
+
+# Lots held longer than this are long term
+LONG_TERM_AFTER = timedelta(days=365)
+SUMMARY_FIELDS = ('short_term_gain', 'long_term_gain', 'proceeds', 'cost_basis', 'lots_closed')
+
+
+class InvalidLotSelection(ValueError):
+    """A specific-lot sell named lots that are not open or hold too few shares"""
+
+
+def default_lot_method(user) -> str:
+    """The user's preferred method for sells that don't pick lots"""
+    preferences = getattr(user, 'preferences', None)
+    return preferences.lot_method if preferences else 'FIFO'
+
+
+def order_lots(lots: Iterable[TaxLot], method: str, selection: Sequence[int] = ()) -> List[TaxLot]:
+    """
+    Open lots in the order a sell closes them.
+
+    Specific-lot sells take the selected buys in the order given; any
+    shares beyond them (only possible for replayed history) fall back to FIFO.
+    """
+    ordered = sorted(lots, key=lambda lot: (lot.acquired_at, lot.buy_transaction_id))
+    if method == 'LIFO':
+        ordered.reverse()
+    elif method == 'SPECIFIC':
+        rank = {buy_id: index for index, buy_id in enumerate(selection)}
+        ordered.sort(key=lambda lot: rank.get(lot.buy_transaction_id, len(rank)))
+    return ordered
+
+
+def _tax_year(date) -> int:
+    return timezone.localtime(date).year if timezone.is_aware(date) else date.year
+
+
+class LotBook:
+    """Open lots for a user's symbols, plus what folding trades into them changed"""
+
+    def __init__(self, lots: Iterable[TaxLot]):
+        self.open: Dict[str, List[TaxLot]] = defaultdict(list)
+        for lot in lots:
+            self.open[lot.stock_symbol].append(lot)
+        self.realized: List[RealizedLot] = []
+        self.changed: Dict[int, TaxLot] = {}
+        self.emptied: List[int] = []
+
+    def apply(self, trade: Transaction):
+        if trade.type == 'BUY':
+            lot = TaxLot(
+                user_id=trade.user_id,
+                stock_symbol=trade.stock_symbol,
+                buy_transaction_id=trade.id,
+                quantity_open=trade.quantity,
+                cost_per_share=trade.price,
+                acquired_at=trade.date,
+            )
+            self.open[trade.stock_symbol].append(lot)
+            self.changed[trade.id] = lot
+        elif trade.type == 'SELL':
+            self._sell(trade)
+
+    def _sell(self, trade: Transaction):
+        remaining = trade.quantity
+        lots = self.open[trade.stock_symbol]
+        for lot in order_lots(lots, trade.lot_method or 'FIFO', trade.lot_selection or ()):
+            if not remaining:
+                break
+            quantity = min(lot.quantity_open, remaining)
+            self.realized.append(self._realize(trade, lot, quantity))
+            lot.quantity_open -= quantity
+            remaining -= quantity
+            if lot.quantity_open:
+                self.changed[lot.buy_transaction_id] = lot
+            else:
+                lots.remove(lot)
+                self.changed.pop(lot.buy_transaction_id, None)
+                if lot.pk:
+                    self.emptied.append(lot.pk)
+        if remaining:
+            logger.warning(f"Transaction {trade.id} sells {remaining} {trade.stock_symbol} "
+                           f"beyond its open lots; ignoring the excess")
+
+    def _realize(self, trade: Transaction, lot: TaxLot, quantity: int) -> RealizedLot:
+        cost_basis = lot.cost_per_share * quantity
+        proceeds = trade.price * quantity
+        return RealizedLot(
+            user_id=trade.user_id,
+            stock_symbol=trade.stock_symbol,
+            buy_transaction_id=lot.buy_transaction_id,
+            sell_transaction_id=trade.id,
+            quantity=quantity,
+            cost_basis=cost_basis,
+            proceeds=proceeds,
+            realized_gain=proceeds - cost_basis,
+            acquired_at=lot.acquired_at,
+            closed_at=trade.date,
+            tax_year=_tax_year(trade.date),
+            term='LONG' if trade.date - lot.acquired_at > LONG_TERM_AFTER else 'SHORT',
+        )
+
+    def save(self):
+        """Write lot changes, realized lots and yearly totals"""
+        TaxLot.objects.filter(pk__in=self.emptied).delete()
+        TaxLot.objects.bulk_create([lot for lot in self.changed.values() if lot.pk is None])
+        TaxLot.objects.bulk_update([lot for lot in self.changed.values() if lot.pk], ['quantity_open'])
+        RealizedLot.objects.bulk_create(self.realized)
+
+        totals: Dict[tuple, Dict[str, Any]] = {}
+        for realized in self.realized:
+            year = totals.setdefault((realized.user_id, realized.tax_year), dict.fromkeys(SUMMARY_FIELDS, 0))
+            year['short_term_gain' if realized.term == 'SHORT' else 'long_term_gain'] += realized.realized_gain
+            year['proceeds'] += realized.proceeds
+            year['cost_basis'] += realized.cost_basis
+            year['lots_closed'] += 1
+        for (user_id, tax_year), year in totals.items():
+            summary, _ = RealizedGainSummary.objects.select_for_update().get_or_create(user_id=user_id, tax_year=tax_year)
+            for name in SUMMARY_FIELDS:
+                setattr(summary, name, getattr(summary, name) + year[name])
+            summary.save()
+
+
+def sync_lots(user) -> int:
+    """
+    Fold the user's transactions made since the last sync into their lots.
+
+    The cursor row is locked for the duration, so concurrent syncs for one
+    user apply each transaction once. Returns the number of transactions folded.
+    """
+    with transaction.atomic():
+        cursor, _ = LotCursor.objects.select_for_update().get_or_create(user=user)
+        trades = list(Transaction.objects.filter(user=user, id__gt=cursor.last_transaction_id).order_by('id'))
+        if not trades:
+            return 0
+
+        symbols = {trade.stock_symbol for trade in trades}
+        book = LotBook(TaxLot.objects.filter(user=user, stock_symbol__in=symbols))
+        for trade in trades:
+            book.apply(trade)
+        book.save()
+
+        cursor.last_transaction_id = trades[-1].id
+        cursor.save()
+    return len(trades)
+
+
+def check_lot_selection(user, symbol: str, quantity: int, selection: Sequence[int]) -> List[int]:
+    """
+    Validate a specific-lot sell against the user's open lots.
+
+    Returns the selected buy transaction ids without duplicates; raises
+    InvalidLotSelection if any is not open for the symbol or if together
+    they hold fewer than quantity shares.
+    """
+    selection = list(dict.fromkeys(int(buy_id) for buy_id in selection))
+    if not selection:
+        raise InvalidLotSelection("Choose at least one lot to sell")
+    sync_lots(user)
+    lots = dict(TaxLot.objects.filter(user=user, stock_symbol=symbol, buy_transaction_id__in=selection)
+                .values_list('buy_transaction_id', 'quantity_open'))
+    missing = [buy_id for buy_id in selection if buy_id not in lots]
+    if missing:
+        raise InvalidLotSelection(f"Lots {', '.join(map(str, missing))} are not open for {symbol}")
+    if sum(lots.values()) < quantity:
+        raise InvalidLotSelection(f"Selected lots hold only {sum(lots.values())} shares of {symbol}")
+    return selection
+
+
+def open_lots(user, symbol: Optional[str] = None):
+    """The user's open lots, oldest first"""
+    lots = TaxLot.objects.filter(user=user)
+    if symbol:
+        lots = lots.filter(stock_symbol=symbol)
+    return lots
+
+
+def realized_gain_summaries(user):
+    """Realized gains per tax year, latest year first"""
+    return RealizedGainSummary.objects.filter(user=user)
+
+
+def realized_lots(user, tax_year: int):
+    """Lots closed in one tax year, in the order they were closed"""
+    return RealizedLot.objects.filter(user=user, tax_year=tax_year)
+
+
+def rebuild_lots(user) -> int:
+    """
+    Discard the user's lots and gains and fold their whole history again.
+
+    Sells keep the method and lot selection they were recorded with, so a
+    rebuild reproduces the same lots.
+    """
+    with transaction.atomic():
+        LotCursor.objects.filter(user=user).delete()
+        TaxLot.objects.filter(user=user).delete()
+        RealizedLot.objects.filter(user=user).delete()
+        RealizedGainSummary.objects.filter(user=user).delete()
+        return sync_lots(user)
@@ -0,0 +1,75 @@
+"""
+Shared fixtures for the stocks tests.
+"""
+import shutil
+import tempfile
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, List
+
+import pandas as pd
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.test import TestCase
+
+from stocks.cache_snapshot import CacheSnapshot
+from stocks.history_store import HistorySeriesCache, PriceHistoryStore
+from stocks.ledger import record_trade
+from stocks.models import Position, Stocks, Transaction
+from stocks.services import StockDataService
+
+
+def utc(*args) -> datetime:
+    return datetime(*args, tzinfo=dt_timezone.utc)
+
+
+class TradeTestCase(TestCase):
+    """A user and two stocks to trade"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('trader', password='secret')
+        self.aapl = Stocks.objects.create(ticker='AAPL', name='Apple Inc.', curr_price=Decimal('150.00'),
+                                          sector='Technology')
+        self.jpm = Stocks.objects.create(ticker='JPM', name='JPMorgan Chase', curr_price=Decimal('200.00'),
+                                         sector='Financial Services')
+
+    def trade(self, stock, trade_type, quantity, price, when=None, **kwargs):
+        trade = record_trade(self.user, stock, trade_type, quantity, Decimal(price), **kwargs)
+        if when is not None:
+            Transaction.objects.filter(pk=trade.pk).update(date=when)
+            trade.refresh_from_db()
+        return trade
+
+    def position(self, stock) -> Position:
+        return Position.objects.get(user=self.user, stock_symbol=stock.ticker)
+
+
+def daily_bars(closes: List[float], start: str = '2025-03-03') -> pd.DataFrame:
+    """Business-day OHLCV bars with the given closes, shaped like yfinance's"""
+    index = pd.bdate_range(start, periods=len(closes), name='Date')
+    return pd.DataFrame({
+        'Open': closes, 'High': closes, 'Low': closes, 'Close': closes, 'Volume': [1000] * len(closes),
+    }, index=index)
+
+
+def batch_frame(bars: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """A yf.download(group_by='ticker') result for several tickers"""
+    return pd.concat(bars, axis=1)
+
+
+class ServiceTestCase(TestCase):
+    """A StockDataService on a clean cache, writing its files to a temporary directory"""
+
+    def setUp(self):
+        cache.clear()
+        caches['coordination'].clear()
+        self.tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.service = StockDataService()
+        self.service.quote_board = None
+        self.service.market_policy = None
+        self.service.history_store = PriceHistoryStore(self.tmp / 'history')
+        self.service.history_cache = HistorySeriesCache()
+        self.service.snapshot = CacheSnapshot(self.tmp / 'snapshot.bin', self.service.history_cache)
+        self.service.snapshot_interval = 0
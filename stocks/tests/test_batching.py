@@ -0,0 +1,52 @@
+"""
+Batched multi-symbol quote fetching in StockDataService.
+"""
+from unittest import mock
+
+from .helpers import ServiceTestCase, batch_frame, daily_bars
+
+
+class BatchFetchTests(ServiceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # Fundamentals and sparklines are refreshed in the background; keep that off the network
+        patcher = mock.patch.object(self.service, '_schedule_refresh')
+        self.schedule_refresh = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_one_download_prices_many_symbols(self):
+        frame = batch_frame({'AAPL': daily_bars([100.0, 102.0]), 'MSFT': daily_bars([300.0, 297.0])})
+        with mock.patch('stocks.services.yf.download', return_value=frame) as download, \
+                mock.patch.object(self.service.providers, 'fetch_quotes', return_value={}) as fallback:
+            data = self.service.get_multiple_stocks(['AAPL', 'MSFT'])
+
+        download.assert_called_once()
+        self.assertEqual(sorted(download.call_args.args[0]), ['AAPL', 'MSFT'])
+        fallback.assert_not_called()
+        self.assertEqual(data['AAPL']['current_price'], 102.0)
+        self.assertEqual(data['AAPL']['previous_close'], 100.0)
+        self.assertEqual(data['MSFT']['day_change'], -3.0)
+        # The batch download doubles as the sparkline
+        self.assertEqual(data['MSFT']['sparkline_prices'], [300.0, 297.0])
+
+    def test_symbols_missing_from_the_batch_fall_back(self):
+        frame = batch_frame({'AAPL': daily_bars([100.0, 101.0])})
+        quote = {'symbol': 'XYZ', 'current_price': 12.5, 'previous_close': 12.0, 'source': 'tiingo'}
+        with mock.patch('stocks.services.yf.download', return_value=frame), \
+                mock.patch.object(self.service.providers, 'fetch_quotes', return_value={'XYZ': quote}) as fallback:
+            data = self.service.get_multiple_stocks(['AAPL', 'XYZ'])
+
+        fallback.assert_called_once_with(['XYZ'], exclude=('yfinance',))
+        self.assertEqual(data['XYZ']['current_price'], 12.5)
+        self.assertEqual(data['XYZ']['source'], 'tiingo')
+
+    def test_cached_quotes_skip_the_download(self):
+        frame = batch_frame({'AAPL': daily_bars([100.0, 101.0])})
+        with mock.patch('stocks.services.yf.download', return_value=frame):
+            self.service.get_multiple_stocks(['AAPL'])
+
+        with mock.patch('stocks.services.yf.download') as download:
+            data = self.service.get_multiple_stocks(['AAPL'])
+        download.assert_not_called()
+        self.assertEqual(data['AAPL']['current_price'], 101.0)
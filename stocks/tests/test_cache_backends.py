@@ -0,0 +1,68 @@
+"""
+ByteBudgetCache: eviction by pickled size, per key family.
+"""
+import pickle
+import uuid
+
+from django.test import SimpleTestCase
+
+from stocks.cache_backends import ByteBudgetCache
+
+FAMILIES = {'stock_quote_': 'quote', 'stock_history_': 'history'}
+
+QUOTE_BYTES = len(pickle.dumps(101.5, pickle.HIGHEST_PROTOCOL))
+HISTORY_BYTES = len(pickle.dumps('x' * 2500, pickle.HIGHEST_PROTOCOL))
+
+
+class ByteBudgetCacheTests(SimpleTestCase):
+
+    def make_cache(self, max_bytes, policy='lru'):
+        return ByteBudgetCache(f'budget-{uuid.uuid4()}', {
+            'OPTIONS': {'MAX_BYTES': max_bytes, 'EVICTION_POLICY': policy, 'KEY_FAMILIES': FAMILIES},
+        })
+
+    def test_large_entries_evict_by_bytes_not_count(self):
+        cache = self.make_cache(max_bytes=HISTORY_BYTES + QUOTE_BYTES)
+        for symbol in ('AAPL', 'MSFT', 'JPM'):
+            cache.set(f'stock_quote_{symbol}', 101.5)
+        cache.get('stock_quote_AAPL')
+        cache.set('stock_history_AAPL', 'x' * 2500)
+
+        self.assertIsNotNone(cache.get('stock_history_AAPL'))
+        # The least recently used quotes made room; the one just read survived
+        self.assertEqual(cache.get('stock_quote_AAPL'), 101.5)
+        self.assertIsNone(cache.get('stock_quote_MSFT'))
+        stats = cache.stats()
+        self.assertEqual(stats['bytes'], HISTORY_BYTES + QUOTE_BYTES)
+        self.assertEqual(stats['families']['quote']['evictions'], 2)
+        self.assertEqual(stats['families']['history']['entries'], 1)
+
+    def test_lfu_keeps_the_most_read_entry(self):
+        cache = self.make_cache(max_bytes=QUOTE_BYTES * 2, policy='lfu')
+        cache.set('stock_quote_AAPL', 101.5)
+        cache.set('stock_quote_MSFT', 101.5)
+        for _ in range(3):
+            cache.get('stock_quote_AAPL')
+        cache.get('stock_quote_MSFT')
+        cache.set('stock_quote_JPM', 101.5)
+
+        self.assertIsNotNone(cache.get('stock_quote_AAPL'))
+        self.assertIsNone(cache.get('stock_quote_MSFT'))
+
+    def test_entry_larger_than_the_budget_is_not_cached(self):
+        cache = self.make_cache(max_bytes=100)
+        cache.set('stock_quote_AAPL', 101.5)
+        cache.set('stock_history_AAPL', 'x' * 500)
+
+        self.assertIsNone(cache.get('stock_history_AAPL'))
+        self.assertEqual(cache.get('stock_quote_AAPL'), 101.5)
+
+    def test_delete_and_clear_release_bytes(self):
+        cache = self.make_cache(max_bytes=3000)
+        cache.set('stock_quote_AAPL', 101.5)
+        cache.delete('stock_quote_AAPL')
+        self.assertEqual(cache.stats()['bytes'], 0)
+
+        cache.set('stock_quote_AAPL', 101.5)
+        cache.clear()
+        self.assertEqual(cache.stats()['families']['quote'], {'bytes': 0, 'entries': 0, 'evictions': 0})
@@ -0,0 +1,70 @@
+"""
+Saving the stock data cache to disk and restoring it after a restart.
+"""
+import shutil
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from stocks.cache_snapshot import CacheSnapshot
+from stocks.history_store import HistorySeriesCache
+
+from .helpers import daily_bars
+
+
+class CacheSnapshotTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.path = self.tmp / 'snapshot.bin'
+
+    def test_restart_restores_records_and_series(self):
+        history = HistorySeriesCache()
+        snapshot = CacheSnapshot(self.path, history)
+        cache.set('stock_sparkline_AAPL', [100.0, 101.0], 300)
+        snapshot.register('stock_sparkline_AAPL', 300)
+        history.put('AAPL', '1d', date(2025, 3, 3), daily_bars([100.0, 101.0]))
+        self.assertEqual(snapshot.save(), 2)
+
+        # A fresh process: empty cache, empty series cache
+        cache.clear()
+        restored_history = HistorySeriesCache()
+        self.assertEqual(CacheSnapshot(self.path, restored_history).load(), 2)
+
+        self.assertEqual(cache.get('stock_sparkline_AAPL'), [100.0, 101.0])
+        frame = restored_history.get('AAPL', '1d', date(2025, 3, 3))
+        self.assertEqual(frame['Close'].tolist(), [100.0, 101.0])
+
+    def test_expired_and_evicted_records_are_not_saved(self):
+        snapshot = CacheSnapshot(self.path)
+        cache.set('stock_quote_OLD', 'x', 300)
+        snapshot.register('stock_quote_OLD', 0.01)
+        snapshot.register('stock_quote_GONE', 300)
+        time.sleep(0.02)
+
+        self.assertEqual(snapshot.save(), 0)
+        self.assertFalse(self.path.exists())
+
+    def test_workers_merge_into_one_snapshot(self):
+        first, second = CacheSnapshot(self.path), CacheSnapshot(self.path)
+        cache.set('stock_quote_AAPL', 'a', 300)
+        first.register('stock_quote_AAPL', 300)
+        first.save()
+        cache.set('stock_quote_MSFT', 'm', 300)
+        second.register('stock_quote_MSFT', 300)
+        second.save()
+
+        cache.clear()
+        self.assertEqual(CacheSnapshot(self.path).load(), 2)
+        self.assertEqual(cache.get_many(['stock_quote_AAPL', 'stock_quote_MSFT']),
+                         {'stock_quote_AAPL': 'a', 'stock_quote_MSFT': 'm'})
+
+    def test_unreadable_snapshot_is_ignored(self):
+        self.path.write_bytes(b'not a snapshot')
+        self.assertEqual(CacheSnapshot(self.path).load(), 0)
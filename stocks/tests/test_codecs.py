@@ -0,0 +1,59 @@
+"""
+Compact binary encodings for cached quotes and history frames.
+"""
+import math
+
+import pandas as pd
+from django.test import SimpleTestCase
+
+from stocks.codecs import decode_columns, decode_frame, decode_quote, encode_frame, encode_quote
+
+
+class CodecTests(SimpleTestCase):
+
+    def test_quote_round_trip(self):
+        quote = {
+            'symbol': 'AAPL', 'current_price': 187.25, 'previous_close': 185.5, 'day_change': 1.75,
+            'day_change_percent': 0.943, 'day_high': 188.0, 'day_low': 184.9, 'open_price': 185.6,
+            'volume': 51234567, 'source': 'yfinance', 'last_updated': '2025-03-04T15:30:00.123456',
+        }
+        decoded, fetched_at = decode_quote(encode_quote(quote, 1741102200.5))
+        self.assertEqual(decoded, quote)
+        self.assertEqual(fetched_at, 1741102200.5)
+
+    def test_quote_missing_fields(self):
+        decoded, _ = decode_quote(encode_quote({'symbol': 'X', 'current_price': 1.0}, 0.0))
+        self.assertEqual(decoded, {'symbol': 'X', 'current_price': 1.0, 'source': ''})
+
+    def test_quote_version_is_checked(self):
+        payload = bytearray(encode_quote({'symbol': 'X', 'current_price': 1.0}, 0.0))
+        payload[0] = 99
+        with self.assertRaises(ValueError):
+            decode_quote(bytes(payload))
+
+    def test_frame_round_trip(self):
+        # Decoded indexes are always nanosecond resolution
+        index = pd.date_range('2025-03-03 09:30', periods=5, freq='h', tz='America/New_York',
+                              name='Datetime').as_unit('ns')
+        frame = pd.DataFrame({
+            'Open': [1.0, 2.0, 3.0, 4.0, 5.0],
+            'Close': [1.5, math.nan, 3.5, 4.5, 5.5],
+            'Volume': [100.0, 200.0, 300.0, 400.0, 2.0 ** 52],
+        }, index=index)
+
+        decoded = decode_frame(encode_frame(frame))
+        pd.testing.assert_frame_equal(decoded, frame, check_freq=False)
+        self.assertEqual(str(decoded.index.tz), 'America/New_York')
+
+        columns = decode_columns(encode_frame(frame))
+        self.assertEqual(columns['names'], ['Open', 'Close', 'Volume'])
+        self.assertEqual(columns['block'].shape, (3, 5))
+
+    def test_naive_frame_round_trip(self):
+        frame = pd.DataFrame({'Close': [10.0, 11.0]}, index=pd.DatetimeIndex(['2025-03-03', '2025-03-04']).as_unit('ns'))
+        pd.testing.assert_frame_equal(decode_frame(encode_frame(frame)), frame, check_freq=False)
+
+    def test_frame_magic_is_checked(self):
+        with self.assertRaises(ValueError):
+            decode_columns(b'XXXX' + encode_frame(pd.DataFrame({'Close': [1.0]},
+                                                             index=pd.DatetimeIndex(['2025-03-03'])))[4:])
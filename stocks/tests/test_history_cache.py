@@ -0,0 +1,62 @@
+"""
+HistorySeriesCache: one widest series per symbol, narrower periods sliced from it.
+"""
+import time
+from datetime import date
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from stocks.history_store import HistorySeriesCache
+
+from .helpers import daily_bars
+
+
+class HistorySeriesCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.frame = daily_bars([float(price) for price in range(100, 120)])
+
+    def test_narrower_periods_are_slices_of_the_held_series(self):
+        history = HistorySeriesCache()
+        history.put('aapl', '1d', date(2025, 3, 3), self.frame)
+
+        week = history.get('AAPL', '1d', date(2025, 3, 24))
+        self.assertEqual(week['Close'].tolist(), [115.0, 116.0, 117.0, 118.0, 119.0])
+        # Served from the held bars, not a copy
+        self.assertTrue(np.shares_memory(week['Close'].to_numpy(), self.frame['Close'].to_numpy()))
+        self.assertEqual(len(history.get('AAPL', '1d', date(2025, 3, 3))), 20)
+        self.assertEqual(history.stats()['entries'], 1)
+
+    def test_wider_or_other_interval_requests_miss(self):
+        history = HistorySeriesCache()
+        history.put('AAPL', '1d', date(2025, 3, 10), self.frame)
+
+        self.assertIsNone(history.get('AAPL', '1d', date(2025, 3, 3)))
+        self.assertIsNone(history.get('AAPL', '1d', None))
+        self.assertIsNone(history.get('AAPL', '1wk', date(2025, 3, 10)))
+
+    def test_start_past_the_last_bar_serves_the_latest_bar(self):
+        history = HistorySeriesCache()
+        history.put('AAPL', '1d', None, self.frame)
+
+        self.assertEqual(history.get('AAPL', '1d', date(2025, 4, 5))['Close'].tolist(), [119.0])
+
+    def test_expired_series_miss(self):
+        history = HistorySeriesCache(ttl=60)
+        history.put('AAPL', '1d', None, self.frame, fetched_at=time.time() - 61)
+
+        self.assertIsNone(history.get('AAPL', '1d', None))
+        self.assertEqual(history.export(), [])
+
+    def test_byte_budget_evicts_least_recently_used(self):
+        size = int(self.frame.memory_usage(index=True, deep=True).sum())
+        history = HistorySeriesCache(max_bytes=size * 2)
+        history.put('AAPL', '1d', None, self.frame)
+        history.put('MSFT', '1d', None, self.frame)
+        history.get('AAPL', '1d', None)
+        history.put('JPM', '1d', None, self.frame)
+
+        self.assertIsNotNone(history.get('AAPL', '1d', None))
+        self.assertIsNone(history.get('MSFT', '1d', None))
+        self.assertEqual(history.stats(), {'bytes': size * 2, 'entries': 2, 'evictions': 1})
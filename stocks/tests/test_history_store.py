@@ -0,0 +1,68 @@
+"""
+The append-only, memory-mapped PriceHistoryStore.
+"""
+import shutil
+import tempfile
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from stocks.history_store import PriceHistoryStore, period_start
+
+from .helpers import daily_bars
+
+
+class PriceHistoryStoreTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.store = PriceHistoryStore(self.tmp)
+
+    def test_append_then_read_back_memory_mapped(self):
+        self.assertEqual(self.store.append('aapl', daily_bars([100.0, 101.0, 102.0])), 3)
+
+        columns = self.store.read('AAPL')
+        self.assertIsInstance(columns['close'], np.memmap)
+        self.assertEqual(columns['close'].tolist(), [100.0, 101.0, 102.0])
+        frame = self.store.read_frame('AAPL', start=date(2025, 3, 4))
+        self.assertEqual(frame['Close'].tolist(), [101.0, 102.0])
+        self.assertEqual(frame.index[0].date(), date(2025, 3, 4))
+        self.assertEqual(self.store.date_range('AAPL'), (date(2025, 3, 3), date(2025, 3, 5)))
+
+    def test_append_only_writes_new_final_bars(self):
+        self.store.append('AAPL', daily_bars([100.0, 101.0]))
+
+        # Overlapping download: two known bars, one new, one for "today"
+        written = self.store.append('AAPL', daily_bars([100.0, 101.0, 102.0, 103.0]), before=date(2025, 3, 6))
+        self.assertEqual(written, 1)
+        self.assertEqual(self.store.read_frame('AAPL')['Close'].tolist(), [100.0, 101.0, 102.0])
+
+    def test_partially_written_tail_is_ignored_and_replaced(self):
+        self.store.append('AAPL', daily_bars([100.0, 101.0]))
+        with open(self.tmp / 'AAPL' / 'close.bin', 'ab') as f:
+            f.write(b'\x00\x01\x02')
+
+        self.assertEqual(len(self.store.read('AAPL')['close']), 2)
+        self.store.append('AAPL', daily_bars([100.0, 101.0, 102.0]))
+        self.assertEqual(self.store.read_frame('AAPL')['Close'].tolist(), [100.0, 101.0, 102.0])
+
+    def test_merge_backfills_older_bars(self):
+        self.store.append('AAPL', daily_bars([102.0, 103.0], start='2025-03-05'))
+
+        self.assertEqual(self.store.merge('AAPL', daily_bars([100.0, 101.0, 999.0])), 2)
+        frame = self.store.read_frame('AAPL')
+        # Stored bars win on overlapping dates
+        self.assertEqual(frame['Close'].tolist(), [100.0, 101.0, 102.0, 103.0])
+
+    def test_rejects_path_like_symbols(self):
+        with self.assertRaises(ValueError):
+            self.store.read('../etc')
+
+    def test_period_start(self):
+        today = date(2025, 3, 31)
+        self.assertEqual(period_start('1mo', today), date(2025, 2, 28))
+        self.assertEqual(period_start('ytd', today), date(2025, 1, 1))
+        self.assertIsNone(period_start('max', today))
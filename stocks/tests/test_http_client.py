@@ -0,0 +1,72 @@
+"""
+The pooled HTTP session shared by the REST quote providers.
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from stocks import http_client
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.client_ports.append(self.client_address[1])
+        body = b'{}'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class HttpSessionTests(SimpleTestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(http_client, '_session', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_one_session_per_process(self):
+        sessions = []
+        threads = [threading.Thread(target=lambda: sessions.append(http_client.get_http_session())) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len({id(session) for session in sessions}), 1)
+
+    def test_requests_reuse_a_kept_alive_connection(self):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), _KeepAliveHandler)
+        server.client_ports = []
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        session = http_client.get_http_session()
+        url = f'http://127.0.0.1:{server.server_port}/quote'
+        for _ in range(3):
+            self.assertEqual(session.get(url, timeout=5).status_code, 200)
+
+        self.assertEqual(len(server.client_ports), 3)
+        self.assertEqual(len(set(server.client_ports)), 1)
+
+    @override_settings(STOCK_API_SETTINGS={
+        'HTTP_POOL_MAXSIZE': 4, 'HTTP_POOL_SIZES': {'api.tiingo.com': 16}, 'HTTP_RETRIES': 3,
+    })
+    def test_per_host_pool_sizes_and_retries(self):
+        session = http_client.get_http_session()
+
+        tiingo = session.get_adapter('https://api.tiingo.com/iex')
+        default = session.get_adapter('https://finnhub.io/api/v1/quote')
+        self.assertEqual(tiingo._pool_maxsize, 16)
+        self.assertEqual(default._pool_maxsize, 4)
+        self.assertEqual(default.max_retries.total, 3)
+        self.assertNotIn(429, default.max_retries.status_forcelist)
@@ -0,0 +1,120 @@
+"""
+Position ledger: average-cost replay and the sell view built on it.
+"""
+from decimal import Decimal
+
+from django.contrib.messages import get_messages
+from django.urls import reverse
+
+from stocks.ledger import InsufficientShares, replay, user_trades
+from stocks.models import Transaction, UserStock
+
+from .helpers import TradeTestCase
+
+
+class LedgerTests(TradeTestCase):
+
+    def test_average_cost(self):
+        self.trade(self.aapl, 'BUY', 10, '100.00')
+        self.trade(self.aapl, 'BUY', 10, '110.00')
+        self.trade(self.aapl, 'SELL', 5, '120.00')
+
+        position = self.position(self.aapl)
+        self.assertEqual(position.quantity, 15)
+        self.assertEqual(position.cost_basis, Decimal('1575.00'))
+        self.assertEqual(position.realized_pnl, Decimal('75.00'))
+
+    def test_rounding_stays_in_the_sold_part(self):
+        self.trade(self.aapl, 'BUY', 3, '10.00')
+        self.trade(self.aapl, 'BUY', 1, '10.01')
+        self.trade(self.aapl, 'SELL', 1, '10.00')
+
+        # 40.01 over 4 shares: the remaining 3 keep 30.01 (half up), the sold share 10.00
+        position = self.position(self.aapl)
+        self.assertEqual(position.cost_basis, Decimal('30.01'))
+        self.assertEqual(position.realized_pnl, Decimal('0.00'))
+
+    def test_oversell_is_refused(self):
+        self.trade(self.aapl, 'BUY', 2, '100.00')
+        with self.assertRaises(InsufficientShares):
+            self.trade(self.aapl, 'SELL', 3, '100.00')
+        self.assertEqual(self.position(self.aapl).quantity, 2)
+        self.assertEqual(Transaction.objects.filter(type='SELL').count(), 0)
+
+    def test_replay_matches_positions(self):
+        self.trade(self.aapl, 'BUY', 7, '101.37')
+        self.trade(self.jpm, 'BUY', 4, '199.99')
+        self.trade(self.aapl, 'SELL', 3, '99.05')
+        self.trade(self.aapl, 'BUY', 2, '102.50')
+
+        states = replay(user_trades(self.user))
+        for stock in (self.aapl, self.jpm):
+            position, state = self.position(stock), states[stock.ticker]
+            self.assertEqual(state.quantity, position.quantity)
+            self.assertEqual(state.cost_basis, position.cost_basis)
+            self.assertEqual(state.realized_pnl, position.realized_pnl)
+
+    def test_replay_continues_from_states(self):
+        self.trade(self.aapl, 'BUY', 10, '100.00')
+        self.trade(self.aapl, 'SELL', 4, '90.00')
+        trades = list(user_trades(self.user))
+
+        states = replay(trades[:1])
+        replay(trades[1:], states)
+        self.assertEqual(states['AAPL'].quantity, 6)
+        self.assertEqual(states['AAPL'].realized_pnl, Decimal('-40.00'))
+
+    def test_replay_clamps_old_oversells(self):
+        self.trade(self.aapl, 'BUY', 2, '100.00')
+        Transaction.objects.create(user=self.user, stock_symbol='AAPL', stock_name='Apple Inc.',
+                                   quantity=5, price=Decimal('110.00'), type='SELL')
+
+        state = replay(user_trades(self.user))['AAPL']
+        self.assertEqual(state.quantity, 0)
+        self.assertEqual(state.cost_basis, Decimal('0.00'))
+        self.assertEqual(state.realized_pnl, Decimal('20.00'))
+
+
+class SellViewTests(TradeTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+        self.trade(self.aapl, 'BUY', 5, '100.00')
+        UserStock.objects.create(user=self.user, stock=self.aapl, purchase_quantity=5,
+                                 purchase_price=Decimal('100.00'))
+
+    def sell(self, **data):
+        return self.client.post(reverse('sell', args=[self.aapl.id]), data)
+
+    def error_messages(self, response):
+        return [str(message) for message in get_messages(response.wsgi_request)]
+
+    def test_sell_updates_position_and_holding(self):
+        response = self.sell(quantity=2)
+        self.assertRedirects(response, reverse('portfolio_dashboard'), fetch_redirect_response=False)
+        self.assertEqual(self.position(self.aapl).quantity, 3)
+        self.assertEqual(UserStock.objects.get(user=self.user, stock=self.aapl).purchase_quantity, 3)
+
+        self.sell(quantity=3)
+        self.assertFalse(UserStock.objects.filter(user=self.user, stock=self.aapl).exists())
+
+    def test_sell_more_than_held(self):
+        response = self.sell(quantity=6)
+        self.assertIn("Can't sell more than you own", self.error_messages(response))
+        self.assertEqual(self.position(self.aapl).quantity, 5)
+        self.assertEqual(UserStock.objects.get(user=self.user, stock=self.aapl).purchase_quantity, 5)
+        self.assertFalse(Transaction.objects.filter(type='SELL').exists())
+
+    def test_sell_with_invalid_lot_selection(self):
+        response = self.sell(quantity=1, lot_method='SPECIFIC', lot_ids=['999999'])
+        self.assertIn("Lots 999999 are not open for AAPL", self.error_messages(response))
+        self.assertEqual(self.position(self.aapl).quantity, 5)
+        self.assertFalse(Transaction.objects.filter(type='SELL').exists())
+
+        response = self.sell(quantity=1, lot_method='NEWEST')
+        self.assertIn("Unknown lot method.", self.error_messages(response))
+
+    def test_sell_requires_post(self):
+        response = self.client.get(reverse('sell', args=[self.aapl.id]))
+        self.assertEqual(response.status_code, 405)
@@ -0,0 +1,66 @@
+"""
+The home page market board, shared by every worker through the coordination cache.
+"""
+import time
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import TestCase
+
+from stocks.cache_backends import SharedCache
+from stocks.market_board import MarketBoard
+from stocks.models import Stocks
+from stocks.singleflight import SingleFlight
+
+
+class MarketBoardTests(TestCase):
+
+    def setUp(self):
+        caches['coordination'].clear()
+        for ticker, price, volume in (('AAPL', '150.00', 300), ('MSFT', '300.00', 200), ('JPM', '200.00', 100)):
+            Stocks.objects.create(ticker=ticker, name=ticker, curr_price=Decimal(price), volume=volume)
+        self.service = mock.Mock()
+        self.service.single_flight = SingleFlight(lease_timeout=5, cache=SharedCache('coordination'))
+        self.service.get_multiple_stocks.side_effect = lambda symbols: {
+            'AAPL': {'current_price': 151.0, 'day_change_percent': 0.7},
+            'MSFT': {'current_price': 297.0, 'day_change_percent': -1.0},
+        }
+        self.executor = mock.Mock()
+        self.board = MarketBoard(self.service, self.executor, ttl=60, trending_count=2, top_count=1)
+
+    def test_cold_board_is_built_once_and_shared(self):
+        board = self.board.get()
+
+        self.assertEqual([entry['ticker'] for entry in board['trending']], ['AAPL', 'MSFT'])
+        self.assertEqual([entry['ticker'] for entry in board['top_priced']], ['MSFT'])
+        self.assertEqual([entry['ticker'] for entry in board['gainers']], ['AAPL'])
+        self.assertEqual([entry['ticker'] for entry in board['losers']], ['MSFT'])
+        self.assertEqual(caches['coordination'].get(MarketBoard.CACHE_KEY), board)
+
+        # Another worker's board reads the shared snapshot
+        other = MarketBoard(self.service, self.executor, ttl=60)
+        self.assertEqual(other.get(), board)
+        self.service.get_multiple_stocks.assert_called_once()
+        self.executor.submit.assert_not_called()
+
+    def test_stale_board_is_served_while_one_rebuild_runs(self):
+        stale = dict(self.board.refresh(), built_at=time.time() - 61)
+        caches['coordination'].set(MarketBoard.CACHE_KEY, stale)
+        other = MarketBoard(self.service, self.executor, ttl=60)
+
+        self.assertEqual(self.board.get(), stale)
+        self.assertEqual(other.get(), stale)
+        self.executor.submit.assert_called_once_with(self.board._refresh_in_background)
+
+        with mock.patch('stocks.market_board.connections.close_all'):
+            self.board._refresh_in_background()
+        self.assertGreater(self.board.get()['built_at'], stale['built_at'])
+        self.assertIsNone(caches['coordination'].get(MarketBoard.REFRESH_KEY))
+
+    def test_failed_build_serves_an_empty_board(self):
+        self.service.get_multiple_stocks.side_effect = RuntimeError('providers down')
+
+        board = self.board.get()
+        self.assertEqual((board['trending'], board['gainers']), ([], []))
+        self.assertIsNone(caches['coordination'].get(MarketBoard.CACHE_KEY))
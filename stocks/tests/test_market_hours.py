@@ -0,0 +1,97 @@
+"""
+The NYSE trading calendar and the quote freshness policy built on it.
+"""
+from datetime import date
+
+from django.test import SimpleTestCase
+
+from stocks.market_hours import (
+    CLOSED, HOLIDAY, POST_MARKET, PRE_MARKET, REGULAR, MarketCalendar, QuoteFreshnessPolicy, nyse_early_closes,
+    nyse_holidays,
+)
+
+from .helpers import utc
+
+
+class MarketCalendarTests(SimpleTestCase):
+
+    def setUp(self):
+        self.calendar = MarketCalendar('America/New_York', extra_holidays=['2025-01-09'])
+
+    def test_holidays(self):
+        holidays = nyse_holidays(2025)
+        self.assertEqual(holidays[date(2025, 1, 1)], "New Year's Day")
+        self.assertEqual(holidays[date(2025, 1, 20)], "Martin Luther King Jr. Day")
+        self.assertEqual(holidays[date(2025, 4, 18)], "Good Friday")
+        self.assertEqual(holidays[date(2025, 5, 26)], "Memorial Day")
+        self.assertEqual(holidays[date(2025, 6, 19)], "Juneteenth")
+        self.assertEqual(holidays[date(2025, 11, 27)], "Thanksgiving Day")
+        self.assertEqual(len(holidays), 10)
+
+    def test_observed_holidays(self):
+        # July 4th 2026 is a Saturday, Christmas 2022 a Sunday
+        self.assertIn(date(2026, 7, 3), nyse_holidays(2026))
+        self.assertIn(date(2022, 12, 26), nyse_holidays(2022))
+        # New Year's Day 2022 fell on a Saturday and was not observed on Dec 31
+        self.assertNotIn(date(2021, 12, 31), nyse_holidays(2021))
+        self.assertNotIn(date(2021, 12, 31), nyse_holidays(2022))
+
+    def test_early_closes(self):
+        early = nyse_early_closes(2025)
+        self.assertIn(date(2025, 7, 3), early)
+        self.assertIn(date(2025, 11, 28), early)
+        self.assertIn(date(2025, 12, 24), early)
+
+    def test_trading_days(self):
+        self.assertTrue(self.calendar.is_trading_day(date(2025, 3, 3)))
+        self.assertFalse(self.calendar.is_trading_day(date(2025, 3, 8)))
+        self.assertFalse(self.calendar.is_trading_day(date(2025, 4, 18)))
+        self.assertEqual(self.calendar.holiday_name(date(2025, 1, 9)), "Special closure")
+
+    def test_session_states(self):
+        self.assertEqual(self.calendar.state(utc(2025, 3, 4, 14, 0)), PRE_MARKET)
+        self.assertEqual(self.calendar.state(utc(2025, 3, 4, 15, 0)), REGULAR)
+        self.assertEqual(self.calendar.state(utc(2025, 3, 4, 22, 0)), POST_MARKET)
+        self.assertEqual(self.calendar.state(utc(2025, 3, 5, 2, 0)), CLOSED)
+        self.assertEqual(self.calendar.state(utc(2025, 3, 8, 15, 0)), CLOSED)
+        self.assertEqual(self.calendar.state(utc(2025, 4, 18, 15, 0)), HOLIDAY)
+        # Early close at 13:00, extended hours only until 17:00
+        self.assertEqual(self.calendar.state(utc(2025, 12, 24, 19, 0)), POST_MARKET)
+        self.assertEqual(self.calendar.state(utc(2025, 12, 24, 23, 0)), CLOSED)
+
+    def test_next_open_and_last_close(self):
+        # Thursday before Good Friday, after the close
+        moment = utc(2025, 4, 17, 21, 0)
+        self.assertEqual(self.calendar.next_open(moment).date(), date(2025, 4, 21))
+        self.assertEqual(self.calendar.last_close(moment).date(), date(2025, 4, 17))
+        # Monday morning: the last close was Thursday
+        self.assertEqual(self.calendar.last_close(utc(2025, 4, 21, 12, 0)).date(), date(2025, 4, 17))
+        self.assertEqual(self.calendar.last_close(utc(2025, 12, 24, 20, 0)).hour, 13)
+
+
+class QuoteFreshnessPolicyTests(SimpleTestCase):
+
+    def setUp(self):
+        self.policy = QuoteFreshnessPolicy(MarketCalendar('America/New_York'), regular_ttl=60, extended_ttl=300)
+
+    def test_regular_session_quotes_use_the_short_ttl(self):
+        fetched_at = utc(2025, 3, 4, 15, 0).timestamp()
+        self.assertEqual(self.policy.fresh_until(fetched_at), fetched_at + 60)
+
+    def test_extended_hours_never_run_past_the_open(self):
+        fetched_at = utc(2025, 3, 4, 22, 0).timestamp()
+        self.assertEqual(self.policy.fresh_until(fetched_at), fetched_at + 300)
+        just_before_open = utc(2025, 3, 5, 14, 28).timestamp()
+        self.assertEqual(self.policy.fresh_until(just_before_open), utc(2025, 3, 5, 14, 30).timestamp())
+
+    def test_closed_market_quotes_stay_fresh_until_the_next_open(self):
+        # Friday evening over a weekend, and Good Friday over the long weekend
+        self.assertEqual(self.policy.fresh_until(utc(2025, 3, 8, 3, 0).timestamp()),
+                         utc(2025, 3, 10, 13, 30).timestamp())
+        self.assertEqual(self.policy.fresh_until(utc(2025, 4, 18, 15, 0).timestamp()),
+                         utc(2025, 4, 21, 13, 30).timestamp())
+
+    def test_status_names_the_holiday(self):
+        status = self.policy.status(utc(2025, 4, 18, 15, 0))
+        self.assertEqual(status['state'], HOLIDAY)
+        self.assertEqual(status['holiday'], 'Good Friday')
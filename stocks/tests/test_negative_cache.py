@@ -0,0 +1,61 @@
+"""
+Negative caching of symbols no provider has data for, with exponential backoff.
+"""
+from unittest import mock
+
+from django.core.cache import cache
+
+from .helpers import ServiceTestCase
+
+QUOTE = {'symbol': 'XYZ', 'current_price': 12.5, 'previous_close': 12.0, 'source': 'tiingo'}
+
+
+class NegativeCacheTests(ServiceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.service.negative_ttl = 60
+        self.service.negative_max_ttl = 200
+        patcher = mock.patch('stocks.services.refresh_executor.submit')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fail_once(self):
+        """Let the current backoff run out, then have every provider come back empty"""
+        entry = cache.get('stock_negative_XYZ')
+        if entry:
+            entry['retry_at'] = 0
+            cache.set('stock_negative_XYZ', entry)
+        with mock.patch.object(self.service.providers, 'fetch_quote', return_value=None) as fetch:
+            self.assertIsNone(self.service.get_stock_data('XYZ'))
+        fetch.assert_called_once()
+        return self.service.negative_cache_stats()['symbols']['XYZ']
+
+    def test_missing_symbol_is_skipped_until_its_retry_time(self):
+        self.fail_once()
+
+        with mock.patch.object(self.service.providers, 'fetch_quote') as fetch:
+            self.assertIsNone(self.service.get_stock_data('XYZ'))
+            self.assertEqual(self.service.get_multiple_stocks(['XYZ']), {})
+        fetch.assert_not_called()
+        self.assertEqual(self.service.missing_symbols(['XYZ', 'AAPL']), {'XYZ'})
+
+    def test_backoff_doubles_up_to_the_cap(self):
+        retries = [self.fail_once()['retry_in'] for _ in range(4)]
+
+        for retry, expected in zip(retries, [60, 120, 200, 200]):
+            self.assertAlmostEqual(retry, expected, delta=1)
+        self.assertEqual(self.service.negative_cache_stats()['symbols']['XYZ']['failures'], 4)
+
+    def test_an_answer_resets_the_backoff(self):
+        self.fail_once()
+        self.fail_once()
+        cache.set('stock_negative_XYZ', dict(cache.get('stock_negative_XYZ'), retry_at=0))
+
+        with mock.patch.object(self.service.providers, 'fetch_quote', return_value=dict(QUOTE)):
+            self.assertEqual(self.service.get_stock_data('XYZ')['current_price'], 12.5)
+        self.assertIsNone(cache.get('stock_negative_XYZ'))
+        self.assertEqual(self.service.negative_cache_stats()['count'], 0)
+
+        cache.delete('stock_quote_XYZ')
+        self.assertEqual(self.fail_once()['failures'], 1)
@@ -0,0 +1,81 @@
+"""
+The bulk price API: one response for many symbols, with a chosen set of fields.
+"""
+import json
+from unittest import mock
+
+from django.test import override_settings
+from django.urls import reverse
+
+from .helpers import TradeTestCase
+
+LIVE = {
+    'AAPL': {'current_price': 151.0, 'previous_close': 150.0, 'volume': 10, 'source': 'tiingo',
+             'is_stale': False, 'market_cap': 3000},
+    'MSFT': {'current_price': 301.0, 'previous_close': 300.0, 'volume': 20, 'source': 'tiingo',
+             'is_stale': True, 'market_cap': 2800},
+}
+
+
+class BulkPriceApiTests(TradeTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+        self.url = reverse('stock_prices_api')
+        patcher = mock.patch('stocks.views.stock_service.get_multiple_stocks',
+                             side_effect=lambda symbols: {s: LIVE[s] for s in symbols if s in LIVE})
+        self.get_multiple_stocks = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch('stocks.views.price_writer.record_quote')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_get_returns_the_requested_fields(self):
+        response = self.client.get(self.url, {'symbols': 'aapl,MSFT,XYZ,AAPL', 'fields': 'current_price,market_cap'})
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.get_multiple_stocks.assert_called_once_with(['AAPL', 'MSFT', 'XYZ'])
+        self.assertEqual(data['prices'], {
+            'AAPL': {'current_price': 151.0, 'market_cap': 3000},
+            'MSFT': {'current_price': 301.0, 'market_cap': 2800},
+        })
+        self.assertEqual(data['missing'], ['XYZ'])
+
+    def test_default_fields(self):
+        response = self.client.get(self.url, {'symbols': 'MSFT'})
+
+        prices = response.json()['prices']['MSFT']
+        self.assertTrue(prices['is_stale'])
+        self.assertNotIn('market_cap', prices)
+
+    def test_post_json_body(self):
+        response = self.client.post(self.url, json.dumps({'symbols': ['AAPL'], 'fields': ['volume']}),
+                                    content_type='application/json')
+        self.assertEqual(response.json()['prices'], {'AAPL': {'volume': 10}})
+
+    @override_settings(STOCK_API_SETTINGS={'PRICE_API_MAX_SYMBOLS': 2})
+    def test_rejects_too_many_symbols(self):
+        response = self.client.get(self.url, {'symbols': 'AAPL,MSFT,JPM'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('at most 2', response.json()['error'])
+        self.get_multiple_stocks.assert_not_called()
+
+    def test_rejects_bad_requests(self):
+        cases = [
+            ({'symbols': 'AAPL', 'fields': 'current_price,password'}, 'Unknown fields: password'),
+            ({'symbols': 'AAPL;DROP'}, 'Invalid symbols'),
+            ({}, 'No symbols given'),
+        ]
+        for params, error in cases:
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn(error, response.json()['error'])
+
+        for body, error in (('{not json', 'Invalid JSON body'), ('["AAPL"]', 'must be an object'),
+                            ('{"symbols": 5}', 'must be strings or lists')):
+            response = self.client.post(self.url, body, content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn(error, response.json()['error'])
+        self.get_multiple_stocks.assert_not_called()
@@ -0,0 +1,58 @@
+"""
+Write-behind price persistence with PriceWriteBuffer.
+"""
+from decimal import Decimal
+from unittest import mock
+
+from django.db import DatabaseError
+
+from stocks.models import Stocks
+from stocks.price_writer import PriceWriteBuffer
+
+from .helpers import TradeTestCase
+
+
+class PriceWriteBufferTests(TradeTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.buffer = PriceWriteBuffer(flush_interval=3600, max_pending=3)
+        # Flush from the test instead of the background thread
+        patcher = mock.patch.object(self.buffer, '_start')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_updates_coalesce_per_ticker_into_one_write(self):
+        for price in (151.0, 152.0, 153.456):
+            self.buffer.record('aapl', price, volume=1000)
+        self.buffer.record_quote('JPM', {'current_price': 201.0, 'source': 'tiingo'})
+        self.buffer.record_quote('JPM', {'current_price': 1.0, 'source': 'database'})
+        self.assertEqual(Stocks.objects.get(ticker='AAPL').curr_price, Decimal('150.00'))
+
+        with mock.patch.object(Stocks.objects, 'bulk_update', wraps=Stocks.objects.bulk_update) as bulk_update:
+            self.assertEqual(self.buffer.flush(), 2)
+        bulk_update.assert_called_once()
+
+        aapl = Stocks.objects.get(ticker='AAPL')
+        self.assertEqual(aapl.curr_price, Decimal('153.46'))
+        self.assertEqual(aapl.volume, 1000)
+        self.assertEqual(Stocks.objects.get(ticker='JPM').curr_price, Decimal('201.00'))
+        self.assertEqual(self.buffer.stats(), {'recorded': 4, 'written': 2, 'flushes': 1, 'errors': 0, 'pending': 0})
+        self.assertEqual(self.buffer.flush(), 0)
+
+    def test_failed_flush_keeps_updates_without_overwriting_newer_ones(self):
+        self.buffer.record('AAPL', 151.0)
+        with mock.patch('stocks.price_writer.write_prices', side_effect=DatabaseError('locked')):
+            self.assertEqual(self.buffer.flush(), 0)
+        self.buffer.record('JPM', 202.0)
+
+        self.assertEqual(self.buffer.stats()['pending'], 2)
+        self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(Stocks.objects.get(ticker='AAPL').curr_price, Decimal('151.00'))
+
+    def test_full_buffer_wakes_the_writer(self):
+        self.buffer.record('AAPL', 151.0)
+        self.buffer.record('JPM', 201.0)
+        self.assertFalse(self.buffer._wakeup.is_set())
+        self.buffer.record('MSFT', 301.0)
+        self.assertTrue(self.buffer._wakeup.is_set())
@@ -0,0 +1,114 @@
+"""
+Quote providers: circuit breakers and multi-ticker fetches through the chain.
+"""
+from django.core.cache import caches
+from django.test import TestCase
+
+from stocks.providers import CircuitBreaker, ProviderChain, ProviderError, QuoteProvider, RateLimited
+
+
+class BatchProvider(QuoteProvider):
+    """Answers two symbols per request, failing any request that asks for a symbol in fail"""
+    supports_batch = True
+    batch_size = 2
+
+    def __init__(self, name, fail=()):
+        self.name = name
+        super().__init__()
+        self.fail = set(fail)
+        self.requested = []
+
+    def _fetch_many(self, symbols):
+        self.requested.append(list(symbols))
+        if self.fail & set(symbols):
+            raise ProviderError('upstream error')
+        return {symbol: {'symbol': symbol, 'current_price': 1.0, 'source': self.name} for symbol in symbols}
+
+
+class ProviderChainTests(TestCase):
+
+    def setUp(self):
+        caches['ratelimit'].clear()
+
+    def test_failed_chunk_keeps_earlier_quotes(self):
+        provider = BatchProvider('test-first', fail={'C'})
+        quotes = provider.fetch_quotes(['A', 'B', 'C', 'D', 'E'], rate_limit_wait=0)
+
+        self.assertEqual(sorted(quotes), ['A', 'B'])
+        self.assertEqual(provider.requested, [['A', 'B'], ['C', 'D']])
+
+    def test_first_chunk_failing_raises(self):
+        with self.assertRaises(ProviderError):
+            BatchProvider('test-first', fail={'A'}).fetch_quotes(['A', 'B', 'C'], rate_limit_wait=0)
+
+    def test_chain_retries_only_unanswered_symbols(self):
+        first, second = BatchProvider('test-first', fail={'C'}), BatchProvider('test-second')
+        chain = ProviderChain([first, second], rate_limit_wait=0)
+
+        quotes = chain.fetch_quotes(['A', 'B', 'C', 'D', 'E'])
+
+        self.assertEqual(sorted(quotes), ['A', 'B', 'C', 'D', 'E'])
+        self.assertEqual(quotes['A']['source'], 'test-first')
+        self.assertEqual(quotes['E']['source'], 'test-second')
+        self.assertEqual(second.requested, [['C', 'D'], ['E']])
+
+
+class RateLimitedProvider(QuoteProvider):
+    name = 'test-rate-limited'
+
+    def _fetch(self, symbol):
+        raise RateLimited("quota exhausted")
+
+
+class CircuitBreakerTests(TestCase):
+
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker('test', failure_threshold=3, cooldown=60)
+        breaker.record_failure()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, 'closed')
+        breaker.record_success()
+        breaker.record_failure()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, 'closed')
+        breaker.record_failure()
+        self.assertEqual(breaker.state, 'open')
+        self.assertFalse(breaker.allow())
+
+    def test_half_open_lets_one_trial_through(self):
+        breaker = CircuitBreaker('test', failure_threshold=1, cooldown=0)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, 'half_open')
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+
+        breaker.record_success()
+        self.assertEqual(breaker.state, 'closed')
+        self.assertTrue(breaker.allow())
+        self.assertTrue(breaker.allow())
+
+    def test_failed_trial_reopens(self):
+        breaker = CircuitBreaker('test', failure_threshold=1, cooldown=60)
+        breaker.record_failure()
+        breaker.opened_at -= 61
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, 'open')
+        self.assertFalse(breaker.allow())
+
+    def test_released_trial_can_be_retried(self):
+        breaker = CircuitBreaker('test', failure_threshold=1, cooldown=0)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.release_trial()
+        self.assertEqual(breaker.state, 'half_open')
+        self.assertTrue(breaker.allow())
+
+    def test_rate_limited_call_releases_the_trial(self):
+        provider = RateLimitedProvider(breaker=CircuitBreaker('test', failure_threshold=1, cooldown=0))
+        provider.breaker.record_failure()
+        self.assertTrue(provider.breaker.allow())
+        with self.assertRaises(RateLimited):
+            provider.fetch_quote('AAPL', rate_limit_wait=0)
+        self.assertEqual(provider.errors, 0)
+        self.assertTrue(provider.breaker.allow())
@@ -0,0 +1,98 @@
+"""
+The memory-mapped QuoteBoard and its seqlock readers.
+"""
+import shutil
+import tempfile
+import threading
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from stocks.quote_board import QuoteBoard
+from stocks.services import stock_service
+
+
+class _RowsDuringWrite:
+    """Board rows that a writer updates while the first reader copies a row"""
+
+    def __init__(self, rows, slot):
+        self.rows = rows
+        self.slot = slot
+        self.copies = 0
+
+    def __getitem__(self, key):
+        if key == self.slot:
+            self.copies += 1
+            if self.copies == 1:
+                # A complete write lands between the reader's two version checks
+                self.rows['version'][self.slot] += 2
+        return self.rows[key]
+
+    def __len__(self):
+        return len(self.rows)
+
+
+class QuoteBoardTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.path = self.tmp / 'board.bin'
+        self.writer = QuoteBoard(self.path, capacity=8)
+
+    def test_readers_in_other_processes_see_published_rows(self):
+        self.assertTrue(self.writer.publish('aapl', {'current_price': 101.5, 'volume': 10, 'source': 'tiingo'}, 1e9))
+
+        quote, fetched_at = QuoteBoard(self.path).get('AAPL')
+        self.assertEqual(fetched_at, 1e9)
+        self.assertEqual(quote['current_price'], 101.5)
+        self.assertEqual(quote['source'], 'tiingo')
+        self.assertNotIn('previous_close', quote)
+
+    def test_reader_gives_up_on_a_row_being_written(self):
+        self.writer.publish('AAPL', {'current_price': 101.5}, 1e9)
+        reader = QuoteBoard(self.path)
+        reader.get('AAPL')
+        reader._rows['version'][0] += 1  # odd: a writer is mid-update
+
+        self.assertIsNone(reader.get('AAPL'))
+
+    def test_reader_retries_when_the_row_changes_while_copied(self):
+        self.writer.publish('AAPL', {'current_price': 101.5}, 1e9)
+        reader = QuoteBoard(self.path)
+        reader.get('AAPL')
+        reader._rows = rows = _RowsDuringWrite(reader._rows, 0)
+
+        quote, _ = reader.get('AAPL')
+        self.assertEqual(quote['current_price'], 101.5)
+        self.assertEqual(rows.copies, 2)
+
+    def test_concurrent_reads_never_see_a_torn_row(self):
+        reader = QuoteBoard(self.path)
+        self.writer.publish('AAPL', {'current_price': 1.0, 'previous_close': 0.0}, 1.0)
+        done = threading.Event()
+
+        def write():
+            for price in range(2, 2000):
+                self.writer.publish('AAPL', {'current_price': float(price), 'previous_close': price - 1.0}, 1.0)
+            done.set()
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        while not done.is_set():
+            row = reader.get('AAPL')
+            if row is not None:
+                self.assertEqual(row[0]['current_price'] - row[0]['previous_close'], 1.0)
+        writer.join()
+
+    def test_only_the_refresher_publishes_by_default(self):
+        self.assertFalse(stock_service.publish_quotes)
+        with mock.patch.object(stock_service, 'publish_quotes', False), \
+                mock.patch('stocks.management.commands.refresh_prices.PriceRefresher') as refresher:
+            refresher.return_value.demand.return_value = {}
+            refresher.return_value.run_once.return_value = {'due': 0}
+            call_command('refresh_prices', '--once', stdout=StringIO())
+            self.assertTrue(stock_service.publish_quotes)
@@ -0,0 +1,53 @@
+"""
+Quote, fundamentals and sparkline cached as separate records.
+"""
+from unittest import mock
+
+from django.core.cache import cache
+
+from stocks.codecs import decode_quote
+
+from .helpers import ServiceTestCase
+
+TIINGO_QUOTE = {
+    'symbol': 'AAPL', 'current_price': 101.0, 'previous_close': 100.0, 'day_change': 1.0,
+    'source': 'tiingo', 'name': 'Apple Inc.', 'sector': 'Technology',
+}
+
+
+class SplitRecordTests(ServiceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch('stocks.services.refresh_executor.submit')
+        self.submit = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_fetch_splits_the_provider_answer_into_records(self):
+        with mock.patch.object(self.service.providers, 'fetch_quote', return_value=dict(TIINGO_QUOTE)):
+            data = self.service.get_stock_data('AAPL')
+
+        quote, _ = decode_quote(cache.get('stock_quote_AAPL'))
+        self.assertEqual(quote['current_price'], 101.0)
+        self.assertNotIn('name', quote)
+        self.assertEqual(cache.get('stock_fundamentals_AAPL'), {'name': 'Apple Inc.', 'sector': 'Technology'})
+        self.assertEqual(data['name'], 'Apple Inc.')
+        self.assertEqual(data['sparkline_prices'], [])
+        # Only the missing sparkline is left to the background
+        self.submit.assert_called_once()
+        self.assertEqual(self.submit.call_args.args[1:], ('sparkline', ['AAPL']))
+
+    def test_quote_refresh_keeps_the_other_records(self):
+        cache.set('stock_fundamentals_AAPL', {'name': 'Apple Inc.', 'market_cap': 3000}, 300)
+        cache.set('stock_sparkline_AAPL', [99.0, 100.0], 300)
+
+        with mock.patch.object(self.service.providers, 'fetch_quote', return_value=dict(TIINGO_QUOTE, name='Apple')), \
+                mock.patch.object(self.service, '_get_yfinance_fundamentals') as fundamentals:
+            data = self.service.get_stock_data('AAPL')
+
+        fundamentals.assert_not_called()
+        self.submit.assert_not_called()
+        self.assertEqual(data['market_cap'], 3000)
+        # Provider metadata does not overwrite fundamentals already cached
+        self.assertEqual(data['name'], 'Apple Inc.')
+        self.assertEqual(data['sparkline_prices'], [99.0, 100.0])
@@ -0,0 +1,65 @@
+"""
+The demand-ranked background price refresher.
+"""
+import time
+from decimal import Decimal
+
+from stocks.models import PriceAlert, Stocks, UserStock, Watchlist
+from stocks.refresher import PriceRefresher, symbol_demand
+
+from .helpers import TradeTestCase
+
+
+class FakeService:
+    """Answers every quote at a fixed price and records what was loaded"""
+
+    def __init__(self):
+        self.loaded = []
+
+    def read_quote_envelope(self, symbol):
+        return None
+
+    def fresh_until(self, fetched_at):
+        return fetched_at
+
+    def missing_symbols(self, symbols):
+        return set()
+
+    def load_quotes(self, symbols, store=False):
+        self.loaded.append(list(symbols))
+        return {symbol: {'symbol': symbol, 'current_price': 123.45, 'volume': 10} for symbol in symbols}, []
+
+
+class PriceRefresherTests(TradeTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.msft = Stocks.objects.create(ticker='MSFT', name='Microsoft', curr_price=Decimal('300.00'))
+        UserStock.objects.create(user=self.user, stock=self.aapl, purchase_price=Decimal('100'), purchase_quantity=1)
+        PriceAlert.objects.create(user=self.user, stock_symbol='aapl', stock_name='Apple Inc.', alert_type='ABOVE',
+                                  target_price=Decimal('200'))
+        PriceAlert.objects.create(user=self.user, stock_symbol='MSFT', stock_name='Microsoft', alert_type='ABOVE',
+                                  target_price=Decimal('400'), status='CANCELLED')
+        Watchlist.objects.create(user=self.user, stock_symbol='JPM', stock_name='JPMorgan Chase')
+        self.service = FakeService()
+
+    def test_demand_weights_holders_watchlists_and_active_alerts(self):
+        self.assertEqual(symbol_demand(), {'AAPL': 4, 'JPM': 1, 'MSFT': 0})
+
+    def test_most_demanded_symbols_refresh_first_and_more_often(self):
+        refresher = PriceRefresher(self.service, min_interval=60, max_interval=900, max_per_pass=2)
+
+        stats = refresher.run_once()
+        self.assertEqual(self.service.loaded, [['AAPL', 'JPM']])
+        self.assertEqual((stats['due'], stats['refreshed'], stats['persisted']), (3, 2, 2))
+        self.assertEqual(Stocks.objects.get(ticker='AAPL').curr_price, Decimal('123.45'))
+
+        refresher.run_once()
+        self.assertEqual(self.service.loaded[-1], ['MSFT'])
+
+        # AAPL has four times JPM's demand, so it refreshes four times as often
+        now = time.time()
+        self.assertEqual(refresher.due(), [])
+        self.assertEqual(refresher.due(now + 61), ['AAPL'])
+        self.assertEqual(refresher.due(now + 241), ['AAPL', 'JPM'])
+        self.assertEqual(refresher.due(now + 901), ['AAPL', 'JPM', 'MSFT'])
@@ -0,0 +1,113 @@
+"""
+Request coalescing with SingleFlight, within a process and across workers.
+"""
+import threading
+import time
+
+from django.core.cache import cache, caches
+from django.test import TestCase
+
+from stocks.cache_backends import SharedCache
+from stocks.services import request_coalescer
+from stocks.singleflight import SingleFlight
+
+
+class SingleFlightTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        caches['coordination'].clear()
+
+    def test_followers_in_one_process_share_one_fetch(self):
+        flight = SingleFlight(lease_timeout=5, cache=SharedCache('default'))
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return {'price': 101.0}
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flight.do('AAPL', fetch, lambda: None)))
+        leader.start()
+        started.wait(5)
+        followers = [
+            threading.Thread(target=lambda: results.append(flight.do('AAPL', fetch, lambda: None)))
+            for _ in range(3)
+        ]
+        for thread in followers:
+            thread.start()
+        # Give the followers time to queue behind the leader
+        time.sleep(0.1)
+        release.set()
+        for thread in [leader] + followers:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'price': 101.0}] * 4)
+        self.assertEqual(flight.stats()['coalesced_local'], 3)
+
+    def test_leader_holds_its_lease_in_the_shared_cache(self):
+        flight = SingleFlight(lease_timeout=5, cache=SharedCache('coordination'))
+
+        self.assertEqual(flight.do('AAPL', lambda: caches['coordination'].get('singleflight_AAPL'), lambda: None), 1)
+        self.assertIsNone(caches['coordination'].get('singleflight_AAPL'))
+        self.assertIsNone(cache.get('singleflight_AAPL'))
+        # Followers in other workers pick the result up from there
+        self.assertEqual(caches['coordination'].get('singleflight_result_AAPL'), 1)
+
+    def test_remote_lease_holder_result_is_used(self):
+        # Another worker holds the lease and has already shared its result
+        caches['coordination'].add('singleflight_AAPL', 1, 5)
+        caches['coordination'].set('singleflight_result_AAPL', {'price': 99.0}, 5)
+        flight = SingleFlight(lease_timeout=5, poll_interval=0.01, cache=SharedCache('coordination'))
+
+        def fetch():
+            raise AssertionError('should not go upstream')
+
+        self.assertEqual(flight.do('AAPL', fetch, lambda: None), {'price': 99.0})
+        self.assertEqual(flight.stats()['coalesced_remote'], 1)
+        self.assertEqual(caches['coordination'].get(SingleFlight.STATS_KEY), 1)
+
+    def test_fetches_once_a_remote_holder_gives_up(self):
+        caches['coordination'].add('singleflight_AAPL', 1, 5)
+        flight = SingleFlight(lease_timeout=5, poll_interval=0.01, cache=SharedCache('coordination'))
+
+        def read_cached():
+            # The holder releases its lease without caching anything
+            caches['coordination'].delete('singleflight_AAPL')
+            return None
+
+        self.assertEqual(flight.do('AAPL', lambda: 'direct', read_cached), 'direct')
+        self.assertEqual(flight.stats()['loads'], 1)
+
+    def test_follower_fetches_when_the_leader_times_out(self):
+        flight = SingleFlight(lease_timeout=0.2, cache=SharedCache('default'))
+        started, release = threading.Event(), threading.Event()
+
+        def slow_fetch():
+            started.set()
+            release.wait(5)
+            return 'leader'
+
+        leader = threading.Thread(target=flight.do, args=('AAPL', slow_fetch, lambda: None))
+        leader.start()
+        started.wait(5)
+        try:
+            self.assertEqual(flight.do('AAPL', lambda: 'follower', lambda: None), 'follower')
+        finally:
+            release.set()
+            leader.join(5)
+        self.assertEqual(flight.stats()['timeouts'], 1)
+
+    def test_falls_back_to_the_process_cache(self):
+        shared = SharedCache('missing')
+        shared.set('key', 1)
+
+        self.assertEqual(shared.alias, 'default')
+        self.assertEqual(cache.get('key'), 1)
+
+    def test_service_coalesces_through_the_coordination_cache(self):
+        self.assertEqual(request_coalescer.cache.alias, 'coordination')
@@ -0,0 +1,102 @@
+"""
+Daily portfolio snapshots, the ledger backfill and the history API.
+"""
+import shutil
+import tempfile
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+from django.urls import reverse
+
+from stocks.history_store import PriceHistoryStore
+from stocks.market_hours import MarketCalendar
+from stocks.models import PortfolioSnapshot
+from stocks.snapshots import backfill_snapshots, downsample, take_snapshots
+
+from .helpers import TradeTestCase, utc
+
+
+class SnapshotTests(TradeTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.store_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.store_dir)
+        self.store = PriceHistoryStore(self.store_dir)
+        self.calendar = MarketCalendar()
+
+    def store_closes(self, symbol, closes):
+        index = pd.DatetimeIndex([pd.Timestamp(day) for day in closes])
+        values = list(closes.values())
+        self.store.append(symbol, pd.DataFrame({
+            'Open': values, 'High': values, 'Low': values, 'Close': values, 'Volume': [1000] * len(values),
+        }, index=index))
+
+    def test_take_snapshots_from_positions(self):
+        self.trade(self.aapl, 'BUY', 10, '100.00')
+        self.trade(self.aapl, 'SELL', 4, '110.00')
+        self.trade(self.jpm, 'BUY', 2, '200.00')
+        self.store_closes('AAPL', {date(2025, 3, 7): 105.0})
+
+        self.assertEqual(take_snapshots(date(2025, 3, 7), self.store), 1)
+        snapshot = PortfolioSnapshot.objects.get(user=self.user)
+        # AAPL at the stored close, JPM at its stored price (no bar)
+        self.assertEqual(snapshot.total_value, Decimal('1030.00'))
+        self.assertEqual(snapshot.invested, Decimal('1000.00'))
+        self.assertEqual(snapshot.realized_pnl, Decimal('40.00'))
+        self.assertEqual(snapshot.unrealized_pnl, Decimal('30.00'))
+        self.assertEqual(snapshot.sector_weights, {'Technology': 61.17, 'Financial Services': 38.83})
+
+        # Re-running the day overwrites instead of duplicating
+        self.assertEqual(take_snapshots(date(2025, 3, 7), self.store), 1)
+        self.assertEqual(PortfolioSnapshot.objects.count(), 1)
+
+    def test_backfill_replays_the_ledger(self):
+        self.trade(self.aapl, 'BUY', 10, '100.00', when=utc(2025, 3, 3, 15))
+        self.trade(self.aapl, 'SELL', 5, '110.00', when=utc(2025, 3, 5, 15))
+        self.store_closes('AAPL', {date(2025, 3, 3): 101.0, date(2025, 3, 4): 102.0, date(2025, 3, 6): 104.0})
+
+        created = backfill_snapshots(self.user, self.store, self.calendar, end=date(2025, 3, 10))
+        # The weekend is skipped
+        self.assertEqual(created, 6)
+        snapshots = {s.date: s for s in PortfolioSnapshot.objects.filter(user=self.user)}
+        self.assertEqual(snapshots[date(2025, 3, 3)].total_value, Decimal('1010.00'))
+        self.assertEqual(snapshots[date(2025, 3, 4)].total_value, Decimal('1020.00'))
+        # No bar on the 5th: the latest earlier close carries over
+        self.assertEqual(snapshots[date(2025, 3, 5)].total_value, Decimal('510.00'))
+        self.assertEqual(snapshots[date(2025, 3, 5)].realized_pnl, Decimal('50.00'))
+        self.assertEqual(snapshots[date(2025, 3, 10)].total_value, Decimal('520.00'))
+        self.assertEqual(snapshots[date(2025, 3, 10)].invested, Decimal('500.00'))
+        self.assertNotIn(date(2025, 3, 8), snapshots)
+
+        # Existing days are left alone
+        self.assertEqual(backfill_snapshots(self.user, self.store, self.calendar, end=date(2025, 3, 10)), 0)
+
+    def test_backfill_without_a_store_uses_traded_prices(self):
+        self.trade(self.aapl, 'BUY', 10, '100.00', when=utc(2025, 3, 3, 15))
+        backfill_snapshots(self.user, None, self.calendar, end=date(2025, 3, 4))
+        values = list(PortfolioSnapshot.objects.filter(user=self.user).values_list('total_value', flat=True))
+        self.assertEqual(values, [Decimal('1000.00'), Decimal('1000.00')])
+
+    def test_downsample(self):
+        self.assertEqual(list(downsample(5, 10)), [0, 1, 2, 3, 4])
+        indices = downsample(1000, 50)
+        self.assertLessEqual(len(indices), 50)
+        self.assertEqual((indices[0], indices[-1]), (0, 999))
+        self.assertTrue(np.all(np.diff(indices) > 0))
+        self.assertEqual(list(downsample(10, 1)), [0, 9])
+
+    def test_history_api(self):
+        self.client.force_login(self.user)
+        self.trade(self.aapl, 'BUY', 10, '100.00', when=utc(2025, 3, 3, 15))
+        backfill_snapshots(self.user, None, self.calendar, end=date(2025, 3, 7))
+
+        data = self.client.get(reverse('portfolio_history_api'), {'period': 'max', 'points': 2}).json()
+        self.assertEqual(data['days'], 5)
+        self.assertEqual([point['date'] for point in data['points']], ['2025-03-03', '2025-03-07'])
+        self.assertEqual(data['points'][-1]['total_value'], 1000.0)
+
+        response = self.client.get(reverse('portfolio_history_api'), {'period': 'forever'})
+        self.assertEqual(response.status_code, 400)
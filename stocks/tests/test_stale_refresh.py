@@ -0,0 +1,52 @@
+"""
+Stale-while-revalidate quotes: served at once, refreshed once in the background.
+"""
+import time
+from unittest import mock
+
+from django.core.cache import cache, caches
+
+from stocks.codecs import encode_quote
+from stocks.services import StockDataService
+
+from .helpers import ServiceTestCase
+
+
+class StaleRefreshTests(ServiceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.service.request_path_fetch = True
+        fetched_at = time.time() - self.service.soft_ttl - 5
+        quote = {'symbol': 'AAPL', 'current_price': 101.0, 'previous_close': 100.0}
+        cache.set('stock_quote_AAPL', encode_quote(quote, fetched_at), 300)
+        cache.set('stock_fundamentals_AAPL', {'name': 'Apple Inc.'}, 300)
+        cache.set('stock_sparkline_AAPL', [100.0, 101.0], 300)
+
+    def test_stale_quote_is_served_while_one_refresh_runs(self):
+        # A second service stands in for another worker sharing the coordination cache
+        other = StockDataService()
+        other.quote_board = None
+        other.market_policy = None
+        with mock.patch('stocks.services.refresh_executor.submit') as submit, \
+                mock.patch('stocks.services.yf.download') as download:
+            first = self.service.get_stock_data('AAPL')
+            second = other.get_stock_data('AAPL')
+
+        download.assert_not_called()
+        self.assertEqual(first['current_price'], 101.0)
+        self.assertTrue(first['is_stale'])
+        self.assertTrue(second['is_stale'])
+        submit.assert_called_once()
+        self.assertEqual(submit.call_args.args[1:], ('quote', ['AAPL']))
+        self.assertEqual(caches['coordination'].get('stock_refresh_quote_AAPL'), 1)
+
+    def test_refresh_releases_its_claim(self):
+        with mock.patch('stocks.services.refresh_executor.submit') as submit:
+            self.service.get_multiple_stocks(['AAPL'])
+        submit.assert_called_once()
+
+        with mock.patch.object(self.service, '_fetch_coalesced', return_value=None), \
+                mock.patch('stocks.services.connections.close_all'):
+            self.service._refresh_records('quote', ['AAPL'])
+        self.assertIsNone(caches['coordination'].get('stock_refresh_quote_AAPL'))
@@ -0,0 +1,86 @@
+"""
+PriceHub fan-out of price changes and the server-sent event view.
+"""
+import asyncio
+from unittest import mock
+
+from django.test import AsyncClient, SimpleTestCase
+from django.urls import reverse
+
+from stocks.streaming import PriceHub
+
+from .helpers import TradeTestCase
+
+
+class FakeService:
+
+    def __init__(self):
+        self.prices = {'AAPL': 150.0, 'MSFT': 300.0}
+        self.requests = []
+
+    def get_multiple_stocks(self, symbols):
+        self.requests.append(sorted(symbols))
+        return {symbol: {'current_price': self.prices[symbol], 'volume': 1} for symbol in symbols}
+
+
+class PriceHubTests(SimpleTestCase):
+
+    def setUp(self):
+        self.service = FakeService()
+        self.changes = []
+        self.hub = PriceHub(self.service, on_change=lambda symbol, data: self.changes.append(symbol))
+        # Poll from the test instead of the background thread
+        patcher = mock.patch.object(self.hub, '_start')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def received(self, subscription):
+        """Prices pushed to a subscription so far"""
+        self.loop.run_until_complete(asyncio.sleep(0))
+        pushed = []
+        while not subscription.queue.empty():
+            pushed.extend(subscription.queue.get_nowait())
+        return {price['symbol']: price['current_price'] for price in pushed}
+
+    def test_one_poll_fans_out_to_every_subscriber(self):
+        both = self.hub.subscribe(['AAPL', 'MSFT'], loop=self.loop)
+        apple = self.hub.subscribe(['AAPL'], loop=self.loop)
+
+        self.hub.poll()
+        self.assertEqual(self.service.requests, [['AAPL', 'MSFT']])
+        self.assertEqual(self.received(both), {'AAPL': 150.0, 'MSFT': 300.0})
+        self.assertEqual(self.received(apple), {'AAPL': 150.0})
+
+        self.service.prices['MSFT'] = 301.0
+        self.hub.poll()
+        self.assertEqual(self.received(both), {'MSFT': 301.0})
+        self.assertEqual(self.received(apple), {})
+        self.assertEqual(sorted(self.changes), ['AAPL', 'MSFT', 'MSFT'])
+        self.assertEqual(self.hub.stats(), {'polls': 2, 'changes': 3, 'pushes': 3, 'clients': 2, 'symbols': 2})
+
+    def test_new_subscribers_get_the_latest_prices_at_once(self):
+        first = self.hub.subscribe(['AAPL'], loop=self.loop)
+        self.hub.poll()
+
+        late = self.hub.subscribe(['AAPL'], loop=self.loop)
+        self.assertEqual(self.received(late), {'AAPL': 150.0})
+
+        self.hub.unsubscribe(first)
+        self.hub.unsubscribe(late)
+        self.hub.poll()
+        self.assertEqual(len(self.service.requests), 1)
+        self.assertEqual(self.hub.stats()['symbols'], 0)
+
+
+class StreamPricesViewTests(TradeTestCase):
+
+    def test_wsgi_requests_are_told_to_poll(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('stream_prices'))
+        self.assertEqual(response.status_code, 503)
+
+    async def test_asgi_stream_needs_a_login(self):
+        response = await AsyncClient().get(reverse('stream_prices'))
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,123 @@
+"""
+Tax lots: FIFO, LIFO and specific-lot sells, realized gains and yearly summaries.
+"""
+from decimal import Decimal
+from unittest import mock
+
+from django.test import override_settings
+from django.urls import reverse
+
+from stocks.models import LotCursor, RealizedGainSummary, RealizedLot, TaxLot, Transaction
+from stocks.tax_lots import InvalidLotSelection, open_lots, realized_gain_summaries, rebuild_lots, sync_lots
+
+from .helpers import TradeTestCase, utc
+
+
+class TaxLotTests(TradeTestCase):
+
+    def buy_three_lots(self):
+        # The first lot is over a year old when sold, so it is long term
+        return [
+            self.trade(self.aapl, 'BUY', 10, '100.00', when=utc(2023, 1, 10, 15)),
+            self.trade(self.aapl, 'BUY', 10, '120.00', when=utc(2024, 6, 3, 15)),
+            self.trade(self.aapl, 'BUY', 10, '130.00', when=utc(2024, 9, 3, 15)),
+        ]
+
+    def sell(self, quantity, price, when, **kwargs):
+        sell = self.trade(self.aapl, 'SELL', quantity, price, **kwargs)
+        Transaction.objects.filter(pk=sell.pk).update(date=when)
+        rebuild_lots(self.user)
+        return sell
+
+    def open_quantities(self):
+        return dict(TaxLot.objects.filter(user=self.user).values_list('buy_transaction_id', 'quantity_open'))
+
+    def test_fifo_closes_oldest_lots_first(self):
+        first, second, third = self.buy_three_lots()
+        self.sell(15, '150.00', utc(2024, 10, 1, 15), lot_method='FIFO')
+
+        self.assertEqual(self.open_quantities(), {second.id: 5, third.id: 10})
+        gains = {lot.buy_transaction_id: (lot.quantity, lot.realized_gain, lot.term)
+                 for lot in RealizedLot.objects.filter(user=self.user)}
+        self.assertEqual(gains, {
+            first.id: (10, Decimal('500.00'), 'LONG'),
+            second.id: (5, Decimal('150.00'), 'SHORT'),
+        })
+
+    def test_lifo_closes_newest_lots_first(self):
+        first, second, third = self.buy_three_lots()
+        self.sell(15, '150.00', utc(2024, 10, 1, 15), lot_method='LIFO')
+
+        self.assertEqual(self.open_quantities(), {first.id: 10, second.id: 5})
+        realized = RealizedLot.objects.filter(user=self.user)
+        self.assertEqual(sum(lot.realized_gain for lot in realized), Decimal('350.00'))
+        self.assertEqual({lot.term for lot in realized}, {'SHORT'})
+
+    def test_specific_lots_close_in_the_order_chosen(self):
+        first, second, third = self.buy_three_lots()
+        self.sell(12, '150.00', utc(2024, 10, 1, 15), lot_method='SPECIFIC', lot_selection=[third.id, first.id])
+
+        self.assertEqual(self.open_quantities(), {first.id: 8, second.id: 10})
+        quantities = dict(RealizedLot.objects.filter(user=self.user).values_list('buy_transaction_id', 'quantity'))
+        self.assertEqual(quantities, {third.id: 10, first.id: 2})
+
+    def test_specific_lot_selection_is_validated(self):
+        first, second, third = self.buy_three_lots()
+        with self.assertRaises(InvalidLotSelection):
+            self.trade(self.aapl, 'SELL', 15, '150.00', lot_method='SPECIFIC', lot_selection=[first.id])
+        with self.assertRaises(InvalidLotSelection):
+            self.trade(self.aapl, 'SELL', 1, '150.00', lot_method='SPECIFIC', lot_selection=[999999])
+        self.assertFalse(Transaction.objects.filter(type='SELL').exists())
+
+    def test_yearly_summaries(self):
+        self.buy_three_lots()
+        self.sell(10, '150.00', utc(2024, 10, 1, 15), lot_method='FIFO')
+        self.sell(5, '110.00', utc(2025, 2, 3, 15), lot_method='FIFO')
+
+        summaries = {summary.tax_year: summary for summary in RealizedGainSummary.objects.filter(user=self.user)}
+        self.assertEqual(set(summaries), {2024, 2025})
+        self.assertEqual(summaries[2024].long_term_gain, Decimal('500.00'))
+        self.assertEqual(summaries[2024].short_term_gain, Decimal('0.00'))
+        self.assertEqual(summaries[2025].short_term_gain, Decimal('-50.00'))
+        self.assertEqual(summaries[2025].proceeds, Decimal('550.00'))
+        self.assertEqual(summaries[2025].cost_basis, Decimal('600.00'))
+        self.assertEqual(summaries[2025].lots_closed, 1)
+
+    def test_sync_folds_each_trade_once(self):
+        self.buy_three_lots()
+        self.assertEqual(sync_lots(self.user), 0)
+        self.trade(self.aapl, 'SELL', 4, '150.00', lot_method='FIFO')
+        self.assertEqual(sync_lots(self.user), 0)
+        self.assertEqual(RealizedLot.objects.filter(user=self.user).count(), 1)
+
+        before = sorted(self.open_quantities().items())
+        self.assertEqual(rebuild_lots(self.user), 4)
+        self.assertEqual(sorted(self.open_quantities().items()), before)
+
+
+    def test_reads_do_not_write(self):
+        self.buy_three_lots()
+        self.trade(self.aapl, 'SELL', 4, '150.00', lot_method='FIFO')
+        LotCursor.objects.filter(user=self.user).delete()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(len(open_lots(self.user, 'AAPL')), 3)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(realized_gain_summaries(self.user)), 1)
+        self.assertFalse(LotCursor.objects.filter(user=self.user).exists())
+
+    @override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+    def test_dashboard_labels_both_realized_figures(self):
+        self.client.force_login(self.user)
+        self.trade(self.aapl, 'BUY', 10, '100.00', when=utc(2024, 1, 10, 15))
+        self.trade(self.aapl, 'BUY', 10, '120.00')
+        self.trade(self.aapl, 'SELL', 10, '130.00', lot_method='FIFO')
+        LotCursor.objects.filter(user=self.user).delete()
+
+        with mock.patch('stocks.views.stock_service.get_multiple_stocks', return_value={}):
+            response = self.client.get(reverse('portfolio_dashboard'))
+
+        self.assertFalse(LotCursor.objects.filter(user=self.user).exists())
+        # Average cost of 110 against the FIFO lot bought at 100
+        self.assertContains(response, 'Realized, all time (average cost): +$200.00')
+        self.assertContains(response, '(tax lots): +$300.00')
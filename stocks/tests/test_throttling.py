@@ -0,0 +1,45 @@
+"""
+Provider token buckets shared through the 'ratelimit' database cache.
+"""
+from unittest import mock
+
+from django.core.cache import cache, caches
+from django.db import DatabaseError
+from django.test import TestCase
+
+from stocks.throttling import TokenBucket
+
+
+class TokenBucketTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        caches['ratelimit'].clear()
+
+    def test_buckets_share_one_quota_through_the_database_cache(self):
+        # Two instances stand in for two worker processes
+        first = TokenBucket('test', rate_per_minute=60, capacity=3, cache_alias='ratelimit')
+        second = TokenBucket('test', rate_per_minute=60, capacity=3, cache_alias='ratelimit')
+
+        self.assertEqual(first.try_acquire(2), 0.0)
+        self.assertIsNotNone(caches['ratelimit'].get('ratelimit_test'))
+        self.assertIsNone(cache.get('ratelimit_test'))
+        wait = second.try_acquire(2)
+        self.assertGreater(wait, 0.5)
+        self.assertLessEqual(wait, 1.0)
+        self.assertEqual(second.try_acquire(1), 0.0)
+
+    def test_acquire_gives_up_after_its_timeout(self):
+        bucket = TokenBucket('slow', rate_per_minute=1, capacity=1, cache_alias='ratelimit')
+        self.assertTrue(bucket.acquire(1, timeout=0))
+        self.assertFalse(bucket.acquire(1, timeout=0.1))
+
+    def test_falls_back_to_the_process_cache(self):
+        bucket = TokenBucket('fallback', rate_per_minute=60, capacity=2, cache_alias='ratelimit')
+        with mock.patch.object(bucket.cache, 'add', side_effect=DatabaseError('no such table')):
+            self.assertEqual(bucket.try_acquire(1), 0.0)
+
+        self.assertEqual(bucket.cache_alias, 'default')
+        self.assertIsNotNone(cache.get('ratelimit_fallback'))
+        self.assertEqual(bucket.try_acquire(1), 0.0)
+        self.assertGreater(bucket.try_acquire(1), 0)
@@ -0,0 +1,107 @@
+"""
+Portfolio valuation on integer cents, and PortfolioAnalyzer built on it.
+"""
+from decimal import Decimal
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from stocks.services import PortfolioAnalyzer
+from stocks.valuation import Holdings, PriceVector, Valuation, to_cents, to_price_units
+
+
+class ValuationTests(SimpleTestCase):
+
+    def test_rounding_helpers(self):
+        self.assertEqual(to_cents('10.005'), 1001)
+        self.assertEqual(to_cents(None), 0)
+        self.assertEqual(to_price_units(10.005), 100050)
+        self.assertEqual(to_price_units(Decimal('0.00005')), 1)
+
+    def test_value_rounds_after_multiplying(self):
+        holdings = Holdings.build([('X', 3, Decimal('30.00'), None)])
+        valuation = Valuation(holdings, PriceVector.from_prices({'X': 10.005}))
+        # 30.015 exactly, not 3 * 10.01
+        self.assertEqual(valuation.total_value_cents, 3002)
+        self.assertEqual(valuation.total_pnl_cents, 2)
+        self.assertEqual(valuation.rows()[0]['current_price'], 10.005)
+
+    def test_totals_match_decimal_arithmetic(self):
+        rng = np.random.default_rng(7)
+        rows, prices, expected = [], {}, Decimal('0')
+        for i in range(200):
+            symbol = f'S{i % 40}'
+            price = prices.setdefault(symbol, Decimal(str(round(rng.uniform(1, 900), 4))))
+            quantity = int(rng.integers(1, 500))
+            rows.append((symbol, quantity, Decimal('0'), None))
+            expected += (price * quantity).quantize(Decimal('0.01'), rounding='ROUND_HALF_UP')
+
+        valuation = Valuation(Holdings.build(rows), PriceVector.from_prices(prices))
+        self.assertEqual(valuation.total_value_cents, int(expected * 100))
+
+    def test_weights_and_sectors(self):
+        holdings = Holdings.build([
+            ('AAPL', 2, Decimal('200.00'), None),
+            ('MSFT', 1, Decimal('300.00'), None),
+            ('JPM', 4, Decimal('400.00'), None),
+        ])
+        prices = PriceVector.from_prices(
+            {'AAPL': 150, 'MSFT': 300, 'JPM': 100},
+            {'AAPL': 'Technology', 'MSFT': 'Technology', 'JPM': 'Financial Services'},
+        )
+        valuation = Valuation(holdings, prices)
+
+        self.assertEqual(valuation.total_value_cents, 100000)
+        self.assertEqual(valuation.total_cost_cents, 90000)
+        self.assertAlmostEqual(float(valuation.weights.sum()), 1.0)
+        self.assertEqual(valuation.sector_allocation(), {'Technology': 60.0, 'Financial Services': 40.0})
+        self.assertEqual([round(row['gain_loss_percent'], 2) for row in valuation.rows()], [50.0, 0.0, 0.0])
+
+    def test_empty_holdings(self):
+        valuation = Valuation(Holdings.build([]), PriceVector.from_prices({}))
+        self.assertEqual(valuation.total_value_cents, 0)
+        self.assertEqual(valuation.total_return_percent, 0.0)
+        self.assertEqual(valuation.rows(), [])
+
+    def test_fractional_quantities_are_rejected(self):
+        with self.assertRaises(ValueError):
+            Holdings.build([('X', 1.5, Decimal('15.00'), None)])
+        self.assertEqual(Holdings.build([('X', 2.0, Decimal('20.00'), None)]).quantities.tolist(), [2])
+
+
+class PortfolioAnalyzerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.analyzer = PortfolioAnalyzer()
+
+    def test_metrics(self):
+        metrics = self.analyzer.calculate_portfolio_metrics([
+            {'symbol': 'AAPL', 'quantity': 2, 'avg_purchase_price': 100, 'current_price': 150.0},
+            {'symbol': 'JPM', 'quantity': 4.0, 'avg_purchase_price': '100.005', 'current_price': 90.0},
+        ])
+        self.assertEqual(metrics, {
+            'total_value': 660.0,
+            'total_invested': 600.02,
+            'total_gain_loss': 59.98,
+            'total_return_percentage': 10.0,
+            'number_of_positions': 2,
+        })
+
+    def test_rows_sharing_a_symbol_keep_their_own_price_and_sector(self):
+        portfolio = [
+            {'symbol': 'AAPL', 'quantity': 1, 'avg_purchase_price': 100, 'current_price': 100.0, 'sector': 'Technology'},
+            {'symbol': 'AAPL', 'quantity': 1, 'avg_purchase_price': 100, 'current_price': 300.0, 'sector': 'Hardware'},
+        ]
+        self.assertEqual(self.analyzer.calculate_portfolio_metrics(portfolio)['total_value'], 400.0)
+        self.assertEqual(self.analyzer.get_sector_allocation(portfolio), {'Hardware': 75.0, 'Technology': 25.0})
+
+    def test_sector_allocation_defaults_to_unknown(self):
+        allocation = self.analyzer.get_sector_allocation([
+            {'quantity': 3, 'current_price': 10.0, 'sector': 'Energy'},
+            {'quantity': 1, 'current_price': 10.0},
+        ])
+        self.assertEqual(allocation, {'Energy': 75.0, 'Unknown': 25.0})
+
+    def test_fractional_quantity_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.analyzer.calculate_portfolio_metrics([{'quantity': 0.5, 'current_price': 10.0}])
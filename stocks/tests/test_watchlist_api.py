@@ -0,0 +1,60 @@
+"""
+Conditional (ETag/304) and delta (?since=) polling of watchlist prices.
+"""
+from unittest import mock
+
+from django.urls import reverse
+
+from stocks.models import Watchlist
+
+from .helpers import TradeTestCase
+
+VERSION = 1_741_102_200_000_000
+
+
+class WatchlistPricesApiTests(TradeTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+        self.url = reverse('update_watchlist_prices_api')
+        for stock in (self.aapl, self.jpm):
+            Watchlist.objects.create(user=self.user, stock_symbol=stock.ticker, stock_name=stock.name)
+        self.live = {
+            'AAPL': {'symbol': 'AAPL', 'current_price': 151.0, 'version': VERSION},
+            'JPM': {'symbol': 'JPM', 'current_price': 201.0, 'version': VERSION + 5},
+        }
+        patcher = mock.patch('stocks.views.stock_service.get_multiple_stocks',
+                             side_effect=lambda symbols: {symbol: dict(self.live[symbol]) for symbol in symbols})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch('stocks.views.price_writer.record_quote')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_unchanged_poll_is_answered_with_304(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.json()['version'], VERSION + 5)
+        self.assertIn('no-cache', first['Cache-Control'])
+
+        again = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.content, b'')
+
+        self.live['AAPL'] = dict(self.live['AAPL'], current_price=152.0, version=VERSION + 9)
+        changed = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], first['ETag'])
+
+    def test_since_returns_only_newer_quotes(self):
+        data = self.client.get(self.url, {'since': VERSION}).json()
+
+        self.assertEqual([price['symbol'] for price in data['prices']], ['JPM'])
+        self.assertEqual(data['version'], VERSION + 5)
+        data = self.client.get(self.url, {'since': data['version']}).json()
+        self.assertEqual((data['prices'], data['version']), ([], VERSION + 5))
+
+    def test_since_must_be_a_version(self):
+        response = self.client.get(self.url, {'since': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,110 @@
+"""
+Rate limiting for upstream stock data providers.
+"""
+import logging
+import threading
+import time
+from typing import Dict, Optional
+from django.core.cache import caches
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter.
+
+    The bucket state lives in a cache shared by every worker process (the
+    'ratelimit' database cache by default), so all threads and workers draw
+    from the same quota. Updates are serialized with a short lock entry
+    created via cache.add(). If the shared cache is unavailable (e.g. its
+    table was never created) the bucket falls back to the process-local
+    default cache, where the quota applies per process.
+    """
+
+    def __init__(self, name: str, rate_per_minute: int, capacity: Optional[int] = None,
+                 cache_alias: str = 'default'):
+        self.name = name
+        self.cache_alias = cache_alias
+        self.cache = caches[cache_alias]
+        self.rate = max(rate_per_minute, 1) / 60.0  # tokens per second
+        self.capacity = capacity or max(rate_per_minute, 1)
+        self.state_key = f"ratelimit_{name}"
+        self.lock_key = f"ratelimit_{name}_lock"
+        self.state_timeout = max(60, int(self.capacity / self.rate * 2))
+        self._local_lock = threading.Lock()
+
+    def _lock(self, timeout: float = 1.0) -> bool:
+        """Take the cross-process lock guarding the bucket state"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.cache.add(self.lock_key, 1, 5):
+                return True
+            time.sleep(0.01)
+        return False
+
+    def try_acquire(self, tokens: int = 1) -> float:
+        """Take tokens if available. Returns 0 on success, otherwise seconds to wait."""
+        tokens = min(tokens, self.capacity)
+
+        with self._local_lock:
+            try:
+                return self._take(tokens)
+            except Exception as e:
+                if self.cache_alias == 'default':
+                    raise
+                logger.error(f"Shared rate limit cache '{self.cache_alias}' unavailable, "
+                             f"limiting {self.name} per process: {str(e)}")
+                self.cache_alias, self.cache = 'default', caches['default']
+                return self._take(tokens)
+
+    def _take(self, tokens: int) -> float:
+        if not self._lock():
+            return 0.05
+
+        try:
+            now = time.time()
+            state = self.cache.get(self.state_key)
+            if state:
+                available, updated = state
+                available = min(self.capacity, available + (now - updated) * self.rate)
+            else:
+                available = self.capacity
+
+            if available >= tokens:
+                self.cache.set(self.state_key, (available - tokens, now), self.state_timeout)
+                return 0.0
+
+            self.cache.set(self.state_key, (available, now), self.state_timeout)
+            return (tokens - available) / self.rate
+        finally:
+            self.cache.delete(self.lock_key)
+
+    def acquire(self, tokens: int = 1, timeout: Optional[float] = None) -> bool:
+        """Block until tokens are available or the timeout expires"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                logger.warning(f"Rate limit for {self.name} exhausted, giving up after {timeout}s")
+                return False
+            time.sleep(min(wait, 1.0))
+
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str) -> TokenBucket:
+    """Return the shared token bucket for a provider"""
+    with _buckets_lock:
+        if provider not in _buckets:
+            api_settings = getattr(settings, 'STOCK_API_SETTINGS', {})
+            default_rate = api_settings.get('MAX_REQUESTS_PER_MINUTE', 60)
+            rate = api_settings.get('PROVIDER_RATE_LIMITS', {}).get(provider, default_rate)
+            _buckets[provider] = TokenBucket(provider, rate, cache_alias=api_settings.get('RATE_LIMIT_CACHE', 'default'))
+        return _buckets[provider]
@@ -21,7 +21,8 @@ from .views import (
     index, populate_stock_data, stocks, loginView, logoutView, register,
     buy, sell, transaction_history, portfolio_dashboard,
     watchlist_view, add_to_watchlist, remove_from_watchlist,
-    get_stock_price_api, update_watchlist_prices_api, stock_detail
+    get_stock_price_api, get_stock_prices_api, update_watchlist_prices_api, stock_detail,
+    stream_prices, realized_gains_api, portfolio_history_api
 )
 from .health_views import health_check, readiness_check, liveness_check
 from .enhanced_views import (
@@ -69,8 +70,12 @@ urlpatterns = [
     
     # API endpoints for real-time data
     path('api/stock/<str:symbol>/price/', get_stock_price_api, name='stock_price_api'),
+    path('api/stocks/prices/', get_stock_prices_api, name='stock_prices_api'),
+    path('api/stream/prices/', stream_prices, name='stream_prices'),
     path('api/watchlist/update-prices/', update_watchlist_prices_api, name='update_watchlist_prices_api'),
     path('api/stock/search/', stock_search_api, name='stock_search_api'),
+    path('api/realized-gains/', realized_gains_api, name='realized_gains_api'),
+    path('api/portfolio/history/', portfolio_history_api, name='portfolio_history_api'),
     
     # Health check endpoints
     path('api/health/', health_check, name='health_check'),
@@ -0,0 +1,257 @@
+"""
+Portfolio valuation on integer cents, shared by every dashboard.
+
+Holdings are kept as parallel arrays (symbol index, quantity, cost basis)
+and joined against a price vector in one indexing step, so value, P&L,
+weights and sector totals come from a few NumPy operations instead of a
+loop per view. Prices are held in int64 ten-thousandths of a dollar and
+money in int64 cents; a holding's value is rounded to cents only after
+quantity * price, and figures become float at the edge, for templates
+and JSON.
+"""
+import logging
+from dataclasses import dataclass, field
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .models import Stocks
+
+logger = logging.getLogger(__name__)
+
+CENT = Decimal('0.01')
+PRICE_STEP = Decimal('0.0001')
+# Price units per cent
+UNITS_PER_CENT = 100
+UNKNOWN_SECTOR = 'Unknown'
+
+
+def to_cents(amount) -> int:
+    """Round a Decimal, float or numeric string to whole cents, half up"""
+    if amount is None:
+        return 0
+    if not isinstance(amount, Decimal):
+        amount = Decimal(str(amount))
+    return int(amount.quantize(CENT, rounding=ROUND_HALF_UP).scaleb(2))
+
+
+def to_price_units(price) -> int:
+    """Round a price to whole ten-thousandths of a dollar, half up"""
+    if price is None:
+        return 0
+    if not isinstance(price, Decimal):
+        price = Decimal(str(price))
+    return int(price.quantize(PRICE_STEP, rounding=ROUND_HALF_UP).scaleb(4))
+
+
+def units_to_cents(units: np.ndarray) -> np.ndarray:
+    """Round amounts in price units to whole cents, half up"""
+    return (units + UNITS_PER_CENT // 2) // UNITS_PER_CENT
+
+
+def from_price_units(units) -> float:
+    return int(units) / (UNITS_PER_CENT * 100)
+
+
+def from_cents(cents) -> float:
+    return int(cents) / 100
+
+
+def cents_to_decimal(cents) -> Decimal:
+    return Decimal(int(cents)).scaleb(-2)
+
+
+@dataclass
+class Holdings:
+    """
+    A portfolio as arrays: one entry per holding, symbols stored once.
+
+    items keeps the source row of each holding (a Position, UserStock or
+    dict) so views can render alongside the computed figures.
+    """
+    symbols: List[str]
+    symbol_index: np.ndarray
+    quantities: np.ndarray
+    cost_cents: np.ndarray
+    items: List[Any] = field(default_factory=list)
+
+    @classmethod
+    def build(cls, rows: Iterable[Tuple[str, int, Any, Any]]) -> 'Holdings':
+        """
+        Build from (symbol, quantity, total cost basis, item) rows.
+
+        Quantities are whole shares; a fractional one raises ValueError
+        rather than being truncated.
+        """
+        positions: Dict[str, int] = {}
+        index, quantities, costs, items = [], [], [], []
+        for symbol, quantity, cost_basis, item in rows:
+            quantity = quantity or 0
+            if quantity != int(quantity):
+                raise ValueError(f"Fractional quantity {quantity} for {symbol}: holdings are whole shares")
+            index.append(positions.setdefault(symbol, len(positions)))
+            quantities.append(int(quantity))
+            costs.append(to_cents(cost_basis))
+            items.append(item)
+        return cls(
+            symbols=list(positions),
+            symbol_index=np.array(index, dtype=np.int64),
+            quantities=np.array(quantities, dtype=np.int64),
+            cost_cents=np.array(costs, dtype=np.int64),
+            items=items,
+        )
+
+    @classmethod
+    def from_positions(cls, positions) -> 'Holdings':
+        return cls.build((p.stock_symbol, p.quantity, p.cost_basis, p) for p in positions)
+
+    @classmethod
+    def from_user_stocks(cls, user_stocks) -> 'Holdings':
+        """UserStock rows (with stock selected), costed at their purchase price"""
+        return cls.build(
+            (item.stock.ticker, item.purchase_quantity, item.purchase_price * item.purchase_quantity, item)
+            for item in user_stocks
+        )
+
+    def __len__(self):
+        return len(self.items)
+
+
+@dataclass
+class PriceVector:
+    """Prices in ten-thousandths of a dollar and sectors for a set of symbols, in one order"""
+    symbols: List[str]
+    units: np.ndarray
+    sectors: List[str]
+    quotes: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    stock_ids: Dict[str, int] = field(default_factory=dict)
+
+    @classmethod
+    def from_prices(cls, prices: Dict[str, Any], sectors: Optional[Dict[str, str]] = None) -> 'PriceVector':
+        sectors = sectors or {}
+        symbols = list(prices)
+        return cls(
+            symbols=symbols,
+            units=np.array([to_price_units(prices[symbol]) for symbol in symbols], dtype=np.int64),
+            sectors=[sectors.get(symbol) or UNKNOWN_SECTOR for symbol in symbols],
+        )
+
+
+def price_vector(symbols: List[str], live_data: Optional[Dict[str, Dict[str, Any]]] = None) -> PriceVector:
+    """
+    Prices for symbols from a batch quote read, falling back to stored prices.
+
+    live_data is the result of get_multiple_stocks; without it only the
+    prices stored on Stocks are used. Stocks rows for all symbols are read
+    in one query, for fallbacks, sectors and ids.
+    """
+    live_data = live_data or {}
+    stored = {
+        row['ticker']: row
+        for row in Stocks.objects.filter(ticker__in=symbols).values('id', 'ticker', 'curr_price', 'sector')
+    } if symbols else {}
+
+    prices, sectors = {}, {}
+    for symbol in symbols:
+        stock_data, row = live_data.get(symbol), stored.get(symbol) or {}
+        if stock_data:
+            prices[symbol] = stock_data['current_price']
+        else:
+            prices[symbol] = row.get('curr_price') or 0
+        sectors[symbol] = row.get('sector') or (stock_data or {}).get('sector')
+
+    vector = PriceVector.from_prices(prices, sectors)
+    vector.quotes = {symbol: live_data[symbol] for symbol in symbols if symbol in live_data}
+    vector.stock_ids = {symbol: row['id'] for symbol, row in stored.items()}
+    return vector
+
+
+class Valuation:
+    """
+    Value holdings against a price vector.
+
+    All money arrays are int64 cents aligned with holdings (price_units
+    keeps the unrounded prices); weights and percentages are floats.
+    """
+
+    def __init__(self, holdings: Holdings, prices: PriceVector):
+        self.holdings = holdings
+        self.prices = prices
+
+        # Join: position of each distinct holding symbol in the price vector, then per holding
+        offsets = {symbol: i for i, symbol in enumerate(prices.symbols)}
+        join = np.array([offsets[symbol] for symbol in holdings.symbols], dtype=np.int64)
+        per_holding = join[holdings.symbol_index] if len(holdings) else np.zeros(0, dtype=np.int64)
+
+        self.price_units = prices.units[per_holding]
+        self.value_cents = units_to_cents(holdings.quantities * self.price_units)
+        self.pnl_cents = self.value_cents - holdings.cost_cents
+
+        self.total_value_cents = int(self.value_cents.sum())
+        self.total_cost_cents = int(holdings.cost_cents.sum())
+        self.total_pnl_cents = self.total_value_cents - self.total_cost_cents
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.weights = np.where(self.total_value_cents > 0, self.value_cents / max(self.total_value_cents, 1), 0.0)
+            self.pnl_percent = np.where(holdings.cost_cents > 0, self.pnl_cents * 100 / holdings.cost_cents, 0.0)
+
+        sector_names, sector_codes = np.unique(np.array(prices.sectors, dtype=object), return_inverse=True) \
+            if prices.symbols else (np.array([], dtype=object), np.zeros(0, dtype=np.int64))
+        self.sector_names = [str(name) for name in sector_names]
+        self.sector_codes = sector_codes[per_holding]
+        self.sector_cents = np.zeros(len(sector_names), dtype=np.int64)
+        np.add.at(self.sector_cents, self.sector_codes, self.value_cents)
+
+    @property
+    def total_value(self) -> float:
+        return from_cents(self.total_value_cents)
+
+    @property
+    def total_cost(self) -> float:
+        return from_cents(self.total_cost_cents)
+
+    @property
+    def total_pnl(self) -> float:
+        return from_cents(self.total_pnl_cents)
+
+    @property
+    def total_return_percent(self) -> float:
+        if self.total_cost_cents <= 0:
+            return 0.0
+        return self.total_pnl_cents * 100 / self.total_cost_cents
+
+    def sector_allocation(self) -> Dict[str, float]:
+        """Percent of value per sector, largest first"""
+        if self.total_value_cents <= 0:
+            return {name: 0.0 for name in self.sector_names}
+        order = np.argsort(-self.sector_cents, kind='stable')
+        return {
+            self.sector_names[i]: round(float(self.sector_cents[i] * 100 / self.total_value_cents), 2)
+            for i in order
+        }
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """Per-holding figures as floats, in holdings order"""
+        holdings = self.holdings
+        symbol_sectors = dict(zip(self.prices.symbols, self.prices.sectors))
+        return [
+            {
+                'symbol': holdings.symbols[holdings.symbol_index[i]],
+                'item': holdings.items[i],
+                'quantity': int(holdings.quantities[i]),
+                'current_price': from_price_units(self.price_units[i]),
+                'current_value': from_cents(self.value_cents[i]),
+                'invested_value': from_cents(holdings.cost_cents[i]),
+                'gain_loss': from_cents(self.pnl_cents[i]),
+                'gain_loss_percent': float(self.pnl_percent[i]),
+                'weight': float(self.weights[i] * 100),
+                'sector': symbol_sectors[holdings.symbols[holdings.symbol_index[i]]],
+            }
+            for i in range(len(holdings))
+        ]
+
+
+def value_holdings(holdings: Holdings, live_data: Optional[Dict[str, Dict[str, Any]]] = None) -> Valuation:
+    """Value holdings against quotes (or stored prices where there are none)"""
+    return Valuation(holdings, price_vector(holdings.symbols, live_data))
@@ -1,20 +1,38 @@
+import asyncio
+import hashlib
+import json
 import logging
+import re
+from datetime import datetime, timezone as dt_timezone
 from decimal import Decimal
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIRequest
 from django.core.mail import send_mail
 from django.core.paginator import Paginator
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views.decorators.http import require_http_methods, require_POST
 from django.views.decorators.cache import cache_page
 from django.db import transaction
+from django.db.models import Sum
 from django.utils import timezone
-
-from .models import Stocks, UserInfo, UserStock, Transaction, Watchlist
-from .services import stock_service, portfolio_analyzer
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .ledger import InsufficientShares, record_trade
+from .history_store import period_start
+from .snapshots import downsample
+from .tax_lots import InvalidLotSelection, open_lots, realized_gain_summaries, realized_lots
+from .valuation import Holdings, value_holdings
+from .models import PortfolioSnapshot, Position, Stocks, UserInfo, UserStock, Transaction, Watchlist
+from .services import (
+    FUNDAMENTAL_FIELDS, QUOTE_FIELDS, market_board, price_hub, price_writer, stock_service, portfolio_analyzer
+)
 import threading
 
 logger = logging.getLogger(__name__)
@@ -45,44 +63,18 @@ logger = logging.getLogger(__name__)
 def index(request):
     user = request.user
     # Get all user stocks for calculations
-    all_user_stocks = UserStock.objects.select_related('stock').filter(user=user)
-
-    total_value = 0
-    invested = 0
-
-    for item in all_user_stocks:
-        stock_value = item.purchase_quantity * item.stock.curr_price
-        invested_value = item.purchase_quantity * item.purchase_price
+    all_user_stocks = list(UserStock.objects.select_related('stock').filter(user=user).order_by('-id'))
 
-        total_value += stock_value
-        invested += invested_value
-        item.total_value = stock_value
-
-    gains = ((total_value - invested) / invested) * 100 if invested != 0 else 0
+    # Valued at stored prices, which the refresher keeps current, so the home page fetches no quotes
+    valuation = value_holdings(Holdings.from_user_stocks(all_user_stocks))
+    for row in valuation.rows():
+        row['item'].total_value = row['current_value']
 
     # Limit holdings display to most recent 3 for home page
-    recent_holdings = all_user_stocks.order_by('-id')[:3]
+    recent_holdings = all_user_stocks[:3]
 
-    # Get trending/popular stocks for display with live data (reduced from 8 to 6 for performance)
-    trending_stocks_query = Stocks.objects.filter(is_active=True).order_by('-volume')[:6]
-    trending_stocks = []
-    for stock in trending_stocks_query:
-        stock_data = stock_service.get_stock_data(stock.ticker)
-        if stock_data:
-            stock.day_change = stock_data.get('day_change', 0)
-            stock.day_change_percent = stock_data.get('day_change_percent', 0)
-            stock.sparkline_prices = stock_data.get('sparkline_prices', [])
-        trending_stocks.append(stock)
-    
-    # Get top stocks with live data (reduced from 6 to 4 for performance)
-    top_stocks_query = Stocks.objects.filter(is_active=True).order_by('-curr_price')[:4]
-    top_stocks = []
-    for stock in top_stocks_query:
-        stock_data = stock_service.get_stock_data(stock.ticker)
-        if stock_data:
-            stock.day_change = stock_data.get('day_change', 0)
-            stock.day_change_percent = stock_data.get('day_change_percent', 0)
-        top_stocks.append(stock)
+    # Market-wide lists are the same for every user and come from one shared snapshot
+    board = market_board.get()
     
     # Get watchlist count
     watchlist_count = Watchlist.objects.filter(user=user).count()
@@ -92,15 +84,17 @@ def index(request):
 
     context = {
         'data': recent_holdings,  # Only show recent 5 holdings
-        'total_value': total_value,
-        'invested': invested,
-        'gains': round(gains, 2),
-        'trending_stocks': trending_stocks,
-        'top_stocks': top_stocks,
+        'total_value': valuation.total_value,
+        'invested': valuation.total_cost,
+        'gains': round(valuation.total_return_percent, 2),
+        'trending_stocks': board['trending'],
+        'top_stocks': board['top_priced'],
+        'gainers': board['gainers'],
+        'losers': board['losers'],
         'watchlist_count': watchlist_count,
         'recent_transactions': recent_transactions,
-        'portfolio_count': all_user_stocks.count(),  # Total count for display
-        'has_more_holdings': all_user_stocks.count() > 3,  # Flag to show "View All" link
+        'portfolio_count': len(all_user_stocks),  # Total count for display
+        'has_more_holdings': len(all_user_stocks) > 3,  # Flag to show "View All" link
     }
 
     return render(request, 'index.html', context)
@@ -121,6 +115,12 @@ def populate_stock_data(request):
     success_count = 0
     error_count = 0
     
+    existing = set(Stocks.objects.filter(ticker__in=nasdaq_tickers).values_list('ticker', flat=True))
+    fetched_data = stock_service.get_multiple_stocks(
+        [ticker for ticker in nasdaq_tickers if ticker not in existing],
+        full_details=True,
+    )
+    
     try:
         with transaction.atomic():
             for ticker in nasdaq_tickers:
@@ -130,8 +130,8 @@ def populate_stock_data(request):
                         logger.info(f"Stock {ticker} already exists, skipping...")
                         continue
                     
-                    # Get stock data from service
-                    stock_data = stock_service.get_stock_data(ticker)
+                    # Get stock data fetched concurrently above
+                    stock_data = fetched_data.get(ticker)
                     
                     if stock_data:
                         stock = Stocks.objects.create(
@@ -178,10 +178,11 @@ def stocks(request):
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     
-    # Fetch live data for each stock to show on cards
+    # Fetch live data for the whole page in one batch to show on cards
+    live_data = stock_service.get_multiple_stocks([stock.ticker for stock in page_obj])
     stocks_with_data = []
     for stock in page_obj:
-        stock_data = stock_service.get_stock_data(stock.ticker)
+        stock_data = live_data.get(stock.ticker)
         if stock_data:
             # Attach live data to stock object
             stock.live_data = stock_data
@@ -361,15 +362,8 @@ def buy(request, id):
                 user_stock.purchase_quantity = total_quantity
                 user_stock.save()
             
-            # Record transaction
-            Transaction.objects.create(
-                user=user,
-                stock_symbol=stock.ticker,
-                stock_name=stock.name,
-                quantity=purchase_quantity,
-                price=purchase_price,
-                type='BUY'
-            )
+            # Record transaction and update the position
+            record_trade(user, stock, 'BUY', purchase_quantity, purchase_price)
             
         # Send email notification asynchronously
         try:
@@ -402,27 +396,44 @@ def buy(request, id):
 
 
 
-def  sell(request , id) :
+@login_required
+@require_POST
+def sell(request, id):
     stock = get_object_or_404(Stocks, id=id)
     user = request.user
-    sell_quantity = int(request.POST.get('quantity'))
-    userStock  =  UserStock.objects.filter(stock  =  stock ,  user =  user).first()
-
-    if userStock.purchase_quantity <  sell_quantity :
+    
+    try:
+        sell_quantity = int(request.POST.get('quantity', 0))
+    except (ValueError, TypeError):
+        sell_quantity = 0
+    if sell_quantity <= 0:
+        messages.error(request, "Quantity must be a positive number.")
+        return redirect('portfolio_dashboard')
+    
+    lot_method = request.POST.get('lot_method', '').upper()
+    if lot_method not in ('', 'FIFO', 'LIFO', 'SPECIFIC'):
+        messages.error(request, "Unknown lot method.")
+        return redirect('portfolio_dashboard')
+    lot_ids = [lot_id for lot_id in request.POST.getlist('lot_ids') if lot_id.isdigit()]
+    
+    try:
+        with transaction.atomic():
+            record_trade(user, stock, 'SELL', sell_quantity, stock.curr_price,
+                         lot_method=lot_method, lot_selection=lot_ids)
+            
+            userStock = UserStock.objects.select_for_update().filter(stock=stock, user=user).first()
+            if userStock:
+                if userStock.purchase_quantity > sell_quantity:
+                    userStock.purchase_quantity -= sell_quantity
+                    userStock.save()
+                else:
+                    userStock.delete()
+    except InsufficientShares:
         messages.error(request, "Can't sell more than you own")
-        return redirect('market')
-
-    userStock.purchase_quantity -= sell_quantity
-    userStock.save()
-
-    Transaction.objects.create(
-        user=user,
-        stock_symbol=stock.ticker,
-        stock_name=stock.name,
-        quantity=sell_quantity,
-        price=stock.curr_price,
-        type='SELL'
-    )
+        return redirect('portfolio_dashboard')
+    except InvalidLotSelection as e:
+        messages.error(request, str(e))
+        return redirect('portfolio_dashboard')
 
     t1 = threading.Thread(
         target=send_email_async,
@@ -465,76 +476,51 @@ def transaction_history(request):
 @login_required
 def portfolio_dashboard(request):
     user = request.user
-    transactions = Transaction.objects.filter(user=user)
+    holdings = Holdings.from_positions(Position.objects.filter(user=user, quantity__gt=0))
+
+    # Get current live prices for portfolio stocks, stored prices where there is no quote
+    live_data = stock_service.get_multiple_stocks(holdings.symbols)
+    valuation = value_holdings(holdings, live_data)
 
     portfolio = {}
-    for t in transactions:
-        if t.stock_symbol not in portfolio:
-            portfolio[t.stock_symbol] = {
-                'stock_name': t.stock_name,
-                'quantity': 0,
-                'invested_value': 0.0,
-                'current_price': 0.0, # This will be updated if live prices are integrated
-            }
-        if t.type == 'BUY':
-            portfolio[t.stock_symbol]['quantity'] += t.quantity
-            portfolio[t.stock_symbol]['invested_value'] += float(t.quantity * t.price)
-        elif t.type == 'SELL':
-            portfolio[t.stock_symbol]['quantity'] -= t.quantity
-            portfolio[t.stock_symbol]['invested_value'] -= float(t.quantity * t.price) # This might need more sophisticated calculation for average cost
-
-    # Remove stocks with zero quantity (if any after buy/sell)
-    portfolio = {symbol: data for symbol, data in portfolio.items() if data['quantity'] > 0}
-
-    # Get current live prices for portfolio stocks
-    for symbol, data in portfolio.items():
-        try:
-            # Get stock object from database
-            stock = Stocks.objects.filter(ticker=symbol).first()
-            if stock:
-                data['stock_id'] = stock.id  # Add stock ID for sell functionality
-            
-            # Get live price data
-            stock_data = stock_service.get_stock_data(symbol)
-            if stock_data:
-                data['current_price'] = stock_data['current_price']
-                data['day_change'] = stock_data.get('day_change', 0)
-                data['day_change_percent'] = stock_data.get('day_change_percent', 0)
-                data['sector'] = stock_data.get('sector', 'N/A')
-                
-                # Update database price
-                if stock:
-                    stock.curr_price = Decimal(str(stock_data['current_price']))
-                    stock.last_updated = timezone.now()
-                    stock.save()
-            else:
-                # Fallback to database price
-                data['current_price'] = float(stock.curr_price) if stock else 0.0
-                data['day_change'] = 0
-                data['day_change_percent'] = 0
-                data['sector'] = stock.sector if stock else 'N/A'
-        except Exception as e:
-            logger.error(f"Error fetching live price for {symbol}: {str(e)}")
-            # Use database price as fallback
-            stock = Stocks.objects.filter(ticker=symbol).first()
-            if stock:
-                data['stock_id'] = stock.id
-            data['current_price'] = float(stock.curr_price) if stock else 0.0
-            data['day_change'] = 0
-            data['day_change_percent'] = 0
-            data['sector'] = stock.sector if stock else 'N/A'
-            
-        data['current_value'] = data['quantity'] * data['current_price']
-        data['gain_loss'] = data['current_value'] - data['invested_value']
-        data['gain_loss_percent'] = (data['gain_loss'] / data['invested_value']) * 100 if data['invested_value'] > 0 else 0
+    for row in valuation.rows():
+        symbol, stock_data = row['symbol'], live_data.get(row['symbol'])
+        if stock_data:
+            # Persisted in the background with other price updates
+            price_writer.record_quote(symbol, stock_data)
+        portfolio[symbol] = {
+            'stock_name': row['item'].stock_name,
+            'stock_id': valuation.prices.stock_ids.get(symbol),  # Add stock ID for sell functionality
+            'quantity': row['quantity'],
+            'invested_value': row['invested_value'],
+            'current_price': row['current_price'],
+            'current_value': row['current_value'],
+            'gain_loss': row['gain_loss'],
+            'gain_loss_percent': row['gain_loss_percent'],
+            'weight': row['weight'],
+            'sector': row['sector'],
+            'day_change': stock_data.get('day_change', 0) if stock_data else 0,
+            'day_change_percent': stock_data.get('day_change_percent', 0) if stock_data else 0,
+        }
 
-    total_portfolio_value = sum(item['current_value'] for item in portfolio.values())
-    total_invested_capital = sum(item['invested_value'] for item in portfolio.values())
+    total_portfolio_value = valuation.total_value
+    total_invested_capital = valuation.total_cost
+    realized = Position.objects.filter(user=user).aggregate(total=Sum('realized_pnl'))['total'] or 0
+
+    # Open lots for specific-lot sells, grouped under each holding
+    for lot in open_lots(user).filter(stock_symbol__in=list(portfolio)):
+        portfolio[lot.stock_symbol].setdefault('lots', []).append(lot)
+    tax_year = timezone.localdate().year
+    year_summary = realized_gain_summaries(user).filter(tax_year=tax_year).first()
 
     context = {
         'portfolio': portfolio,
         'total_portfolio_value': total_portfolio_value,
         'total_invested_capital': total_invested_capital,
+        'realized_pnl': float(realized),
+        'tax_year': tax_year,
+        'tax_year_gain': float(year_summary.total_gain) if year_summary else 0.0,
+        'sector_allocation': valuation.sector_allocation(),
     }
     return render(request, 'portfolio_dashboard.html', context)
 
@@ -544,6 +530,7 @@ def watchlist_view(request):
     watchlist_items = Watchlist.objects.filter(user=request.user)
     
     # Enhance watchlist items with current prices and additional data
+    live_data = stock_service.get_multiple_stocks([item.stock_symbol for item in watchlist_items])
     enhanced_watchlist = []
     for item in watchlist_items:
         try:
@@ -551,14 +538,11 @@ def watchlist_view(request):
             stock = Stocks.objects.filter(ticker=item.stock_symbol).first()
             
             # Get live price data
-            stock_data = stock_service.get_stock_data(item.stock_symbol)
+            stock_data = live_data.get(item.stock_symbol)
             
             if stock_data:
-                # Update stock price in database if we got live data
-                if stock:
-                    stock.curr_price = Decimal(str(stock_data['current_price']))
-                    stock.last_updated = timezone.now()
-                    stock.save()
+                # Persisted in the background with other price updates
+                price_writer.record_quote(item.stock_symbol, stock_data)
                 
                 enhanced_item = {
                     'id': item.id,
@@ -629,32 +613,60 @@ def remove_from_watchlist(request, stock_symbol):
     return redirect("watchlist_view")
 
 
+def _conditional_json(request, versions, build_payload, variant=None):
+    """
+    Answer with 304 if the client already holds these quote versions.
+    
+    versions maps each symbol in the response to its quote version (0 if
+    missing); variant covers anything else the payload depends on.
+    build_payload is only called, and the JSON only encoded, when the
+    response has changed. ETag and Last-Modified are set on both.
+    """
+    digest = hashlib.md5(repr((sorted(versions.items()), variant)).encode()).hexdigest()
+    etag = f'"{digest}"'
+    latest = max(versions.values(), default=0)
+    last_modified = latest // 1_000_000 if latest else None
+    
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = JsonResponse(build_payload())
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    # Let browsers keep the body but revalidate every poll
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
 @login_required
 def get_stock_price_api(request, symbol):
-    """API endpoint to get real-time stock price data"""
+    """API endpoint to get real-time stock price data, answering 304 when the quote is unchanged"""
     try:
         stock_data = stock_service.get_stock_data(symbol.upper())
         
         if stock_data:
-            # Update database
-            stock = Stocks.objects.filter(ticker=symbol.upper()).first()
-            if stock:
-                stock.curr_price = Decimal(str(stock_data['current_price']))
-                stock.last_updated = timezone.now()
-                stock.save()
+            # Persisted in the background with other price updates
+            price_writer.record_quote(symbol.upper(), stock_data)
             
-            return JsonResponse({
-                'success': True,
-                'symbol': stock_data['symbol'],
-                'current_price': stock_data['current_price'],
-                'previous_close': stock_data.get('previous_close', stock_data['current_price']),
-                'day_change': stock_data.get('day_change', 0),
-                'day_change_percent': stock_data.get('day_change_percent', 0),
-                'volume': stock_data.get('volume', 0),
-                'market_cap': stock_data.get('market_cap', 0),
-                'last_updated': timezone.now().isoformat(),
-                'source': stock_data.get('source', 'API')
-            })
+            def payload():
+                return {
+                    'success': True,
+                    'symbol': stock_data['symbol'],
+                    'current_price': stock_data['current_price'],
+                    'previous_close': stock_data.get('previous_close', stock_data['current_price']),
+                    'day_change': stock_data.get('day_change', 0),
+                    'day_change_percent': stock_data.get('day_change_percent', 0),
+                    'volume': stock_data.get('volume', 0),
+                    'market_cap': stock_data.get('market_cap', 0),
+                    # The quote's fetch time, so the body only changes with the ETag
+                    'last_updated': datetime.fromtimestamp(stock_data['version'] / 1_000_000, dt_timezone.utc).isoformat(),
+                    'source': stock_data.get('source', 'API'),
+                    'is_stale': stock_data.get('is_stale', False),
+                    'version': stock_data['version'],
+                }
+            
+            return _conditional_json(request, {stock_data['symbol']: stock_data['version']}, payload,
+                                     variant=stock_data.get('is_stale', False))
         else:
             return JsonResponse({
                 'success': False,
@@ -671,45 +683,66 @@ def get_stock_price_api(request, symbol):
         }, status=500)
 
 
+def _watchlist_prices_payload(watchlist_items, live_data, since=0):
+    """Watchlist prices newer than version since, with the version to poll from next"""
+    updated_prices = []
+    errors = []
+    for item in watchlist_items:
+        try:
+            stock_data = live_data.get(item.stock_symbol)
+            if stock_data:
+                # Persisted in the background with other price updates
+                price_writer.record_quote(item.stock_symbol, stock_data)
+                
+                if stock_data['version'] <= since:
+                    continue
+                updated_prices.append({
+                    'symbol': stock_data['symbol'],
+                    'current_price': stock_data['current_price'],
+                    'day_change': stock_data.get('day_change', 0),
+                    'day_change_percent': stock_data.get('day_change_percent', 0),
+                    'volume': stock_data.get('volume', 0),
+                    'version': stock_data['version'],
+                })
+            else:
+                errors.append(f"Could not fetch data for {item.stock_symbol}")
+        except Exception as e:
+            errors.append(f"Error updating {item.stock_symbol}: {str(e)}")
+    
+    return {
+        'success': True,
+        'updated_count': len(updated_prices),
+        'error_count': len(errors),
+        'prices': updated_prices,
+        'errors': errors,
+        'version': max([since] + [stock_data['version'] for stock_data in live_data.values()]),
+        'timestamp': timezone.now().isoformat()
+    }
+
+
 @login_required
 def update_watchlist_prices_api(request):
-    """API endpoint to update all watchlist prices at once"""
+    """
+    API endpoint to update all watchlist prices at once.
+    
+    Every price carries its quote version and the response the highest
+    one; with ?since=<version> only symbols whose quote is newer are
+    returned. Unchanged polls are answered with 304 via ETag/Last-Modified.
+    """
     try:
-        watchlist_items = Watchlist.objects.filter(user=request.user)
-        updated_prices = []
-        errors = []
-        
-        for item in watchlist_items:
-            try:
-                stock_data = stock_service.get_stock_data(item.stock_symbol)
-                if stock_data:
-                    # Update database
-                    stock = Stocks.objects.filter(ticker=item.stock_symbol).first()
-                    if stock:
-                        stock.curr_price = Decimal(str(stock_data['current_price']))
-                        stock.last_updated = timezone.now()
-                        stock.save()
-                    
-                    updated_prices.append({
-                        'symbol': stock_data['symbol'],
-                        'current_price': stock_data['current_price'],
-                        'day_change': stock_data.get('day_change', 0),
-                        'day_change_percent': stock_data.get('day_change_percent', 0),
-                        'volume': stock_data.get('volume', 0)
-                    })
-                else:
-                    errors.append(f"Could not fetch data for {item.stock_symbol}")
-            except Exception as e:
-                errors.append(f"Error updating {item.stock_symbol}: {str(e)}")
+        try:
+            since = int(request.GET.get('since', 0))
+        except ValueError:
+            return JsonResponse({'success': False, 'error': 'since must be an integer version'}, status=400)
         
-        return JsonResponse({
-            'success': True,
-            'updated_count': len(updated_prices),
-            'error_count': len(errors),
-            'prices': updated_prices,
-            'errors': errors,
-            'timestamp': timezone.now().isoformat()
-        })
+        watchlist_items = list(Watchlist.objects.filter(user=request.user))
+        live_data = stock_service.get_multiple_stocks([item.stock_symbol for item in watchlist_items])
+        versions = {
+            item.stock_symbol: live_data[item.stock_symbol]['version'] if item.stock_symbol in live_data else 0
+            for item in watchlist_items
+        }
+        # since is part of the URL, so it needs no place in the ETag
+        return _conditional_json(request, versions, lambda: _watchlist_prices_payload(watchlist_items, live_data, since))
         
     except Exception as e:
         logger.error(f"Watchlist API error: {str(e)}")
@@ -719,6 +752,229 @@ def update_watchlist_prices_api(request):
         }, status=500)
 
 
+def _streamed_symbols(request):
+    """Watchlist and holding symbols of the requesting user, or None if not logged in"""
+    if not request.user.is_authenticated:
+        return None
+    symbols = set(Watchlist.objects.filter(user=request.user).values_list('stock_symbol', flat=True))
+    symbols.update(UserStock.objects.filter(user=request.user).values_list('stock__ticker', flat=True))
+    return sorted(symbol.upper() for symbol in symbols)
+
+
+async def stream_prices(request):
+    """
+    Server-sent event stream of price changes for the user's watchlist and holdings.
+    
+    Sends a 'prices' event with the latest known prices on connect and then
+    one per change, plus keep-alive comments. Needs an ASGI server to hold
+    many connections; every stream in the process shares one price_hub poll.
+    Streams end after STREAM_MAX_SECONDS, since Django 4.2 does not report
+    client disconnects to the generator, and the browser reconnects.
+    Under WSGI the response would be buffered until the stream ends, so it
+    answers 503 instead and the page keeps polling.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'success': False, 'error': 'Streaming needs an ASGI server'}, status=503)
+    
+    symbols = await sync_to_async(_streamed_symbols)(request)
+    if symbols is None:
+        return JsonResponse({'success': False, 'error': 'Authentication required'}, status=401)
+    
+    api_settings = getattr(settings, 'STOCK_API_SETTINGS', {})
+    keepalive = api_settings.get('STREAM_KEEPALIVE', 15)
+    max_seconds = api_settings.get('STREAM_MAX_SECONDS', 300)
+    
+    async def events():
+        subscription = price_hub.subscribe(symbols)
+        loop = asyncio.get_running_loop()
+        # Let the browser reconnect on its own after we recycle the stream
+        yield 'retry: 5000\n\n'
+        try:
+            deadline = loop.time() + max_seconds
+            while loop.time() < deadline:
+                try:
+                    prices = await asyncio.wait_for(subscription.queue.get(), keepalive)
+                except asyncio.TimeoutError:
+                    yield ': keep-alive\n\n'
+                    continue
+                yield f'event: prices\ndata: {json.dumps(prices)}\n\n'
+        finally:
+            price_hub.unsubscribe(subscription)
+    
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+PRICE_API_DEFAULT_FIELDS = (
+    'current_price', 'previous_close', 'day_change', 'day_change_percent',
+    'volume', 'last_updated', 'source', 'is_stale', 'age_seconds',
+)
+PRICE_API_FIELDS = set(QUOTE_FIELDS) | set(FUNDAMENTAL_FIELDS) | {'is_stale', 'age_seconds', 'version', 'sparkline_prices'}
+TICKER_PATTERN = re.compile(r'^[A-Z0-9.^=-]{1,10}$')
+
+
+def _split_param(value):
+    """Accept a comma-separated string or a list of them"""
+    if isinstance(value, str):
+        value = [value]
+    return [part.strip() for item in value or [] for part in str(item).split(',') if part.strip()]
+
+
+@login_required
+@require_http_methods(["GET", "POST"])
+def get_stock_prices_api(request):
+    """
+    API endpoint to get prices for many symbols in one response.
+    
+    GET /api/stocks/prices/?symbols=AAPL,MSFT&fields=current_price,volume
+    POST the same parameters as form data or a JSON body for long lists.
+    """
+    if request.method == 'POST' and request.content_type == 'application/json':
+        try:
+            params = json.loads(request.body or b'{}')
+        except ValueError:
+            return JsonResponse({'success': False, 'error': 'Invalid JSON body'}, status=400)
+        if not isinstance(params, dict):
+            return JsonResponse({'success': False, 'error': 'JSON body must be an object'}, status=400)
+        symbols, fields = params.get('symbols'), params.get('fields')
+        if not all(isinstance(value, (str, list, type(None))) for value in (symbols, fields)):
+            return JsonResponse({'success': False, 'error': 'symbols and fields must be strings or lists'}, status=400)
+    else:
+        query = request.POST if request.method == 'POST' else request.GET
+        symbols, fields = query.getlist('symbols'), query.getlist('fields')
+    
+    symbols = list(dict.fromkeys(symbol.upper() for symbol in _split_param(symbols)))
+    fields = _split_param(fields) or list(PRICE_API_DEFAULT_FIELDS)
+    max_symbols = getattr(settings, 'STOCK_API_SETTINGS', {}).get('PRICE_API_MAX_SYMBOLS', 50)
+    
+    if not symbols:
+        return JsonResponse({'success': False, 'error': 'No symbols given'}, status=400)
+    if len(symbols) > max_symbols:
+        return JsonResponse({
+            'success': False,
+            'error': f'Too many symbols: {len(symbols)} given, at most {max_symbols} allowed',
+        }, status=400)
+    invalid = [symbol for symbol in symbols if not TICKER_PATTERN.match(symbol)]
+    if invalid:
+        return JsonResponse({'success': False, 'error': f'Invalid symbols: {", ".join(invalid)}'}, status=400)
+    unknown = [field for field in fields if field not in PRICE_API_FIELDS]
+    if unknown:
+        return JsonResponse({'success': False, 'error': f'Unknown fields: {", ".join(unknown)}'}, status=400)
+    
+    try:
+        live_data = stock_service.get_multiple_stocks(symbols)
+    except Exception as e:
+        logger.error(f"Bulk price API error: {str(e)}")
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+    
+    prices = {}
+    for symbol in symbols:
+        stock_data = live_data.get(symbol)
+        if stock_data:
+            price_writer.record_quote(symbol, stock_data)
+            prices[symbol] = {field: stock_data.get(field) for field in fields}
+    
+    return JsonResponse({
+        'success': True,
+        'prices': prices,
+        'missing': [symbol for symbol in symbols if symbol not in prices],
+        'timestamp': timezone.now().isoformat()
+    })
+
+
+def _gain_summary(summary):
+    return {
+        'tax_year': summary.tax_year,
+        'short_term_gain': float(summary.short_term_gain),
+        'long_term_gain': float(summary.long_term_gain),
+        'total_gain': float(summary.total_gain),
+        'proceeds': float(summary.proceeds),
+        'cost_basis': float(summary.cost_basis),
+        'lots_closed': summary.lots_closed,
+    }
+
+
+@login_required
+def realized_gains_api(request):
+    """
+    API endpoint for realized gains from closed tax lots.
+    
+    GET /api/realized-gains/ returns the yearly totals;
+    GET /api/realized-gains/?year=2025 adds that year's closed lots.
+    """
+    year = request.GET.get('year')
+    if year is not None and not year.isdigit():
+        return JsonResponse({'success': False, 'error': 'year must be a number'}, status=400)
+    
+    payload = {
+        'success': True,
+        'years': [_gain_summary(summary) for summary in realized_gain_summaries(request.user)],
+    }
+    if year is not None:
+        payload['lots'] = [
+            {
+                'symbol': lot.stock_symbol,
+                'quantity': lot.quantity,
+                'acquired_at': lot.acquired_at.isoformat(),
+                'closed_at': lot.closed_at.isoformat(),
+                'term': lot.term,
+                'cost_basis': float(lot.cost_basis),
+                'proceeds': float(lot.proceeds),
+                'realized_gain': float(lot.realized_gain),
+                'buy_transaction_id': lot.buy_transaction_id,
+                'sell_transaction_id': lot.sell_transaction_id,
+            }
+            for lot in realized_lots(request.user, int(year))
+        ]
+    return JsonResponse(payload)
+
+
+@login_required
+def portfolio_history_api(request):
+    """
+    API endpoint for the portfolio value series from daily snapshots.
+    
+    GET /api/portfolio/history/?period=1y&points=180
+    period takes the history periods ('1mo', '6mo', '1y', 'ytd', 'max');
+    longer series are downsampled to evenly spaced days, keeping the latest.
+    """
+    api_settings = getattr(settings, 'STOCK_API_SETTINGS', {})
+    period = request.GET.get('period', '1y')
+    try:
+        start = period_start(period, timezone.localdate())
+        points = int(request.GET.get('points', api_settings.get('SNAPSHOT_CHART_POINTS', 180)))
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    points = min(max(points, 2), api_settings.get('SNAPSHOT_CHART_MAX_POINTS', 1000))
+    
+    snapshots = PortfolioSnapshot.objects.filter(user=request.user)
+    if start:
+        snapshots = snapshots.filter(date__gte=start)
+    rows = list(snapshots.order_by('date').values_list(
+        'date', 'total_value', 'invested', 'realized_pnl', 'unrealized_pnl'
+    ))
+    latest = snapshots.order_by('-date').values('date', 'sector_weights').first()
+    
+    return JsonResponse({
+        'success': True,
+        'period': period,
+        'days': len(rows),
+        'points': [
+            {
+                'date': rows[i][0].isoformat(),
+                'total_value': float(rows[i][1]),
+                'invested': float(rows[i][2]),
+                'realized_pnl': float(rows[i][3]),
+                'unrealized_pnl': float(rows[i][4]),
+            }
+            for i in downsample(len(rows), points)
+        ],
+        'sector_weights': latest['sector_weights'] if latest else {},
+    })
+
+
 
 
 @login_required
@@ -786,8 +1042,9 @@ def stock_detail(request, ticker):
     ).exclude(ticker=ticker.upper())[:4]
     
     # Enhance similar stocks with live data
+    similar_live_data = stock_service.get_multiple_stocks([s.ticker for s in similar_stocks])
     for similar_stock in similar_stocks:
-        similar_data = stock_service.get_stock_data(similar_stock.ticker)
+        similar_data = similar_live_data.get(similar_stock.ticker)
         if similar_data:
             similar_stock.day_change_percent = similar_data.get('day_change_percent', 0)
     